@@ -13,13 +13,20 @@ from bokeh.models import GeoJSONDataSource, ColumnDataSource
 from bokeh.util.logconfig import bokeh_logger as log
 
 # Shape and coordinate shaping tools
-import geopandas as gpd
-from shapely.geometry import Point, Polygon, mapping
-from shapely.ops import transform
-from rtree import index
-import pyproj
-from functools import partial
+from shapely.geometry import Point, Polygon
+from spatial_index import ObjectIndex
+from fires import FireStore
+from water import WaterMask, load_water_query
+from drones import DroneState
+from survivors import SurvivorIndex
+from shared_ring import SharedRing, LOCATION_RECORD, TAKEOFF_RECORD, LANDING_RECORD
+from sim_state_file import SimStateFileWriter
+from sim_state_channel import SimStateChannel
+from map_record import load_map, read_map_file, hash_map_file, cache_map_record
+from map_bundle import load_map_bundle
+import geodesy
 import math
+import numpy as np
 
 # Helpers
 from enum import IntEnum
@@ -27,16 +34,13 @@ import os
 import inspect
 from typing import Dict
 import time
-import pickle as binlib
 from pathlib import Path
 from datetime import datetime
 import json
 import traceback
-from os.path import exists
 
 # Multiprocessing for grpc data
 from multiprocessing import Queue, Pipe
-from queue import Empty
 import collections
 
 # Grpc
@@ -68,14 +72,42 @@ class Data(VisualizationSharedDataStore):
 
     Parameters
     ----------
-    qLanding : multiprocessing.Queue
-        Storage for what comes over the grpc line.
-    qTakeoff : multiprocessing.Queue
-        Storage for what comes over the grpc line.
-    qLocation : multiprocessing.Queue
-        Storage for what comes over the grpc line.
-    start_time : int
-        Time when the mission is started.
+    landing_ring : SharedRing
+        Storage for what comes over the grpc line (shared with the grpc process).
+    takeoff_ring : SharedRing
+        Storage for what comes over the grpc line (shared with the grpc process).
+    location_ring : SharedRing
+        Storage for what comes over the grpc line (shared with the grpc process, holds at most ingest_limit waiting locations).
+    qSimState : multiprocessing.Queue
+        Changes to the state of the simulation going out over the grpc line (the servicer itself when grpc runs on the Bokeh loop).
+    last_sim_state : tuple
+        Survivors found, water and fire percentages when the state of the simulation was last sent out.
+    sim_state_version : int
+        Goes up every time the state of the simulation changes.
+    sim_state_file : SimStateFileWriter
+        Writes the state of the simulation to the file the student code reads (on a thread of its own).
+    map_source : tuple
+        What the map was loaded from (see map_record.load_map, None if there's no map).
+    map_bundle : MapBundle
+        Everything worked out ahead of time from the map (None outside of the visualization).
+    sim_state_channel : SimStateChannel
+        Memory mapped file the state of the simulation is published into for the student code (None outside of the visualization).
+    drones : Dict
+        State of each of the drones keyed by their id (drone 0 is always there).
+    ingest_budget : float
+        How long each update can spend working through the queued up locations (in s).
+    ingest_chunk : int
+        Most locations to read out of the location ring at a time.
+    lag_warning : float
+        How far behind the student code the scoring can be before it gets logged (in s).
+    coalesced_locations : int
+        How many locations were scored but not drawn because the location ring was at its limit ('latest' ingest policy).
+    pending_locations : list
+        Locations scored as they came in that haven't been patched into the display yet (arrays of longitudes, latitudes, times and drone ids).
+    pending_takeoffs : list
+        Takeoff notifications handed over by grpc on the Bokeh loop that haven't been patched into the display yet (drone id, taken off or not, time in ms).
+    pending_landings : list
+        Landing notifications handed over by grpc on the Bokeh loop that haven't been patched into the display yet (drone id, landed or not).
     map_data_dict : Dict
         Data read from or written to the map file (depending on the mode).
     new_england_area_bbox : float tuple
@@ -88,24 +120,26 @@ class Data(VisualizationSharedDataStore):
         Data Frame containing state outlines for spatial orientation with the map.
     usa_states_outlines_geojson : bokeh.models.GeoJSONDataSource
         GeoJSONDataSource obtained from the Data Frame with the state outlines for plotting in Bokeh.
-    waterbodies : geopandas.GeoDataFrame
-        Waterbody data used to see if the drone is over water.
+    water_query : WaterQuery or WaterMask
+        Waterbodies around the map that the scoring checks the drone against (None outside of fire missions).
     radius_of_influence : float
         Radius within which the drone can collect and deposit water, and see survivors.
+    survivor_radius : float
+        Radius of the survivors (the drone sees them within radius_of_influence + survivor_radius).
     polygons_of_interest : shapely.Polygon list
-        List containing all items of interest as Shapely Polygons.
+        List containing all items of interest as Shapely Polygons (as they were when the map loaded).
+    fires : FireStore
+        The fires that are still burning keyed by their row in fires_table_source.
+    survivor_index : SurvivorIndex
+        Distance index over the survivors, also keeps track of which of them have been found.
+    found_survivors : int list
+        Survivors found since they were last patched into survivors_table_source.
     starting_fire_area : float
         Starting area of fires (used for scoring)
     survivors_found : int
         Count of the number of survivors found.
     water_limit : float
-        Limit on how much water can be carried by the drone.
-    water_quantity : float
-        Current water quantity.
-    water_start_time : int
-        Time when started collecting water.
-    fire_last_observed_time : int
-        Time when last observed fire.
+        Limit on how much water can be carried by each of the drones.
     fire_pct_remaining : float
         Amount of fire remaining throughout the mission.
     waterbodies_filepath : pathlib.Path list
@@ -113,15 +147,13 @@ class Data(VisualizationSharedDataStore):
     ownship_filepath : pathlib.Path list
         Filepath where to find the ownship symbol.
     ownship_data_source : bokeh.models.ColumnDataSource
-        Data source to drive the drawing of the ownship track.
+        Data source to drive the drawing of the ownship symbols (a row for each drone).
     wind_table_source : bokeh.models.ColumnDataSource
         Data source to drive the wind tables (not implemented).
     bounds_table_source : bokeh.models.ColumnDataSource
         Data source to drive the bounds table and to save those bounds to the map file.
     stats_table_source : bokeh.models.ColumnDataSource
-        Data source to drive the mission statistics table.
-    drone_pos_data_source : bokeh.models.ColumnDataSource
-        Data source to drive the ownship location.
+        Data source to drive the mission statistics table (a row for each drone).
     survivors_table_source : bokeh.models.ColumnDataSource
         Data source to drive the drawing of the survivors.
     fires_table_source : bokeh.models.ColumnDataSource
@@ -129,7 +161,9 @@ class Data(VisualizationSharedDataStore):
     debug_radii_table_source : bokeh.models.ColumnDataSource    
         Data source to drive the drawing of the radii of influence (useful for debugging).
     debug_drone_table_source : bokeh.models.ColumnDataSource
-        Data source to drive the drone debug table.
+        Data source to drive the drone debug table (a row for each drone).
+    dirty_fires : set
+        Rows of the fires that changed shape or were put out since they were last patched into fires_table_source.
     water_per_second : float
         Amount of water taken up and deposited in gallons per second.
         
@@ -141,22 +175,48 @@ class Data(VisualizationSharedDataStore):
         Loads a map record from file.
     bind_bbox()
         Binds a bounding box to the standard_window_lat value.
+    prep_viz_data()
+        Hands the state of the simulation over to be written to the file the student code reads.
     check_landing_status()
         Checks the landing status (from the grpc messages).
     check_takeoff_status()
         Checks the takeoff status (from the grpc messages).
+    ingest_landing(drone_id: int, is_landed: bool)
+        Takes a landing notification handed over directly by grpc running on the Bokeh loop.
+    ingest_takeoff(drone_id: int, is_taken_off: bool, takeoff_time: int)
+        Takes a takeoff notification handed over directly by grpc running on the Bokeh loop.
+    drone(drone_id: int)
+        Gets the state of a drone (a new one the first time it comes up).
+    show_drone(drone: DroneState)
+        Gives a drone its rows in the display if it doesn't have them yet.
     update_local_location()
         Checks the local location (from the grpc messages).
+    ingest_locations(lons: numpy.ndarray, lats: numpy.ndarray, times: numpy.ndarray, drone_ids: numpy.ndarray)
+        Scores locations handed over directly by grpc running on the Bokeh loop.
+    score_locations(lons: numpy.ndarray, lats: numpy.ndarray, times: numpy.ndarray, drone_ids: numpy.ndarray, deadline: float=None)
+        Scores the given locations in order.
+    refresh_location_view(lons: numpy.ndarray, lats: numpy.ndarray, times: numpy.ndarray, drone_ids: numpy.ndarray)
+        Patches the latest state into the display.
+    refresh_drone_view(drone: DroneState, track_lons: list, track_lats: list, latest_time: int)
+        Patches the latest state of one of the drones into the display.
+    publish_sim_state(changed_fires: list)
+        Sends the state of the simulation out over the grpc line if it changed.
+    log_backlog(latest_time: int, processed: int)
+        Logs how far behind the student code the scoring is.
     flatten(x: list)
         Flattens a list to from a list of lists of lists... to a single list.
     point_to_circle(point_coord: tuple, radius: float)
         Creates a shapely circle with specified radius around the given point.
-    fire_suppression_intersections(drone_circle: Polygon, time_location_observed: int)
+    points_to_circles(lons: list, lats: list, radius: float)
+        Creates shapely circles with specified radius around each of the given points.
+    fire_suppression_intersections(drone: DroneState, drone_circle: Polygon, time_location_observed: int, candidates: list=None)
         Checks if the drone is over fire and performs scoring.
-    snr_intersections(drone_circle: Polygon)
-        Checks if the drone is over a survivors and performs scoring.
-    check_drone_location_against_object_of_interest(drone_circle: Polygon, objects: list)
+    snr_intersections(lons: list, lats: list)
+        Checks if the drone can see any survivors and performs scoring.
+    check_drone_location_against_object_of_interest(drone_circle: Polygon, objects: ObjectIndex, candidates: list=None)
         Checks if the drone over a generic object of interest.
+    fire_area(polygon: Polygon)
+        Figures out the area of the ground covered by a fire.
     shrink_shapely_polygon(my_polygon: Polygon, factor: float=0.10)
         Shrinks a polygon by the given factor.
     """
@@ -166,14 +226,38 @@ class Data(VisualizationSharedDataStore):
         self.Viz = VisualizationSharedDataStore
         self.Viz.data = self
         
-        # gRPC queues (this is where the data from gRPC comes into)
-        self.qLanding = Queue()
-        self.qTakeoff = Queue()
-        self.qLocation = Queue()
+        # How long each update can spend working through the queued up locations (in s)
+        self.ingest_budget = 0.005
+        # How many locations to score at a time
+        self.ingest_chunk = 1024
+        # How far behind the student code we can be before we start logging about it (in s)
+        self.lag_warning = 0.5
+        # When we last logged about falling behind, and what had been dropped or coalesced by then
+        self.last_backlog_log = 0
+        self.logged_overflow = (0, 0)
+        # Locations that got scored but not drawn because the ring was at its limit (the ring counts the ones it dropped)
+        self.coalesced_locations = 0
+        
+        # gRPC rings (this is where the data from gRPC comes into)
+        self.landing_ring = SharedRing(LANDING_RECORD, 256)
+        self.takeoff_ring = SharedRing(TAKEOFF_RECORD, 256)
+        # There's room past the limit for the chunk that's being scored, so dropping never has to wait on it
+        self.location_ring = SharedRing(LOCATION_RECORD, self.Viz.ingest_limit + self.ingest_chunk,
+                                        limit=self.Viz.ingest_limit,
+                                        drop_oldest=self.Viz.ingest_policy == 'drop-oldest')
+        # This is where the changes to the state of the simulation go out to gRPC
+        self.qSimState = Queue()
+        # Don't hang on exit if gRPC never took them, the state will be stale by then anyway
+        self.qSimState.cancel_join_thread()
         os.makedirs(os.path.dirname(self.Viz.viz_file_io), exist_ok=True)
+        # The file only gets written when the state changed, and not on the Bokeh thread
+        self.sim_state_file = SimStateFileWriter(self.Viz.viz_file_io)
         
-        # Time when we started the mission (-1 means we haven't started)
-        self.start_time = -1
+        # Locations that gRPC on the Bokeh loop already scored, waiting to be shown
+        self.pending_locations = []
+        # Takeoffs and landings that gRPC on the Bokeh loop handed over (they never wait on the rings)
+        self.pending_takeoffs = []
+        self.pending_landings = []
         
         # Data read from the mission file
         self.map_data_dict = None
@@ -229,17 +313,44 @@ class Data(VisualizationSharedDataStore):
         # self.usa_states_outlines_geojson = GeoJSONDataSource(
         #     geojson=usa_state_outlines.to_json())
         
-        # Waterbody data that we'll be checking against to see if the drone is over water
-        self.waterbodies = gpd.read_file('data/waterbodies.geojson', bbox=self.new_england_area_bbox, crs="EPSG:4326")
-        
         # This is how close in meters the drone needs to be in order to collect water/extinguish fire/see survivor
         self.radius_of_influence = (25 
                                     if self.map_data_dict["map_type"] == MapType.SEARCH_AND_RESCUE 
                                     else 5) # in m
+        # This is how big a survivor is, the drone sees them as soon as the two circles touch
+        self.survivor_radius = 5 # in m
+        
+        # Everything that only depends on the map is compiled once and cached for the next launch
+        self.map_bundle = None
+        if self.Viz.mode == Mode.VISUALIZATION:
+            self.map_bundle = load_map_bundle(self.Viz.map_name,
+                                              self.map_data_dict,
+                                              self.map_source,
+                                              self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION,
+                                              self.survivor_radius,
+                                              cache_dir=os.path.dirname(self.Viz.viz_file_io))
         
-        # Prepopulate the polygons of interest and just modify this list as the mission progresses
+        # Waterbody data that we'll be checking against to see if the drone is over water.
+        # Only the water around the map matters for scoring, so it's clipped to the map and cached for the next launch.
+        self.water_query = None
+        if self.Viz.mode == Mode.VISUALIZATION and self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
+            self.water_query = load_water_query(self.Viz.map_name,
+                                                self.bbox,
+                                                'data/waterbodies.geojson',
+                                                cache_dir=os.path.dirname(self.Viz.viz_file_io))
+            if self.Viz.water_mode == 'raster':
+                # Trade exactness at the shoreline (within a pixel) for a lookup that doesn't depend on the coastline
+                self.water_query = WaterMask(self.water_query,
+                                             self.Viz.map_name,
+                                             self.radius_of_influence,
+                                             self.Viz.water_resolution,
+                                             cache_dir=os.path.dirname(self.Viz.viz_file_io))
+        
+        # Prepopulate the polygons of interest (the fires as they were when the map loaded)
         self.polygons_of_interest = []
-        if self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
+        if self.map_bundle is not None:
+            self.polygons_of_interest = self.map_bundle.polygons
+        elif self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
             for i in range(0, len(self.map_data_dict["data_fs"]['xs'])):
                 xs = self.map_data_dict["data_fs"]['xs'][i]
                 ys = self.map_data_dict["data_fs"]['ys'][i]
@@ -247,37 +358,46 @@ class Data(VisualizationSharedDataStore):
                 # Create polygons out of the data in the map file to enable operations with Shapely and RTree
                 self.polygons_of_interest.append(Polygon(tuple(zip(xs, ys))))
                 
-                # Figure out the area of the ground covered by this set of fires.
-                # This 100% of the score.
-                self.starting_fire_area = 0
-                for polygon in self.polygons_of_interest:
-                    # Polygon x/y are in lat lon, so need the radius of earth to convert to meters
-                    self.starting_fire_area = self.starting_fire_area + polygon.area*6370**2 
-                
         else:
-            merged_list = tuple(zip(self.map_data_dict["data_snr"]['x'], self.map_data_dict["data_snr"]['y'])) 
-            for survivor in merged_list:
-                # Transform the survivor points into survivor circles with radius 5 to make them intersectable
-                self.polygons_of_interest.append(self.point_to_circle(survivor, 5))
+            # Transform the survivor points into survivor circles so they can be drawn (for debugging only)
+            self.polygons_of_interest = self.points_to_circles(self.map_data_dict["data_snr"]['x'],
+                                                               self.map_data_dict["data_snr"]['y'],
+                                                               self.survivor_radius)
+        
+        # Keep the fires by the row they have in the data source, and modify them in place as the mission progresses.
+        # The area of the ground covered by all of them is 100% of the score.
+        if self.map_bundle is not None and self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
+            self.fires = FireStore(self.polygons_of_interest, self.map_bundle.areas, self.map_bundle.bounds)
+        elif self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
+            self.fires = FireStore(self.polygons_of_interest,
+                                   [self.fire_area(polygon) for polygon in self.polygons_of_interest])
+        else:
+            self.fires = FireStore([], [])
+        self.starting_fire_area = self.fires.starting_area
+        # Survivors are points, so they get found with a distance check instead
+        if self.map_bundle is not None:
+            self.survivor_index = self.map_bundle.survivor_index
+        elif self.map_data_dict["map_type"] == MapType.SEARCH_AND_RESCUE:
+            self.survivor_index = SurvivorIndex(self.map_data_dict["data_snr"]['x'],
+                                                self.map_data_dict["data_snr"]['y'])
+        else:
+            self.survivor_index = SurvivorIndex([], [])
         
         # Keep track of the number of survivors founds        
         self.survivors_found = 0
         
-        # Maximum quantity of water the drone can hold
+        # Maximum quantity of water each drone can hold
         self.water_limit = 600.0
         # Rate of water uptake and deposit
         self.water_per_second = 10.0
-        # Keep track of the current quantity of water
-        self.water_quantity = 0
-        # Time when first observed over water (-1 means that was most recently observed over land)
-        self.water_start_time = -1
         
-        # Time when last observed fire (-1 means haven't seen fire)
-        self.fire_last_observed_time = -1
+        # Each drone carries its own water and flies its own track (the one drone there always is gets the first rows)
+        self.drones = {}
+        
         # Amount of fire remaining throughout the mission
         self.fire_pct_remaining = 100
 
-        # Where to find the waterbodies svg (can't use the self.waterbodies because Bokeh's incomplete
+        # Where to find the waterbodies svg (can't plot the waterbodies GeoJSON because Bokeh's incomplete
         # treatment of GeoJSON files)
         self.waterbodies_filepath = [os.path.join(os.path.basename(
             os.path.dirname(inspect.getfile(lambda: None))), 'static', 'waterbodies_editted.svg')]
@@ -308,6 +428,7 @@ class Data(VisualizationSharedDataStore):
                 'maxy': [self.Viz.data.map_data_dict['bounds']['maxy']]})
         # Container for mission statistics
         self.stats_table_source = ColumnDataSource({
+                'drone_id': [0],
                 'elapsed_dur': [0],
                 'remaining_dur': [0],
                 'mission_stat': [0],
@@ -315,11 +436,6 @@ class Data(VisualizationSharedDataStore):
                 'lat': [0],
                 'status': [0],
                 'score': [0]})
-        # Container for drone position
-        self.drone_pos_data_source = ColumnDataSource({
-                'lon': [0],
-                'lat': [0]
-                })
         # I don't know why, but the data sources need to be formatted differently loading a 
         # map from file as opposed to creating a new one. I think it has something to do
         # with how ColumnDataSource treats empty entries (they're not allowed).
@@ -348,20 +464,41 @@ class Data(VisualizationSharedDataStore):
                                                            if self.map_data_dict["map_type"] == MapType.SEARCH_AND_RESCUE 
                                                            else {})
             self.fires_table_source = ColumnDataSource({
-                'xs': self.Viz.data.map_data_dict['data_fs']['xs'],
-                'ys': self.Viz.data.map_data_dict['data_fs']['ys'],
+                'xs': self.map_bundle.columns['fires_xs'],
+                'ys': self.map_bundle.columns['fires_ys'],
                 'fill_color': ['red']*len(self.Viz.data.map_data_dict['data_fs']['ys']),
                 'alpha': [1]*len(self.Viz.data.map_data_dict['data_fs']['ys'])} 
                                                        if self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION 
                                                        else {})
         # Container for the radius circles (for debugging only)
         self.debug_radii_table_source = ColumnDataSource({
+                'xs': self.map_bundle.columns['radii_xs'],
+                'ys': self.map_bundle.columns['radii_ys']}
+                if self.map_bundle is not None else {
                 'xs': [list(poly.exterior.coords.xy[0]) for poly in self.polygons_of_interest],
                 'ys': [list(poly.exterior.coords.xy[1]) for poly in self.polygons_of_interest]})
+        # Fires that changed shape since they were last patched into the display
+        self.dirty_fires = set()
+        # Survivors found since they were last patched into the display
+        self.found_survivors = []
         # Container for the drone table data (for debugging only)
         self.debug_drone_table_source = ColumnDataSource({
                 'xs': [0],
                 'ys': [0]})
+        # The first row of each of the tables above is already there for the first drone
+        self.show_drone(self.drone(0))
+        
+        # What the state of the simulation looked like when it was last sent out to gRPC
+        self.last_sim_state = None
+        self.sim_state_version = 0
+        self.sim_state_channel = None
+        if self.Viz.mode == Mode.VISUALIZATION:
+            # Room for all of the fires as they start out (they only ever go out, but shrinking them can add points)
+            self.sim_state_channel = SimStateChannel(self.Viz.viz_state_channel, len(self.fires.polygons),
+                                                     2 * sum(len(poly.exterior.coords) for poly in self.fires.polygons.values()),
+                                                     self.radius_of_influence)
+            # Everyone watching starts out with all of the fires
+            self.publish_sim_state(list(self.fires.polygons))
         
         
     def deserialize(self, map_name: str) -> Dict:
@@ -378,12 +515,11 @@ class Data(VisualizationSharedDataStore):
         Dict
             The data read from the map record file.
         """
-        with open("maps/" + map_name + ".bin", "rb") as binfile:
-            return binlib.load(binfile)
+        return read_map_file("maps/" + map_name + ".bin")
     
     def save_map_record_as(self) -> None:
         """
-        Saves the map record to file in the maps directory.
+        Saves the map record to file in the maps directory (as JSON, and cached as a binary map record to load quickly).
         """
         if(not self.disable_save):
             try:
@@ -413,6 +549,9 @@ class Data(VisualizationSharedDataStore):
                     else:
                         self.map_data_dict["data_fs"]['xs'] = self.Viz.data_table.fires_table.source.data['xs']
                         self.map_data_dict["data_fs"]['ys'] = self.Viz.data_table.fires_table.source.data['ys']
+                    # The fires may still be views into the binary map record the map was loaded from
+                    self.map_data_dict["data_fs"]['xs'] = [np.asarray(xs, dtype=float).tolist() for xs in self.map_data_dict["data_fs"]['xs']]
+                    self.map_data_dict["data_fs"]['ys'] = [np.asarray(ys, dtype=float).tolist() for ys in self.map_data_dict["data_fs"]['ys']]
                         
                     # Make we don't have any cascading lists
                     self.map_data_dict["data_snr"]['x'] = self.flatten(self.Viz.data_table.survivors_table.source.data['x'])
@@ -423,6 +562,12 @@ class Data(VisualizationSharedDataStore):
                             outfile,
                             indent=4,
                             sort_keys=True)
+                
+                # Same map again, for loading it quickly (only used while the JSON stays the same)
+                cache_map_record(self.map_data_dict['map_name'],
+                                 self.map_data_dict,
+                                 hash_map_file("maps/" + self.map_data_dict['map_name'] + ".json"),
+                                 cache_dir=os.path.dirname(self.Viz.viz_file_io))
             except:
                 log.error(traceback.format_exc())
                 log.error("Map save encountered an issue (see traceback above)")
@@ -442,17 +587,12 @@ class Data(VisualizationSharedDataStore):
         Dict
             The data read from the map record file.
         """
-        if(exists("maps/" + map_name + ".json")):
-            self.disable_save = False
-            with open("maps/" + map_name + ".json") as f:
-                map_data = json.load(f)
-                if(exists('Visualizer/static/.' + map_name + '.snr.bin')):
-                    map_data['data_snr'] = binlib.load(open('Visualizer/static/.' + map_name + '.snr.bin', 'rb'))
-                    self.disable_save = True
-                return map_data
-        elif(exists("maps/" + map_name + ".bin")):
-            self.disable_save = True
-            return self.deserialize(map_name)
+        self.map_source = None
+        loaded = load_map(map_name, cache_dir=os.path.dirname(self.Viz.viz_file_io)) if len(map_name) > 0 else None
+        if loaded is not None:
+            # Maps with hidden survivors (or only in binary) can't be edited
+            map_data, self.disable_save, self.map_source = loaded
+            return map_data
         elif(len(map_name) == 0):
             self.disable_save = False
         else:
@@ -506,113 +646,429 @@ class Data(VisualizationSharedDataStore):
         
     def prep_viz_data(self) -> Bool:
         """
-        
+        Hands the state of the simulation over to be written to the file the student code reads (if it changed since it was last written).
+
+        Returns
+        -------
+        Bool
+            Always True (the file gets written on another thread).
         """
-        try:
-            with open(self.Viz.viz_file_io, 'w') as f:
-                json.dump({"survivors_found" : self.survivors_found if self.map_data_dict["map_type"] == MapType.SEARCH_AND_RESCUE else 0,
-                        "fires_pct_remaining" : self.fire_pct_remaining,
-                        "water_pct_remaining": self.water_quantity / float(self.water_limit) * 100.0,
-                        "fire_polygons": [mapping(poly) for poly in self.polygons_of_interest] if self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION else []}, f, indent=4, sort_keys=True)
-                f.flush()
-                return True
-        except KeyboardInterrupt:
-            log.info("Cleaning up temp files")
-            os.remove(self.Viz.viz_file_io)
+        
+        self.sim_state_file.submit(self.sim_state_version,
+                                   {"survivors_found" : self.survivors_found if self.map_data_dict["map_type"] == MapType.SEARCH_AND_RESCUE else 0,
+                                    "fires_pct_remaining" : self.fire_pct_remaining,
+                                    "water_pct_remaining": self.drones[0].water_pct(self.water_limit),
+                                    "radius_of_influence": self.radius_of_influence,
+                                    "drones": {str(drone_id): drone.water_pct(self.water_limit) for drone_id, drone in self.drones.items()},
+                                    # The polygons don't change in place, so the writer can take its time with them
+                                    "fire_polygons": dict(self.fires.polygons) if self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION else {}})
+        return True
         
     def check_landing_status(self) -> None:
         """
-        Checks if the queue filled by grpc has anything to process and patches the new information in.
+        Checks if the ring filled by grpc has anything to process and patches the new information in.
         """
         
-        try:
-            if(not self.qLanding.empty()):
-                log.info(" --- Updating landing status")
-            # Don't block if the queue doesn't have anything, we have other things to do too.
-            ln = self.qLanding.get(block=False)
-            
-            # If queue has some thing for us, patch the new data in.
-            if(ln.isLanded):
-                self.stats_table_source.patch({'status': [(0, "On the Ground")]})
-        except Empty:
-            pass
+        landed = {drone_id for drone_id, is_landed in self.pending_landings if is_landed}
+        self.pending_landings = []
+        records = self.landing_ring.peek()
+        while(len(records) > 0):
+            landed.update(records['drone_id'][records['isLanded']].tolist())
+            self.landing_ring.release(len(records))
+            records = self.landing_ring.peek()
+        
+        # If ring has some thing for us, patch the new data in.
+        for drone_id in sorted(landed):
+            log.info(" --- Updating landing status of drone " + str(drone_id))
+            drone = self.drone(drone_id)
+            self.show_drone(drone)
+            drone.status = "On the Ground"
+            self.stats_table_source.patch({'status': [(drone.row, drone.status)]})
         
     def check_takeoff_status(self) -> None:
         """
-        Checks if the queue filled by grpc has anything to process and patches the new information in.
+        Checks if the ring filled by grpc has anything to process and patches the new information in.
         """
         
-        try:
-            if(not self.qTakeoff.empty()):
-                log.info(" --- Updating takeoff status")
-            # Don't block if the queue doesn't have anything, we have other things to do too.
-            tn = self.qTakeoff.get(block=False)
+        takeoffs = self.pending_takeoffs
+        self.pending_takeoffs = []
+        records = self.takeoff_ring.peek()
+        while(len(records) > 0):
+            takeoffs.extend(zip(records['drone_id'].tolist(), records['isTakenOff'].tolist(), records['time'].tolist()))
+            self.takeoff_ring.release(len(records))
+            records = self.takeoff_ring.peek()
+        
+        for drone_id, is_taken_off, takeoff_time in takeoffs:
+            log.info(" --- Updating takeoff status")
             
-            # If queue has some thing for us and we're ready for it, patch the new data in.
-            if(tn.isTakenOff and self.start_time == -1):
-                self.start_time = tn.time/1000.0
-                self.stats_table_source.patch({'status': [(0, "Taking Off")]})
-        except Empty:
-            pass
+            # If ring has some thing for us and we're ready for it, patch the new data in.
+            drone = self.drone(drone_id)
+            self.show_drone(drone)
+            if(is_taken_off and drone.start_time == -1):
+                drone.start_time = takeoff_time/1000.0
+                drone.status = "Taking Off"
+                self.stats_table_source.patch({'status': [(drone.row, drone.status)]})
+    
+    def ingest_landing(self, drone_id: int, is_landed: bool) -> None:
+        """
+        Takes a landing notification handed over directly by grpc running on the Bokeh loop.
+        
+        The display is left for the next check_landing_status() to patch.
+
+        Parameters
+        ----------
+        drone_id : int
+            Id of the drone.
+        is_landed : bool
+            Whether the drone landed.
+        """
+        
+        self.pending_landings.append((drone_id, is_landed))
+    
+    def ingest_takeoff(self, drone_id: int, is_taken_off: bool, takeoff_time: int) -> None:
+        """
+        Takes a takeoff notification handed over directly by grpc running on the Bokeh loop.
+        
+        The display is left for the next check_takeoff_status() to patch.
+
+        Parameters
+        ----------
+        drone_id : int
+            Id of the drone.
+        is_taken_off : bool
+            Whether the drone took off.
+        takeoff_time : int
+            Time when the drone took off in ms.
+        """
+        
+        self.pending_takeoffs.append((drone_id, is_taken_off, takeoff_time))
+        
+    def drone(self, drone_id: int) -> DroneState:
+        """
+        Gets the state of a drone (a new one the first time it comes up).
+
+        Parameters
+        ----------
+        drone_id : int
+            Id of the drone (as it comes over the grpc line).
+
+        Returns
+        -------
+        DroneState
+            The state of the drone.
+        """
+        
+        drone = self.drones.get(drone_id)
+        if drone is None:
+            drone = DroneState(drone_id, self.Viz.track_rollover)
+            self.drones[drone_id] = drone
+        return drone
+    
+    def show_drone(self, drone: DroneState) -> None:
+        """
+        Gives a drone its rows in the display if it doesn't have them yet (and its track on the plot).
+
+        Parameters
+        ----------
+        drone : DroneState
+            The drone to show.
+        """
+        
+        if drone.row is not None:
+            return
+        drone.row = sum(1 for other in self.drones.values() if other.row is not None)
+        if drone.row > 0:
+            # The first drone gets the rows the data sources start out with
+            self.stats_table_source.stream({'drone_id': [drone.drone_id],
+                                            'elapsed_dur': [0],
+                                            'remaining_dur': [0],
+                                            'mission_stat': [0],
+                                            'lon': [0],
+                                            'lat': [0],
+                                            'status': [drone.status],
+                                            'score': [0]})
+            self.ownship_data_source.stream({'url': [self.ownship_filepath[0]],
+                                             'lon': [0],
+                                             'lat': [0],
+                                             'w': [20],
+                                             'h': [20]})
+            self.debug_drone_table_source.stream({'xs': [0],
+                                                  'ys': [0]})
+        else:
+            self.stats_table_source.patch({'drone_id': [(0, drone.drone_id)]})
+        if self.Viz.plot is not None:
+            self.Viz.plot.add_drone_track(drone)
         
     def update_local_location(self) -> None:
         """
-        Checks if the queue filled by grpc has anything to process and patches the new information in.
+        Checks if the ring filled by grpc has anything to process and patches the new information in.
+        
+        Works through as many locations as fit in the ingest budget and scores each of them in order,
+        but only patches the display once with the latest state. Locations that were already
+        scored as they came in (grpc on the Bokeh loop) get patched in along with them.
+        
+        With the 'latest' ingest policy, once the ring is at its limit the locations are still all
+        scored in order within the budget, but only the latest location of each drone is drawn.
+        """
+        
+        coalesce = (self.Viz.ingest_policy == 'latest' and len(self.location_ring) >= self.location_ring.limit)
+        deadline = time.perf_counter() + self.ingest_budget
+        scored_locations = self.pending_locations
+        self.pending_locations = []
+        # The records are read straight out of the shared memory, a chunk at a time
+        records = self.location_ring.peek(self.ingest_chunk)
+        while(len(records) > 0):
+            scored = self.score_locations(records['longitude'], records['latitude'], records['time'], records['drone_id'], deadline)
+            # Copied out, since the gRPC process gets the space back right after
+            scored_locations.append((records['longitude'][:scored].copy(),
+                                     records['latitude'][:scored].copy(),
+                                     records['time'][:scored].copy(),
+                                     records['drone_id'][:scored].copy()))
+            self.location_ring.release(scored)
+            if(time.perf_counter() >= deadline):
+                break
+            records = self.location_ring.peek(self.ingest_chunk)
+        
+        if(len(scored_locations) == 0):
+            return
+        lons, lats, times, drone_ids = (np.concatenate(column) for column in zip(*scored_locations))
+        processed = len(times)
+        if coalesce:
+            # Keep the latest location of each drone (in the order they came in)
+            last = np.sort(processed - 1 - np.unique(drone_ids[::-1], return_index=True)[1])
+            self.coalesced_locations += processed - len(last)
+            lons, lats, times, drone_ids = lons[last], lats[last], times[last], drone_ids[last]
+        
+        self.refresh_location_view(lons, lats, times, drone_ids)
+        self.log_backlog(int(times[-1]), processed)
+    
+    def ingest_locations(self, lons: np.ndarray, lats: np.ndarray, times: np.ndarray, drone_ids: np.ndarray) -> None:
         """
+        Scores locations handed over directly by grpc running on the Bokeh loop.
         
-        try:
-            if(not self.qLocation.empty()):
-                time.sleep(0.0001)
-                # log.info(" --- Updating local location")
-                # Don't spam the console
-                pass
-            # Don't block if the queue doesn't have anything, we have other things to do too.
-            loc = self.qLocation.get(block=False)
-            
-            # If queue has some thing for us, patch the new data in.
-            # Dealing with moderately disparate orders of magnitude, so lose precision when doing all in one go
-            elapsed_duration = loc.time/1000.0 - self.start_time
-            
-            # Update the mission statistics table
-            self.stats_table_source.patch({'elapsed_dur': [(0, math.floor(elapsed_duration))],
-                                           'remaining_dur': [(0, math.floor(self.map_data_dict['mission_duration_min'] * 60.0 - elapsed_duration))],
-                                           'lon': [(0, loc.longitude)],
-                                           'lat': [(0, loc.latitude)],
-                                           'status': [(0, "In Air")]})
-            # Update the location of the ownship
-            self.ownship_data_source.patch({'lon': [(0, loc.longitude)],
-                                            'lat': [(0, loc.latitude)],
-                                           })
-            
-            # Update the location of the ownship
-            if(self.drone_pos_data_source.data['lat'][0] == 0):
-                self.drone_pos_data_source.data = {
-                    'lon': [loc.longitude],
-                    'lat': [loc.latitude]
-                }
-            else:
-                # If this isn't the first location we've received, want to make sure we're maintaining a flat list
-                new_lat = self.flatten([self.drone_pos_data_source.data['lat'], loc.latitude])
-                new_lon = self.flatten([self.drone_pos_data_source.data['lon'], loc.longitude])
-                self.drone_pos_data_source.data = {
-                    'lon': new_lon,
-                    'lat': new_lat
-                }
-            # log.info([self.drone_pos_data_source.data['lon'][-1], self.drone_pos_data_source.data['lat'][-1]])
-            
-            # See if there are any interesting intersections
-            drone_circle = self.point_to_circle((loc.longitude, loc.latitude), self.radius_of_influence)
-            if self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
-                self.fire_suppression_intersections(drone_circle, loc.time)
+        The display is left for the next update_local_location() to patch.
+
+        Parameters
+        ----------
+        lons : numpy.ndarray
+            Longitudes of the locations.
+        lats : numpy.ndarray
+            Latitudes of the locations.
+        times : numpy.ndarray
+            Times when the locations were observed in ms.
+        drone_ids : numpy.ndarray
+            Which drone each of the locations is from.
+        """
+        
+        if(len(times) == 0):
+            return
+        self.score_locations(lons, lats, times, drone_ids)
+        self.pending_locations.append((lons, lats, times, drone_ids))
+    
+    def score_locations(self, lons: np.ndarray, lats: np.ndarray, times: np.ndarray, drone_ids: np.ndarray, deadline: float = None) -> int:
+        """
+        Scores the given locations in order (without touching the display).
+        
+        The areas of influence of the locations (of every drone) are checked against the fires'
+        index in batched queries, and only the fires that came out of them are checked exactly
+        as each location is scored in turn. The batches grow as long as there's time left, so
+        a deadline doesn't throw away work done for locations that won't be scored this time.
+
+        Parameters
+        ----------
+        lons : numpy.ndarray
+            Longitudes of the locations.
+        lats : numpy.ndarray
+            Latitudes of the locations.
+        times : numpy.ndarray
+            Times when the locations were observed in ms.
+        drone_ids : numpy.ndarray
+            Which drone each of the locations is from.
+        deadline : float, optional
+            time.perf_counter() value after which to stop (after at least one location), by default None (no deadline).
+
+        Returns
+        -------
+        int
+            How many of the locations were scored (the first ones).
+        """
+        
+        if self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
+            times = times.tolist()
+            drone_ids = drone_ids.tolist()
+            # The batches start small and double, so running into the deadline throws away at most as much as was scored
+            start = 0
+            batch = 16
+            while(start < len(times)):
+                end = min(start + batch, len(times))
+                # The circles are independent of each other, but water and fire carry over from one location to the next
+                rings = geodesy.points_to_rings(lons[start:end], lats[start:end], self.radius_of_influence)
+                # Fires only ever shrink, so what they might touch can be looked up for the whole batch up front
+                candidates = self.fires.index.candidates_many(np.concatenate((rings.min(axis=1), rings.max(axis=1)), axis=1))
+                for i in range(start, end):
+                    drone = self.drone(drone_ids[i])
+                    drone.drone_circle = Polygon(rings[i - start])
+                    self.fire_suppression_intersections(drone, drone.drone_circle, times[i], candidates[i - start])
+                    if(deadline is not None and time.perf_counter() >= deadline):
+                        return i + 1
+                start = end
+                batch *= 2
+            return len(times)
+        else:
+            # Finding survivors doesn't depend on the order or the drone, so check all of the locations at once
+            self.snr_intersections(lons, lats)
+            # Only the latest area of influence of each drone is kept
+            ids, last = np.unique(np.asarray(drone_ids)[::-1], return_index=True)
+            for drone_id, i in zip(ids.tolist(), (len(lons) - 1 - last).tolist()):
+                self.drone(drone_id).drone_circle = self.point_to_circle((lons[i], lats[i]), self.radius_of_influence)
+            return len(lons)
+    
+    def refresh_location_view(self, lons: np.ndarray, lats: np.ndarray, times: np.ndarray, drone_ids: np.ndarray) -> None:
+        """
+        Patches the latest state into the display.
+
+        Parameters
+        ----------
+        lons : numpy.ndarray
+            Longitudes of all of the locations scored since the last refresh.
+        lats : numpy.ndarray
+            Latitudes of all of the locations scored since the last refresh.
+        times : numpy.ndarray
+            Times when the locations were observed in ms.
+        drone_ids : numpy.ndarray
+            Which drone each of the locations is from.
+        """
+        
+        # Each drone gets its own track, symbol and statistics
+        for drone_id in np.unique(drone_ids).tolist():
+            mine = (drone_ids == drone_id)
+            drone = self.drone(drone_id)
+            self.show_drone(drone)
+            self.refresh_drone_view(drone, lons[mine].tolist(), lats[mine].tolist(), int(times[mine][-1]))
+        
+        # The score is shared by all of the drones
+        if self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
+            score = 100.0 - self.fire_pct_remaining
+        else:
+            score = self.survivors_found
+        self.stats_table_source.patch({'score': [(drone.row, score) for drone in self.drones.values() if drone.row is not None]})
+        
+        # Show the survivors that were just found
+        if(len(self.found_survivors) > 0):
+            self.survivors_table_source.patch({'alpha': [(idx, 1) for idx in self.found_survivors]})
+            self.found_survivors = []
+        
+        # Let the student code know what changed
+        self.publish_sim_state(sorted(self.dirty_fires))
+        
+        # If fires are still around after this, update their perimeter points
+        if(len(self.dirty_fires) > 0):
+            # Fires that were put out just get their row emptied
+            self.fires_table_source.patch({'xs': [(idx, list(self.fires[idx].exterior.coords.xy[0]) if idx in self.fires else []) for idx in sorted(self.dirty_fires)],
+                                           'ys': [(idx, list(self.fires[idx].exterior.coords.xy[1]) if idx in self.fires else []) for idx in sorted(self.dirty_fires)]})
+            self.dirty_fires.clear()
+    
+    def refresh_drone_view(self, drone: DroneState, track_lons: list, track_lats: list, latest_time: int) -> None:
+        """
+        Patches the latest state of one of the drones into the display.
+
+        Parameters
+        ----------
+        drone : DroneState
+            The drone.
+        track_lons : list
+            Longitudes of the drone's locations scored since the last refresh (the last one is where the drone is now).
+        track_lats : list
+            Latitudes of the drone's locations scored since the last refresh (the last one is where the drone is now).
+        latest_time : int
+            Time when the drone's latest location was observed in ms.
+        """
+        
+        # Dealing with moderately disparate orders of magnitude, so lose precision when doing all in one go
+        elapsed_duration = latest_time/1000.0 - drone.start_time
+        
+        # Update the drone's row of the mission statistics table
+        if self.map_data_dict["map_type"] == MapType.FIRE_SUPPRESSION:
+            mission_stat = drone.water_quantity/10.0
+        else:
+            # mission_stat = self.survivors_found/float(len(self.map_data_dict["data_snr"]['x']))*100.0
+            mission_stat = self.survivors_found
+        drone.status = "In Air"
+        self.stats_table_source.patch({'elapsed_dur': [(drone.row, math.floor(elapsed_duration))],
+                                       'remaining_dur': [(drone.row, math.floor(self.map_data_dict['mission_duration_min'] * 60.0 - elapsed_duration))],
+                                       'lon': [(drone.row, track_lons[-1])],
+                                       'lat': [(drone.row, track_lats[-1])],
+                                       'status': [(drone.row, drone.status)],
+                                       'mission_stat': [(drone.row, mission_stat)]})
+        # Update the location of the ownship
+        self.ownship_data_source.patch({'lon': [(drone.row, track_lons[-1])],
+                                        'lat': [(drone.row, track_lats[-1])],
+                                       })
+        
+        # Extend the track with the new fixes, only the new fixes go out to the browser (the oldest roll off)
+        drone.track_source.stream({'lon': track_lons,
+                                   'lat': track_lats},
+                                  rollover=drone.track_rollover)
+        
+        # Patch the drone extents we're doing math with (for debugging only)
+        self.debug_drone_table_source.patch({'xs': [(drone.row, list(drone.drone_circle.exterior.coords.xy[0]))],
+                                            'ys': [(drone.row, list(drone.drone_circle.exterior.coords.xy[1]))]})
+    
+    def publish_sim_state(self, changed_fires: list) -> None:
+        """
+        Sends the state of the simulation out over the grpc line if it changed.
+
+        Parameters
+        ----------
+        changed_fires : list
+            Ids of the fires that changed shape or were put out since the state was last sent out.
+        """
+        
+        state = viz_connect.SimState(survivors_found=self.survivors_found if self.map_data_dict["map_type"] == MapType.SEARCH_AND_RESCUE else 0,
+                                     water_pct_remaining=self.drones[0].water_pct(self.water_limit),
+                                     fires_pct_remaining=self.fire_pct_remaining,
+                                     radius_of_influence=self.radius_of_influence)
+        for drone_id, drone in sorted(self.drones.items()):
+            state.drones.add(drone_id=drone_id, water_pct_remaining=drone.water_pct(self.water_limit))
+        values = (state.survivors_found, state.fires_pct_remaining, tuple((drone.drone_id, drone.water_pct_remaining) for drone in state.drones))
+        if(len(changed_fires) == 0 and values == self.last_sim_state):
+            return
+        self.last_sim_state = values
+        self.sim_state_version += 1
+        self.sim_state_channel.publish(state.survivors_found, state.fires_pct_remaining, state.water_pct_remaining,
+                                       [(drone.drone_id, drone.water_pct_remaining) for drone in state.drones],
+                                       self.fires.polygons, changed_fires)
+        
+        for idx in changed_fires:
+            if idx in self.fires:
+                perimeter = self.fires[idx].exterior.coords.xy
+                state.changed_fires.add(id=idx, longitude=perimeter[0], latitude=perimeter[1])
             else:
-                self.snr_intersections(drone_circle)
-                
-            # Patch the drone extents we're doing math with (for debugging only)
-            self.debug_drone_table_source.patch({'xs': [(0, list(drone_circle.exterior.coords.xy[0]))],
-                                                'ys': [(0, list(drone_circle.exterior.coords.xy[1]))]})           
-            
-        except Empty:
-            pass
+                state.extinguished_fires.append(idx)
+        self.qSimState.put(state)
+    
+    def log_backlog(self, latest_time: int, processed: int) -> None:
+        """
+        Logs how far behind the student code we are, and what was dropped or coalesced to keep up (at most once a second, and only when we are behind).
+
+        Parameters
+        ----------
+        latest_time : int
+            Time when the latest location that was processed was observed in ms.
+        processed : int
+            How many locations were processed this time around.
+        """
+        
+        backlog = len(self.location_ring)
+        # The student code stamps the locations with its wall clock in ms
+        lag = time.time() - latest_time/1000.0
+        now = time.monotonic()
+        overflow = (self.location_ring.dropped, self.coalesced_locations)
+        if((backlog > 0 or lag > self.lag_warning or overflow != self.logged_overflow) and now - self.last_backlog_log > 1.0):
+            log.info(" --- Falling behind: processed {} locations, {} still queued, {:.0f} ms behind, {} dropped and {} coalesced so far".format(
+                processed, backlog, lag * 1000.0, overflow[0], overflow[1]))
+            self.last_backlog_log = now
+            self.logged_overflow = overflow
         
     def flatten(self, x: list) -> list:
         """
@@ -655,136 +1111,118 @@ class Data(VisualizationSharedDataStore):
             Circle with center at the given point and with the given radius.
         """
         
-        # I don't 100% know how this works, but it clearly does...
+        # The ring is computed analytically on the same sphere the azimuthal projection used to buffer on
         # https://gis.stackexchange.com/questions/367496/plot-a-circle-with-a-given-radius-around-points-on-map-using-python
         lon, lat = point_coord
+        return Polygon(geodesy.point_to_ring(float(lon), float(lat), radius))
+    
+    def points_to_circles(self, lons: list, lats: list, radius: float) -> list:
+        """
+        Draws a polygon circle around each of the given points in one vectorized pass.
+
+        Parameters
+        ----------
+        lons : list
+            The longitudes of the points which should be the centers of the circles.
+        lats : list
+            The latitudes of the points which should be the centers of the circles.
+        radius : float
+            The radius to use for the circles.
 
-        # Create some projections in other coordinate systems for ourselves.
-        local_azimuthal_projection = "+proj=aeqd +R=6371000 +units=m +lat_0={} +lon_0={}".format(
-            lat, lon
-        )
-        wgs84_to_aeqd = partial(
-            pyproj.transform,
-            pyproj.Proj("+proj=longlat +datum=WGS84 +no_defs"),
-            pyproj.Proj(local_azimuthal_projection),
-        )
-        aeqd_to_wgs84 = partial(
-            pyproj.transform,
-            pyproj.Proj(local_azimuthal_projection),
-            pyproj.Proj("+proj=longlat +datum=WGS84 +no_defs"),
-        )
-
-        # Convert to a convenient coordinate system for the math and convert back when we're done.
-        center = Point(float(lon), float(lat))
-        point_transformed = transform(wgs84_to_aeqd, center)
-        buffer = point_transformed.buffer(radius)
-        polygon = transform(aeqd_to_wgs84, buffer)
-        # Get the polygon with lat lon coordinates
-        return polygon
+        Returns
+        -------
+        list
+            Circles (Polygons) with centers at the given points and with the given radius.
+        """
+        
+        return geodesy.points_to_circles(lons, lats, radius)
     
-    def fire_suppression_intersections(self, drone_circle: Polygon, time_location_observed: int) -> None:
+    def fire_suppression_intersections(self, drone: DroneState, drone_circle: Polygon, time_location_observed: int, candidates: list = None) -> None:
         """
         Checks if the drone is over fire/water, updates the fire display, and does the fire/water scoring.
 
         Parameters
         ----------
+        drone : DroneState
+            The drone (carries its own water).
         drone_circle : Polygon
             The circle representing the area of influence of the drone.
         time_location_observed : int
             The time when the given location was observed.
+        candidates : list, optional
+            Ids of the fires the drone could be over (from a batched index query), by default None (look them up).
         """
         
         #### Fire
         # Get which polygons of interest the drone intersects with (couple be multiple)
-        object_indeces = self.check_drone_location_against_object_of_interest(drone_circle, self.polygons_of_interest)
-        
-        # Need to calculate what the fire area will be after this for scoring
-        fire_area_now = 0
+        object_indeces = self.check_drone_location_against_object_of_interest(drone_circle, self.fires.index, candidates)
         
         # If we're intersecting with fires and we have water, do some firefighting
-        if(len(object_indeces) > 0 and self.water_quantity > 0):
+        if(len(object_indeces) > 0 and drone.water_quantity > 0):
             # If we didn't come from a fire, make sure to record when we first started fighting
-            if(self.fire_last_observed_time == -1):
-                self.fire_last_observed_time = time_location_observed
+            if(drone.fire_last_observed_time == -1):
+                drone.fire_last_observed_time = time_location_observed
                 
             for idx in object_indeces:
                 # Make sure the fire fighting isn't over-powered
                 polygon_reduction_factor = 0.05
-                if(self.water_quantity > ((time_location_observed - self.fire_last_observed_time)/1000.0) * self.water_per_second):
+                if(drone.water_quantity > ((time_location_observed - drone.fire_last_observed_time)/1000.0) * self.water_per_second):
                     # If we have more water than we can deposit in this time segment, shrink by maximum for the time
                     # and recalculate our water reserves
-                    self.polygons_of_interest[idx] = self.shrink_shapely_polygon(self.polygons_of_interest[idx], 
-                                                                                 polygon_reduction_factor * ((time_location_observed - self.fire_last_observed_time)/1000.0))
+                    polygon = self.shrink_shapely_polygon(self.fires[idx], 
+                                                          polygon_reduction_factor * ((time_location_observed - drone.fire_last_observed_time)/1000.0))
                 
-                    self.water_quantity -= ((time_location_observed - self.fire_last_observed_time)/1000.0) * self.water_per_second
+                    drone.water_quantity -= ((time_location_observed - drone.fire_last_observed_time)/1000.0) * self.water_per_second
                 else:
                     # If this is the last of our water, use up all of the water and calculate how much that would shrink the fire by
-                    factor = self.water_quantity * polygon_reduction_factor
-                    self.polygons_of_interest[idx] = self.shrink_shapely_polygon(self.polygons_of_interest[idx], 
-                                                                                 factor)
-                    self.water_quantity = 0
+                    factor = drone.water_quantity * polygon_reduction_factor
+                    polygon = self.shrink_shapely_polygon(self.fires[idx], 
+                                                          factor)
+                    drone.water_quantity = 0
                     
-                if(self.polygons_of_interest[idx].is_empty or self.polygons_of_interest[idx].area*6370**2 < 0.01):
-                    # If a fire has been fully extinguished, make sure to patch it out of the data table
-                    [x for i, x in enumerate(self.fires_table_source.data) if i != idx]
-                    self.fires_table_source.data = {'xs': [x for i, x in enumerate(self.fires_table_source.data['xs']) if i != idx],
-                                                    'ys': [x for i, x in enumerate(self.fires_table_source.data['ys']) if i != idx],
-                                                    'fill_color': [x for i, x in enumerate(self.fires_table_source.data['fill_color']) if i != idx],
-                                                    'alpha': [x for i, x in enumerate(self.fires_table_source.data['alpha']) if i != idx]}
-                    # And remove it from the list of objects we check intersections against
-                    self.polygons_of_interest.pop(idx)
+                # Only the fires we touched change the fire area for scoring
+                new_area = self.fire_area(polygon)
+                
+                if(polygon.is_empty or new_area < 0.01):
+                    # If a fire has been fully extinguished, stop checking intersections against it.
+                    # Its id (row) stays put, so the other fires hit in this step aren't affected.
+                    self.fires.extinguish(idx)
                 else:
-                    # If a fire is still around after this, update the perimeter points
-                    self.fires_table_source.patch({ 'xs': [(idx, list(self.polygons_of_interest[idx].exterior.coords.xy[0]))],
-                                                    'ys': [(idx, list(self.polygons_of_interest[idx].exterior.coords.xy[1]))]})
+                    self.fires.update(idx, polygon, new_area)
+                # Either way its row gets patched in once the queued up locations are done
+                self.dirty_fires.add(idx)
             
             # Note the time we were last over fire
-            self.fire_last_observed_time = time_location_observed
+            drone.fire_last_observed_time = time_location_observed
             
         else:
             # Didn't see fire, so clear the last time
-            self.fire_last_observed_time = -1
+            drone.fire_last_observed_time = -1
             
-        # Recalculate the fire area for scoring
-        for poly in self.polygons_of_interest:
-            fire_area_now += poly.area*6370**2 
-        
         #### Water
-        # left sjoin on position in order to check if the points are in the waterbodies
+        # Check if any of our area of influence is over water
         # https://gis.stackexchange.com/questions/208546/check-if-a-point-falls-within-a-multipolygon-with-python
-        # Solution 4
-        # Massage the drone perimeter data into the right data frame
-        points_world = gpd.GeoDataFrame({'notes': ['drone'], 'geometry': [
-            drone_circle
-            ]}, crs="EPSG:4326")
-
-        # Get which points are in water
-        pointInWaterbodies = gpd.sjoin(points_world, self.waterbodies, how='left')
-        groupedInWaterbodies = pointInWaterbodies.groupby('index_right')
-        
-        if(len(groupedInWaterbodies.groups) > 0):
+        if(self.water_query.intersects(drone_circle)):
             # Figure out how much water we picked if any of our points of influence are over water
-            if(self.water_start_time == -1):
+            if(drone.water_start_time == -1):
                 # Note when we started collecting water
-                self.water_start_time = time_location_observed
-            self.water_quantity = (time_location_observed - self.water_start_time)/1000 * 10  # 10 gallons/sec
+                drone.water_start_time = time_location_observed
+            drone.water_quantity = (time_location_observed - drone.water_start_time)/1000 * 10  # 10 gallons/sec
             # Make sure we don't take on more water than we can carry
-            self.water_quantity = (self.water_limit 
-                                   if self.water_quantity > self.water_limit 
-                                   else self.water_quantity)
-            # Patch in our current water quantity
-            self.stats_table_source.patch({'mission_stat': [(0, self.water_quantity/10.0)]})
+            drone.water_quantity = (self.water_limit 
+                                    if drone.water_quantity > self.water_limit 
+                                    else drone.water_quantity)
         else:
             # Reset water observation time if didn't see water
-            self.water_start_time = -1
+            drone.water_start_time = -1
         
         
-        # Patch in the score and the mission statistics
-        self.fire_pct_remaining = fire_area_now/float(self.starting_fire_area) * 100.0
-        self.stats_table_source.patch({'score': [(0, 100.0 - self.fire_pct_remaining)]})
-        self.stats_table_source.patch({'mission_stat': [(0, self.water_quantity/10.0)]})
+        # Keep the score up to date (it gets patched in with the rest of the mission statistics)
+        self.fire_pct_remaining = (self.fires.area_now/float(self.starting_fire_area) * 100.0
+                                   if self.starting_fire_area > 0
+                                   else 0.0)
     
-    def snr_intersections(self, drone_circle: Polygon) -> None:
+    def snr_intersections(self, lons: list, lats: list) -> None:
         """
         Checks if the drone can "see" any of the survivors.
 
@@ -792,26 +1230,21 @@ class Data(VisualizationSharedDataStore):
 
         Parameters
         ----------
-        drone_circle : Polygon
-            Polygon representing the area of influence of the drone.
-        """
-        
-        # Get the indeces of survivors that intersect with the drone (could be multiple)
-        object_indeces = self.check_drone_location_against_object_of_interest(drone_circle, self.polygons_of_interest)
-        for idx in object_indeces:
-            if self.survivors_table_source.data['alpha'][idx] == 0:
-                # Make sure to only count the found survivors once (using their visibility as the marked)
-                self.survivors_found = self.survivors_found + 1
-                # Since this survivor hasn't already been marked, that means we're finding the person for the first time, so
-                # mark them. This way we won't pay attention to them further.
-                self.survivors_table_source.patch({'alpha': [(idx, 1)]});
-            
-        # Patch in the score and the mission statistics
-        # self.stats_table_source.patch({'mission_stat': [(0, self.survivors_found/float(len(self.map_data_dict["data_snr"]['x']))*100.0)]})
-        self.stats_table_source.patch({'mission_stat': [(0, self.survivors_found)]})
-        self.stats_table_source.patch({'score': [(0, self.survivors_found)]})
+        lons : list
+            Longitudes the drone was at.
+        lats : list
+            Latitudes the drone was at.
+        """
+        
+        # Get the indeces of survivors the drone can see for the first time (could be multiple).
+        # The index marks them found, so they only get counted once.
+        new_survivors = self.survivor_index.find_many(lons, lats, self.radius_of_influence + self.survivor_radius)
+        if(len(new_survivors) > 0):
+            self.survivors_found = self.survivors_found + len(new_survivors)
+            # Light them up the next time the display gets patched
+            self.found_survivors.extend(int(idx) for idx in new_survivors)
 
-    def check_drone_location_against_object_of_interest(self, drone_circle: Polygon, objects: list) -> list:
+    def check_drone_location_against_object_of_interest(self, drone_circle: Polygon, objects: ObjectIndex, candidates: list = None) -> list:
         """
         Checks if the drone location intersects with any of the given polygons.
 
@@ -819,8 +1252,10 @@ class Data(VisualizationSharedDataStore):
         ----------
         drone_circle : Polygon
             The drone's area of influence.
-        objects : list
-            The list of Polygons that represent the objects of interest and what to compare the drone's location to.
+        objects : ObjectIndex
+            The spatial index over the Polygons that represent the objects of interest and what to compare the drone's location to.
+        candidates : list, optional
+            Ids of the objects that could intersect (from a batched index query), by default None (look them up).
 
         Returns
         -------
@@ -828,19 +1263,26 @@ class Data(VisualizationSharedDataStore):
             The list of indeces of objects of interest that intersect with the drone's area of influence.
         """
         # https://stackoverflow.com/questions/14697442/faster-way-of-polygon-intersection-with-shapely/1404366
-        # Create R-tree
-        idx = index.Index()
-        # Populate R-tree index with bounds of objects of interest (ooi)
-        for pos, ooi in enumerate(objects):
-            # assuming ooi is a shapely object
-            idx.insert(pos, ooi.bounds)
-        
-        # Collect the indeces of all intersecting objects
-        object_indeces = []
-        for pos in idx.intersection(drone_circle.bounds):
-            object_indeces.append(pos)
-        
-        return object_indeces
+        # The R-tree narrows things down to bounding box hits, which then get checked against the exact geometry
+        return objects.query(drone_circle, candidates)
+    
+    def fire_area(self, polygon: Polygon) -> float:
+        """
+        Figures out the area of the ground covered by a fire.
+
+        Parameters
+        ----------
+        polygon : Polygon
+            The fire.
+
+        Returns
+        -------
+        float
+            The area of the fire.
+        """
+        
+        # Polygon x/y are in lat lon, so need the radius of earth to convert to meters
+        return polygon.area*6370**2
     
     def shrink_shapely_polygon(self, my_polygon: Polygon, factor: float=0.10) -> Polygon:
         
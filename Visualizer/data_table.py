@@ -97,7 +97,8 @@ class VizDataTable(VisualizationSharedDataStore):
                                     sizing_mode="stretch_both",
                                     autosize_mode="fit_viewport")
         self.stats_table = DataTable(source=self.Viz.data.stats_table_source,
-                                     columns=[TableColumn(field="elapsed_dur", title="Elapsed Time (sec)"),
+                                     columns=[TableColumn(field="drone_id", title="Drone"),
+                                              TableColumn(field="elapsed_dur", title="Elapsed Time (sec)"),
                                               TableColumn(field="remaining_dur", title="Remaining Time (sec)"),
                                               TableColumn(field="mission_stat", title="Num Survivors Found" 
                                                           if self.Viz.data.map_data_dict["map_type"] == MapType.SEARCH_AND_RESCUE 
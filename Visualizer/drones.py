@@ -0,0 +1,88 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Bokeh visualization
+from bokeh.models import ColumnDataSource
+
+
+class DroneState(object):
+    """
+    Everything the Visualizer keeps track of for one of the drones.
+
+    The fires, waterbodies and survivors are shared by all of the drones, but each of them
+    carries its own water, has its own area of influence, flies its own track and has its
+    own row in the mission statistics, ownship and debug tables.
+
+    Attributes
+    ----------
+    drone_id : int
+        Id of the drone (as it comes over the grpc line).
+    row : int
+        Row of the drone in the mission statistics, ownship and debug tables (None until it's shown).
+    start_time : float
+        Time when the drone took off in s (-1 means it hasn't taken off yet).
+    water_quantity : float
+        Current water quantity.
+    water_start_time : int
+        Time when the drone started collecting water in ms (-1 means it was most recently observed over land).
+    fire_last_observed_time : int
+        Time when the drone was last observed over fire in ms (-1 means it hasn't seen fire).
+    drone_circle : shapely.Polygon
+        Latest area of influence of the drone.
+    status : str
+        What the drone is doing (as shown in the mission statistics).
+    track_rollover : int
+        Maximum number of fixes of the track kept and drawn.
+    track_source : bokeh.models.ColumnDataSource
+        Data source to drive the drawing of the drone's track (streamed to, keeps at most track_rollover fixes).
+
+    Methods
+    -------
+    water_pct(water_limit: float)
+        Gets the percentage of the water capacity the drone is carrying.
+    """
+
+    def __init__(self, drone_id: int, track_rollover: int) -> None:
+        """
+        Makes the state of a drone that hasn't taken off yet.
+
+        Parameters
+        ----------
+        drone_id : int
+            Id of the drone (as it comes over the grpc line).
+        track_rollover : int
+            Maximum number of fixes of the track to keep and draw.
+        """
+
+        self.drone_id = drone_id
+        self.row = None
+        self.start_time = -1
+        self.water_quantity = 0
+        self.water_start_time = -1
+        self.fire_last_observed_time = -1
+        self.drone_circle = None
+        self.status = ""
+        self.track_rollover = max(int(track_rollover), 1)
+        self.track_source = ColumnDataSource({
+                'lon': [],
+                'lat': []
+                })
+
+    def water_pct(self, water_limit: float) -> float:
+        """
+        Gets the percentage of the water capacity the drone is carrying.
+
+        Parameters
+        ----------
+        water_limit : float
+            How much water the drone can carry.
+
+        Returns
+        -------
+        float
+            The percentage of the water capacity.
+        """
+
+        return self.water_quantity / float(water_limit) * 100.0
@@ -0,0 +1,105 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+# Shape tools
+from shapely.geometry import Polygon
+from spatial_index import ObjectIndex
+
+
+class FireStore(object):
+    """
+    The fires that are still burning, keyed by stable ids.
+
+    A fire's id is the row it was given in the fires data source when the map loaded and
+    never changes, so putting a fire out only forgets that one id (and the display only
+    needs that one row patched) instead of shifting every fire after it.
+
+    Attributes
+    ----------
+    polygons : dict
+        Shape of each of the fires that are still burning keyed by their id.
+    areas : dict
+        Area of the ground covered by each of the fires that are still burning keyed by their id.
+    index : ObjectIndex
+        Spatial index over the fires that are still burning.
+    starting_area : float
+        Area of the ground covered by all of the fires when the map loaded.
+    area_now : float
+        Area of the ground covered by all of the fires that are still burning.
+
+    Methods
+    -------
+    update(fire_id: int, polygon: Polygon, area: float)
+        Replaces the shape of a fire.
+    extinguish(fire_id: int)
+        Puts a fire out.
+    """
+
+    def __init__(self, polygons: list, areas: list, bounds: np.ndarray = None) -> None:
+        """
+        Makes the store.
+
+        Parameters
+        ----------
+        polygons : list
+            Shapes of the fires, their position in the list is used as their id.
+        areas : list
+            Area of the ground covered by each of the fires (same order as polygons).
+        bounds : numpy.ndarray, optional
+            Bounds (minx, miny, maxx, maxy) of each of the fires if they're already known, by default None.
+        """
+
+        self.polygons = dict(enumerate(polygons))
+        self.areas = dict(enumerate(areas))
+        self.index = ObjectIndex(polygons, bounds)
+        self.starting_area = sum(self.areas.values())
+        # Running total of the fire area, only adjusted for the fires that change
+        self.area_now = self.starting_area
+
+    def __len__(self) -> int:
+        return len(self.polygons)
+
+    def __contains__(self, fire_id: int) -> bool:
+        return fire_id in self.polygons
+
+    def __getitem__(self, fire_id: int) -> Polygon:
+        return self.polygons[fire_id]
+
+    def update(self, fire_id: int, polygon: Polygon, area: float) -> None:
+        """
+        Replaces the shape of a fire.
+
+        Parameters
+        ----------
+        fire_id : int
+            Id of the fire.
+        polygon : Polygon
+            New shape of the fire.
+        area : float
+            Area of the ground covered by the new shape.
+        """
+
+        self.area_now -= self.areas[fire_id]
+        self.area_now += area
+        self.areas[fire_id] = area
+        self.polygons[fire_id] = polygon
+        self.index.update(fire_id, polygon)
+
+    def extinguish(self, fire_id: int) -> None:
+        """
+        Puts a fire out, so it no longer counts towards the fire area or shows up in queries.
+
+        Parameters
+        ----------
+        fire_id : int
+            Id of the fire.
+        """
+
+        self.area_now -= self.areas.pop(fire_id)
+        self.polygons.pop(fire_id)
+        self.index.remove(fire_id)
@@ -0,0 +1,113 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+"""
+Geodesic helpers for turning lat/lon points into intersectable circles.
+
+The circles are computed analytically on a sphere of radius EARTH_RADIUS_M, which is
+the same thing the local azimuthal equidistant projection (+proj=aeqd +R=6371000) did
+when it was used to buffer every point, just without building any projections.
+"""
+
+# Shape tools
+from shapely.geometry import Point, Polygon
+
+# Math
+import numpy as np
+
+
+# Radius of the sphere the circles are drawn on (in m)
+EARTH_RADIUS_M = 6371000.0
+
+# Unit circle with the same vertices (and vertex order) that shapely's Point.buffer makes.
+# Computed once so that every circle afterwards is just a bit of trigonometry.
+_UNIT_RING = np.asarray(Point(0.0, 0.0).buffer(1.0).exterior.coords)
+# Azimuth (clockwise from north) of each of the vertices of the unit circle
+_RING_AZIMUTHS = np.arctan2(_UNIT_RING[:, 0], _UNIT_RING[:, 1])
+_SIN_AZ = np.sin(_RING_AZIMUTHS)
+_COS_AZ = np.cos(_RING_AZIMUTHS)
+
+
+def points_to_rings(lons, lats, radius: float) -> np.ndarray:
+    """
+    Draws a circle with the given radius around each of the given points in one vectorized pass.
+
+    Parameters
+    ----------
+    lons : array-like
+        Longitudes of the circle centers in degrees (N values).
+    lats : array-like
+        Latitudes of the circle centers in degrees (N values).
+    radius : float
+        Radius of the circles in meters.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (N, M, 2) with the closed lon/lat ring of each circle.
+    """
+
+    lon1 = np.radians(np.asarray(lons, dtype=float)).reshape(-1, 1)
+    lat1 = np.radians(np.asarray(lats, dtype=float)).reshape(-1, 1)
+
+    # Angular distance of the perimeter from the center
+    angle = radius / EARTH_RADIUS_M
+    sin_angle = np.sin(angle)
+    cos_angle = np.cos(angle)
+
+    # Destination point given a start point, an azimuth and a distance (spherical inverse aeqd)
+    # https://www.movable-type.co.uk/scripts/latlong.html
+    sin_lat1 = np.sin(lat1)
+    cos_lat1 = np.cos(lat1)
+    sin_lat2 = sin_lat1 * cos_angle + cos_lat1 * sin_angle * _COS_AZ
+    lat2 = np.arcsin(np.clip(sin_lat2, -1.0, 1.0))
+    lon2 = lon1 + np.arctan2(_SIN_AZ * sin_angle * cos_lat1,
+                             cos_angle - sin_lat1 * sin_lat2)
+
+    return np.stack((np.degrees(lon2), np.degrees(lat2)), axis=-1)
+
+
+def point_to_ring(lon: float, lat: float, radius: float) -> np.ndarray:
+    """
+    Draws a circle with the given radius around a single point.
+
+    Parameters
+    ----------
+    lon : float
+        Longitude of the circle center in degrees.
+    lat : float
+        Latitude of the circle center in degrees.
+    radius : float
+        Radius of the circle in meters.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (M, 2) with the closed lon/lat ring of the circle.
+    """
+
+    return points_to_rings((lon,), (lat,), radius)[0]
+
+
+def points_to_circles(lons, lats, radius: float) -> list:
+    """
+    Draws a circle polygon with the given radius around each of the given points.
+
+    Parameters
+    ----------
+    lons : array-like
+        Longitudes of the circle centers in degrees.
+    lats : array-like
+        Latitudes of the circle centers in degrees.
+    radius : float
+        Radius of the circles in meters.
+
+    Returns
+    -------
+    list
+        List of shapely Polygons (one per point).
+    """
+
+    return [Polygon(ring) for ring in points_to_rings(lons, lats, radius)]
@@ -8,13 +8,122 @@ import viz_pb2 as viz_connect
 import viz_pb2_grpc as viz_connect_grpc
 
 # Multiprocessing
+import asyncio
 import multiprocessing
+import threading
 from multiprocessing import Queue
 from concurrent import futures
+from typing import Iterator
+from shared_ring import SharedRing
+
+# Math
+import numpy as np
 
 # Bokeh visualization
 from bokeh.util.logconfig import bokeh_logger as log
 
+# Let the student code ping the connection to keep it alive, even while it isn't sending anything
+SERVER_OPTIONS = [('grpc.keepalive_permit_without_calls', 1),
+                  ('grpc.http2.min_ping_interval_without_data_ms', 5000),
+                  ('grpc.http2.max_pings_without_data', 0)]
+
+# Where the student code connects to by default
+DEFAULT_PORT = 51052
+
+# Each drone the student code flies keeps two streams open (WatchSimState and StreamDroneLocations),
+# and each open stream holds on to a worker thread for as long as it's open
+STREAMS_PER_DRONE = 2
+# Worker threads always left for the takeoff, landing and other one-off calls
+SPARE_WORKERS = 4
+# How many drones the worker threads are sized for if nobody says
+DEFAULT_DRONES = 5
+
+
+def default_workers(drones: int = DEFAULT_DRONES) -> int:
+    """
+    Gets how many worker threads the grpc server needs for the given number of drones.
+
+    Parameters
+    ----------
+    drones : int, optional
+        How many drones the student code flies at once, by default DEFAULT_DRONES.
+
+    Returns
+    -------
+    int
+        Enough worker threads for the streams of every drone, plus SPARE_WORKERS for everything else.
+    """
+    
+    return STREAMS_PER_DRONE * drones + SPARE_WORKERS
+
+
+def server_options(max_streams: int = None, max_message_size: int = None, keepalive_ms: int = None) -> list:
+    """
+    Gets the channel options for the grpc server.
+
+    Parameters
+    ----------
+    max_streams : int, optional
+        Most calls that can be open at once on a connection, by default None (grpc's default).
+    max_message_size : int, optional
+        Biggest message that can be sent or received in bytes, by default None (grpc's default, 4 MB).
+    keepalive_ms : int, optional
+        How often the server pings the student code while the connection is quiet in ms, by default None (grpc's default).
+
+    Returns
+    -------
+    list
+        The options (name, value) to make the server with.
+    """
+    
+    options = list(SERVER_OPTIONS)
+    if max_streams is not None:
+        options.append(('grpc.max_concurrent_streams', max_streams))
+    if max_message_size is not None:
+        options.append(('grpc.max_receive_message_length', max_message_size))
+        options.append(('grpc.max_send_message_length', max_message_size))
+    if keepalive_ms is not None:
+        options.append(('grpc.keepalive_time_ms', keepalive_ms))
+    return options
+
+def listen(server, port: int = DEFAULT_PORT, uds: str = None) -> None:
+    """
+    Tells the grpc server where to listen.
+
+    Parameters
+    ----------
+    server : grpc.Server or grpc.aio.Server
+        The server.
+    port : int, optional
+        TCP port to listen on (on every interface), by default DEFAULT_PORT.
+    uds : str, optional
+        Path of a Unix domain socket to also listen on (skips the TCP stack for student code on the same machine), by default None.
+    """
+    
+    server.add_insecure_port('[::]:' + str(port))
+    if uds is not None:
+        server.add_insecure_port('unix:' + uds)
+        log.info(" -- INIT GRPC: also listening on unix:" + uds)
+
+def batch_error(request: viz_connect.LocationBatch) -> str:
+    """
+    Checks that a batch of locations has as many latitudes as longitudes and times.
+
+    Parameters
+    ----------
+    request : viz_connect.LocationBatch
+        The batch that came over the line.
+
+    Returns
+    -------
+    str
+        What's wrong with the batch, or None if nothing is.
+    """
+    
+    if(len(request.latitude) == len(request.longitude) == len(request.time)):
+        return None
+    return "LocationBatch needs as many latitudes, longitudes and times, got {}, {} and {}".format(
+        len(request.latitude), len(request.longitude), len(request.time))
 
 class Momentum22VizServicer(viz_connect_grpc.Momentum22VizServicer):
     """
@@ -22,40 +131,83 @@ class Momentum22VizServicer(viz_connect_grpc.Momentum22VizServicer):
     
     Attributes
     ----------
-    qLanding : multiprocessing.Queue
-        Queue where to put the messages coming over the line.
-    qTakeoff : multiprocessing.Queue
-        Queue where to put the messages coming over the line.
-    qLocation : multiprocessing.Queue
-        Queue where to put the messages coming over the line.
+    landing_ring : SharedRing
+        Ring where to put the messages coming over the line.
+    takeoff_ring : SharedRing
+        Ring where to put the messages coming over the line.
+    location_ring : SharedRing
+        Ring where to put the messages coming over the line.
+    qSimState : multiprocessing.Queue
+        Queue where the Visualizer puts the changes to the state of the simulation.
+    sim_state : viz_connect.SimState
+        Latest state of the simulation (without any fires).
+    fire_polygons : dict
+        Fires that are still burning keyed by their id, with the version they last changed in.
+    extinguished_fires : dict
+        Version each of the fires that were put out was put out in, keyed by their id.
+    sim_state_changed : threading.Condition
+        Lets the watchers know that the state of the simulation changed.
+    workers : int
+        How many worker threads the server has (None if streams don't hold on to any).
+    stream_slots : threading.BoundedSemaphore
+        How many more streams can be opened while leaving SPARE_WORKERS worker threads for the one-off calls (None if there's no limit).
     
     Methods
     -------
     SetLandingStatus(request: viz_connect.LandingNotification, context: (unused))
-        Gets the landing status from the grpc connection, puts it into the appropriate queue and replies back with the acknowledgement.
+        Gets the landing status from the grpc connection, puts it into the appropriate ring and replies back with the acknowledgement.
     SetTakeoffStatus(request: viz_connect.TakeoffNotification, context: (unused))
-        Gets the takeoff status from the grpc connection, puts it into the appropriate queue and replies back with the acknowledgement.
+        Gets the takeoff status from the grpc connection, puts it into the appropriate ring and replies back with the acknowledgement.
     SetDroneLocation(request: viz_connect.Location, context: (unused))
-        Gets the drone location from the grpc connection, puts it into the appropriate queue and replies back with the acknowledgement.
+        Gets the drone location from the grpc connection, puts it into the appropriate ring and replies back with the acknowledgement.
+    StreamDroneLocations(request_iterator: Iterator[viz_connect.Location], context: (unused))
+        Gets the drone locations from a long-lived grpc stream, puts them into the appropriate ring and replies back with the acknowledgement once the stream closes.
+    SetDroneLocationBatch(request: viz_connect.LocationBatch, context: grpc.ServicerContext)
+        Gets a batch of drone locations from the grpc connection, puts it into the appropriate ring as one unit and replies back with the acknowledgement.
+    WatchSimState(request: viz_connect.WatchRequest, context: grpc.ServicerContext)
+        Streams the state of the simulation to the student code as soon as it changes.
+    sim_state_since(sent_version: int)
+        Gets what changed in the state of the simulation since the given version.
+    follow_sim_state()
+        Keeps the state of the simulation up to date with the changes the Visualizer puts in the queue (runs forever).
+    apply_sim_state(update: viz_connect.SimState)
+        Applies a change to the state of the simulation and lets the watchers know.
+    open_stream(context: grpc.ServicerContext)
+        Takes a worker thread for a stream, or turns the stream down if that would leave too few for the one-off calls.
+    close_stream()
+        Gives the worker thread of a stream back.
     """
     
-    def __init__(self, qLanding: Queue, qTakeoff: Queue, qLocation: Queue) -> None:
+    def __init__(self, landing_ring: SharedRing, takeoff_ring: SharedRing, location_ring: SharedRing, qSimState: Queue = None,
+                 workers: int = None) -> None:
         """ 
         Makes the grpc servicer.
 
         Parameters
         ----------
-        qLanding : multiprocessing.Queue
-            Queue where to put landing notifications.
-        qTakeoff : multiprocessing.Queue
-            Queue where to put takeoff notifications.
-        qLocation : multiprocessing.Queue
-            Queue where to put position (location) notifications.
+        landing_ring : SharedRing
+            Ring where to put landing notifications.
+        takeoff_ring : SharedRing
+            Ring where to put takeoff notifications.
+        location_ring : SharedRing
+            Ring where to put position (location) notifications.
+        qSimState : multiprocessing.Queue, optional
+            Queue where the Visualizer puts the changes to the state of the simulation, by default None.
+        workers : int, optional
+            How many worker threads the server has, by default None (streams don't hold on to any).
         """
         
-        self.qLanding = qLanding
-        self.qTakeoff = qTakeoff
-        self.qLocation = qLocation
+        self.landing_ring = landing_ring
+        self.takeoff_ring = takeoff_ring
+        self.location_ring = location_ring
+        self.qSimState = qSimState
+        
+        self.sim_state = viz_connect.SimState()
+        self.fire_polygons = {}
+        self.extinguished_fires = {}
+        self.sim_state_changed = threading.Condition()
+        self.workers = workers
+        self.stream_slots = None if workers is None else threading.BoundedSemaphore(max(workers - SPARE_WORKERS, 1))
     
     
     
@@ -77,7 +229,7 @@ class Momentum22VizServicer(viz_connect_grpc.Momentum22VizServicer):
         """
         
         ack = viz_connect.ReqAck(msgId = request.msgId)
-        self.qLanding.put(request)
+        self.landing_ring.put((request.msgId, request.isLanded, request.time, request.drone_id))
         return ack
     
     def SetTakeoffStatus(self, request: viz_connect.TakeoffNotification, context) -> viz_connect.ReqAck:
@@ -98,7 +250,7 @@ class Momentum22VizServicer(viz_connect_grpc.Momentum22VizServicer):
         """
         
         ack = viz_connect.ReqAck(msgId = request.msgId)
-        self.qTakeoff.put(request)
+        self.takeoff_ring.put((request.msgId, request.isTakenOff, request.time, request.drone_id))
         return ack
     
     def SetDroneLocation(self, request:viz_connect.Location, context) -> viz_connect.ReqAck:
@@ -119,33 +271,362 @@ class Momentum22VizServicer(viz_connect_grpc.Momentum22VizServicer):
         """
         
         ack = viz_connect.ReqAck(msgId = request.msgId)
-        self.qLocation.put(request)
+        self.location_ring.put((request.msgId, request.latitude, request.longitude, request.time, request.drone_id))
+        return ack
+    
+    def StreamDroneLocations(self, request_iterator: Iterator[viz_connect.Location], context) -> viz_connect.ReqAck:
+        """
+        Processes the stream of messages that set the Drone Location in the Visualizer.
+        
+        The student code holds the stream open for the whole mission, so each location is
+        queued up as soon as it arrives without a round trip for an acknowledgement.
+
+        Parameters
+        ----------
+        request_iterator : Iterator[viz_connect.Location]
+            The requests that come over the line to set the Drone Location.
+        context : [type]
+            unused
+
+        Returns
+        -------
+        viz_connect.ReqAck
+            The acknowledgement of receipt of the last message in the stream
+        """
+        
+        self.open_stream(context)
+        try:
+            ack = viz_connect.ReqAck()
+            for request in request_iterator:
+                self.location_ring.put((request.msgId, request.latitude, request.longitude, request.time, request.drone_id))
+                ack.msgId = request.msgId
+            return ack
+        finally:
+            self.close_stream()
+    
+    def SetDroneLocationBatch(self, request: viz_connect.LocationBatch, context) -> viz_connect.ReqAck:
+        """
+        Processes the message that sets a batch of Drone Locations in the Visualizer.
+        
+        The batch goes into the location ring column by column, so it crosses over to the
+        Visualizer in one go and gets scored in one go. A batch whose columns aren't all the
+        same length is turned down (INVALID_ARGUMENT) without any of it being queued.
+
+        Parameters
+        ----------
+        request : viz_connect.LocationBatch
+            The request that came over the line to set the Drone Locations.
+        context : grpc.ServicerContext
+            Used to turn down a malformed batch.
+
+        Returns
+        -------
+        viz_connect.ReqAck
+            The acknowledgement of receipt of the message
+        """
+        
+        error = batch_error(request)
+        if error is not None:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, error)
+        ack = viz_connect.ReqAck(msgId = request.msgId)
+        if(len(request.time) > 0):
+            self.location_ring.put_many(msgId=request.msgId,
+                                        latitude=request.latitude,
+                                        longitude=request.longitude,
+                                        time=request.time,
+                                        drone_id=request.drone_id)
+        return ack
+    
+    def WatchSimState(self, request: viz_connect.WatchRequest, context: grpc.ServicerContext) -> Iterator[viz_connect.SimState]:
+        """
+        Streams the state of the simulation to the student code as soon as it changes.
+        
+        The first message has all of the fires, the ones after it only have the fires that changed
+        since the previous message (several changes in a row get merged into one message if the
+        student code is slower than the Visualizer).
+
+        Parameters
+        ----------
+        request : viz_connect.WatchRequest
+            The request that came over the line to start watching.
+        context : grpc.ServicerContext
+            Used to find out when the student code hangs up.
+
+        Yields
+        ------
+        viz_connect.SimState
+            The state of the simulation.
+        """
+        
+        self.open_stream(context)
+        try:
+            sent_version = 0
+            while context.is_active():
+                with self.sim_state_changed:
+                    # Wake up every once in a while to check if the student code is still there
+                    if not self.sim_state_changed.wait_for(lambda: self.sim_state.version > sent_version, timeout=1.0):
+                        continue
+                    state = self.sim_state_since(sent_version)
+                    sent_version = state.version
+                yield state
+        finally:
+            self.close_stream()
+    
+    def open_stream(self, context: grpc.ServicerContext) -> None:
+        """
+        Takes a worker thread for a stream, or turns the stream down (RESOURCE_EXHAUSTED) if that would leave too few for the one-off calls.
+        
+        Every open stream holds on to a worker thread, so once they all are the takeoff and landing
+        calls would wait in grpc's queue forever. Better to say so right away.
+
+        Parameters
+        ----------
+        context : grpc.ServicerContext
+            Used to turn the stream down.
+        """
+        
+        if(self.stream_slots is not None and not self.stream_slots.acquire(blocking=False)):
+            message = ("All {} grpc worker threads but {} are held by open streams, two for each drone. "
+                       "Restart the Visualizer with a bigger --drones (or --grpc-workers)").format(self.workers, SPARE_WORKERS)
+            log.error(" --- " + message)
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, message)
+    
+    def close_stream(self) -> None:
+        """
+        Gives the worker thread of a stream back.
+        """
+        
+        if self.stream_slots is not None:
+            self.stream_slots.release()
+    
+    def sim_state_since(self, sent_version: int) -> viz_connect.SimState:
+        """
+        Gets what changed in the state of the simulation since the given version.
+
+        Parameters
+        ----------
+        sent_version : int
+            Version of the state that was last sent (0 to get everything).
+
+        Returns
+        -------
+        viz_connect.SimState
+            The latest state with only the fires that changed since sent_version.
+        """
+        
+        state = viz_connect.SimState()
+        state.CopyFrom(self.sim_state)
+        state.full = (sent_version == 0)
+        state.changed_fires.extend(fire for version, fire in self.fire_polygons.values() if version > sent_version)
+        if not state.full:
+            state.extinguished_fires.extend(fire_id for fire_id, version in self.extinguished_fires.items() if version > sent_version)
+        return state
+    
+    def follow_sim_state(self) -> None:
+        """
+        Keeps the state of the simulation up to date with the changes the Visualizer puts in the queue (runs forever).
+        """
+        
+        while True:
+            self.apply_sim_state(self.qSimState.get())
+    
+    def apply_sim_state(self, update: viz_connect.SimState) -> None:
+        """
+        Applies a change to the state of the simulation and lets the watchers know.
+
+        Parameters
+        ----------
+        update : viz_connect.SimState
+            The change to the state of the simulation (only the fires that changed).
+        """
+        
+        with self.sim_state_changed:
+            version = self.sim_state.version + 1
+            self.sim_state.version = version
+            self.sim_state.survivors_found = update.survivors_found
+            self.sim_state.water_pct_remaining = update.water_pct_remaining
+            self.sim_state.fires_pct_remaining = update.fires_pct_remaining
+            self.sim_state.radius_of_influence = update.radius_of_influence
+            # Every update has all of the drones
+            del self.sim_state.drones[:]
+            self.sim_state.drones.extend(update.drones)
+            for fire in update.changed_fires:
+                self.fire_polygons[fire.id] = (version, fire)
+            for fire_id in update.extinguished_fires:
+                self.fire_polygons.pop(fire_id, None)
+                self.extinguished_fires[fire_id] = version
+            self.sim_state_changed.notify_all()
+    
+class Momentum22VizAioServicer(Momentum22VizServicer):
+    """
+    Makes the GRPC servicer for connecting to the student code that runs on the Visualizer's own event loop.
+    
+    Locations are scored as soon as they come over the line, without going through another
+    process, and takeoff and landing notifications are handed straight to the Visualizer's
+    data (the rings would make the event loop wait on itself if they were full). The display
+    still gets patched by the Visualizer's periodic update.
+    
+    Attributes
+    ----------
+    data : Data
+        The Visualizer's data (where all of the math is).
+    sim_state_waiters : asyncio.Condition
+        Lets the watchers know that the state of the simulation changed.
+    
+    Methods
+    -------
+    put(update: viz_connect.SimState)
+        Takes a change to the state of the simulation from the Visualizer (stands in for the queue used when grpc runs in its own process).
+    """
+    
+    def __init__(self, data) -> None:
+        """
+        Makes the grpc servicer.
+
+        Parameters
+        ----------
+        data : Data
+            The Visualizer's data (where all of the math is).
+        """
+        
+        super().__init__(data.landing_ring, data.takeoff_ring, data.location_ring)
+        self.data = data
+        self.sim_state_waiters = asyncio.Condition()
+    
+    async def SetLandingStatus(self, request: viz_connect.LandingNotification, context) -> viz_connect.ReqAck:
+        self.data.ingest_landing(request.drone_id, request.isLanded)
+        return viz_connect.ReqAck(msgId = request.msgId)
+    
+    async def SetTakeoffStatus(self, request: viz_connect.TakeoffNotification, context) -> viz_connect.ReqAck:
+        self.data.ingest_takeoff(request.drone_id, request.isTakenOff, request.time)
+        return viz_connect.ReqAck(msgId = request.msgId)
+    
+    async def SetDroneLocation(self, request: viz_connect.Location, context) -> viz_connect.ReqAck:
+        self.data.ingest_locations(np.array([request.longitude]),
+                                   np.array([request.latitude]),
+                                   np.array([request.time], dtype=np.uint64),
+                                   np.array([request.drone_id], dtype=np.uint32))
+        return viz_connect.ReqAck(msgId = request.msgId)
+    
+    async def StreamDroneLocations(self, request_iterator, context) -> viz_connect.ReqAck:
+        ack = viz_connect.ReqAck()
+        async for request in request_iterator:
+            self.data.ingest_locations(np.array([request.longitude]),
+                                       np.array([request.latitude]),
+                                       np.array([request.time], dtype=np.uint64),
+                                       np.array([request.drone_id], dtype=np.uint32))
+            ack.msgId = request.msgId
         return ack
     
-def serveGrpc(qLanding: Queue, qTakeoff: Queue, qLocation: Queue) -> None:
+    async def SetDroneLocationBatch(self, request: viz_connect.LocationBatch, context) -> viz_connect.ReqAck:
+        error = batch_error(request)
+        if error is not None:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, error)
+        if(len(request.time) > 0):
+            self.data.ingest_locations(np.asarray(request.longitude, dtype=float),
+                                       np.asarray(request.latitude, dtype=float),
+                                       np.asarray(request.time, dtype=np.uint64),
+                                       np.full(len(request.time), request.drone_id, dtype=np.uint32))
+        return viz_connect.ReqAck(msgId = request.msgId)
+    
+    async def WatchSimState(self, request: viz_connect.WatchRequest, context):
+        sent_version = 0
+        while True:
+            async with self.sim_state_waiters:
+                await self.sim_state_waiters.wait_for(lambda: self.sim_state.version > sent_version)
+                state = self.sim_state_since(sent_version)
+                sent_version = state.version
+            yield state
+    
+    def put(self, update: viz_connect.SimState) -> None:
+        """
+        Takes a change to the state of the simulation from the Visualizer (stands in for the queue used when grpc runs in its own process).
+
+        Parameters
+        ----------
+        update : viz_connect.SimState
+            The change to the state of the simulation (only the fires that changed).
+        """
+        
+        self.apply_sim_state(update)
+        asyncio.ensure_future(self.wake_watchers())
+    
+    async def wake_watchers(self) -> None:
+        async with self.sim_state_waiters:
+            self.sim_state_waiters.notify_all()
+
+# Server running on the Visualizer's event loop (assigned when serve_in_loop is called)
+aio_server = None
+
+async def serve_in_loop(data, port: int = DEFAULT_PORT, uds: str = None, options: list = SERVER_OPTIONS) -> None:
+    """
+    Starts the grpc server on the event loop this is awaited on (the Bokeh server's loop).
+
+    Parameters
+    ----------
+    data : Data
+        The Visualizer's data (where all of the math is).
+    port : int, optional
+        TCP port to listen on, by default DEFAULT_PORT.
+    uds : str, optional
+        Path of a Unix domain socket to also listen on, by default None.
+    options : list, optional
+        Channel options of the server (see server_options), by default SERVER_OPTIONS.
+    """
+    
+    global aio_server
+    servicer = Momentum22VizAioServicer(data)
+    # The state of the simulation goes straight to the servicer, starting from all of the fires
+    data.qSimState = servicer
+    data.last_sim_state = None
+    data.publish_sim_state(list(data.fires.polygons))
+    
+    aio_server = grpc.aio.server(options=options)
+    viz_connect_grpc.add_Momentum22VizServicer_to_server(servicer, aio_server)
+    listen(aio_server, port, uds)
+    await aio_server.start()
+    log.info(" -- INIT GRPC: server started on the Visualizer's event loop")
+
+def serveGrpc(landing_ring: SharedRing, takeoff_ring: SharedRing, location_ring: SharedRing, qSimState: Queue,
+              port: int = DEFAULT_PORT, workers: int = None, uds: str = None, options: list = SERVER_OPTIONS) -> None:
     """
     Start the server and keep it alive until done.
 
     Parameters
     ----------
-    qLanding : multiprocessing.Queue
-        Queue where to put landing notifications.
-    qTakeoff : multiprocessing.Queue
-        Queue where to put takeoff notifications.
-    qLocation : multiprocessing.Queue
-        Queue where to put position (location) notifications.
+    landing_ring : SharedRing
+        Ring where to put landing notifications.
+    takeoff_ring : SharedRing
+        Ring where to put takeoff notifications.
+    location_ring : SharedRing
+        Ring where to put position (location) notifications.
+    qSimState : multiprocessing.Queue
+        Queue where the Visualizer puts the changes to the state of the simulation.
+    port : int, optional
+        TCP port to listen on, by default DEFAULT_PORT.
+    workers : int, optional
+        Most calls handled at once (worker threads), by default None (enough for DEFAULT_DRONES drones, see default_workers).
+    uds : str, optional
+        Path of a Unix domain socket to also listen on, by default None.
+    options : list, optional
+        Channel options of the server (see server_options), by default SERVER_OPTIONS.
     """
     
-    # Create a new server with no more than 10 worker threads to process incoming connections.
-    # The 10 count for the threads is arbitrary, but it seems to work.
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Create a new server with no more than the given number of worker threads to process incoming connections.
+    # Each open stream holds on to one, so there have to be enough for the streams of every drone and then some.
+    if workers is None:
+        workers = default_workers()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers), options=options)
     
     # Connect the servicer to the server
-    viz_connect_grpc.add_Momentum22VizServicer_to_server(
-        Momentum22VizServicer(qLanding, qTakeoff, qLocation), server)
+    servicer = Momentum22VizServicer(landing_ring, takeoff_ring, location_ring, qSimState, workers)
+    viz_connect_grpc.add_Momentum22VizServicer_to_server(servicer, server)
+    
+    # Keep up with the state of the simulation in the background so it's ready for whoever watches it
+    threading.Thread(target=servicer.follow_sim_state, daemon=True).start()
     
-    # Specify where to serve (localhost:51052)
-    server.add_insecure_port('[::]:51052')
+    # Specify where to serve (localhost:51052 by default)
+    listen(server, port, uds)
     
     # Star the server
     server.start()
@@ -161,22 +642,34 @@ def serveGrpc(qLanding: Queue, qTakeoff: Queue, qLocation: Queue) -> None:
 # Process that all of this happens in (assigned when start is called)
 p = None
 
-def start(qLanding: Queue, qTakeoff: Queue, qLocation: Queue) -> None:
+def start(landing_ring: SharedRing, takeoff_ring: SharedRing, location_ring: SharedRing, qSimState: Queue,
+          port: int = DEFAULT_PORT, workers: int = None, uds: str = None, options: list = SERVER_OPTIONS) -> None:
     """
     Starts the grpc server and puts it into a new process.
 
     Parameters
     ----------
-    qLanding : multiprocessing.Queue
-        Queue where to put landing notifications.
-    qTakeoff : multiprocessing.Queue
-        Queue where to put takeoff notifications.
-    qLocation : multiprocessing.Queue
-        Queue where to put position (location) notifications.
+    landing_ring : SharedRing
+        Ring where to put landing notifications.
+    takeoff_ring : SharedRing
+        Ring where to put takeoff notifications.
+    location_ring : SharedRing
+        Ring where to put position (location) notifications.
+    qSimState : multiprocessing.Queue
+        Queue where the Visualizer puts the changes to the state of the simulation.
+    port : int, optional
+        TCP port to listen on, by default DEFAULT_PORT.
+    workers : int, optional
+        Most calls handled at once (worker threads), by default None (enough for DEFAULT_DRONES drones, see default_workers).
+    uds : str, optional
+        Path of a Unix domain socket to also listen on, by default None.
+    options : list, optional
+        Channel options of the server (see server_options), by default SERVER_OPTIONS.
     """
     
-    # Throw the server into another process so that we can do viz tasks without interruptions
-    p = multiprocessing.Process(target=serveGrpc, args=(qLanding, qTakeoff, qLocation))
+    # Throw the server into another process so that we can do viz tasks without interruptions.
+    # The rings are shared memory, so both processes work on the same records.
+    p = multiprocessing.Process(target=serveGrpc, args=(landing_ring, takeoff_ring, location_ring, qSimState, port, workers, uds, options))
     p.start()
     
 def cleanUp() -> None:
@@ -53,6 +53,72 @@ group.add_argument("-v",
                    nargs=1, 
                    metavar='MAPNAME',
                    help="Launch the visualizer (enter the name of the map or the map record filename)")
+# Add water check options
+parser.add_argument("--water-mode",
+                    choices=['exact', 'raster'],
+                    default='exact',
+                    help="How to check if the drone is over water: against the exact waterbody geometry or a cached raster mask (default: exact)")
+parser.add_argument("--water-resolution",
+                    type=float,
+                    default=1.0,
+                    metavar='METERS',
+                    help="Size of a pixel of the raster water mask in meters (default: 1.0)")
+# Add track options
+parser.add_argument("--track-rollover",
+                    type=int,
+                    default=60000,
+                    metavar='FIXES',
+                    help="Maximum number of fixes of the drone track to keep and draw, the oldest are dropped first (default: 60000)")
+# Add grpc options
+parser.add_argument("--grpc-mode",
+                    choices=['process', 'loop'],
+                    default='process',
+                    help="Where to run the grpc server: in a process of its own or on the Bokeh server's event loop, handing the locations straight to the scoring (default: process)")
+parser.add_argument("--grpc-port",
+                    type=int,
+                    default=51052,
+                    metavar='PORT',
+                    help="TCP port the grpc server listens on (default: 51052)")
+parser.add_argument("--grpc-uds",
+                    type=str,
+                    default=None,
+                    metavar='PATH',
+                    help="Also listen on a Unix domain socket at this path (connect the student code to unix:PATH to skip the TCP stack)")
+parser.add_argument("--drones",
+                    type=int,
+                    default=grpc_server.DEFAULT_DRONES,
+                    metavar='DRONES',
+                    help="Most drones the student code flies at once, sizes the grpc worker threads (default: {})".format(grpc_server.DEFAULT_DRONES))
+parser.add_argument("--grpc-workers",
+                    type=int,
+                    default=None,
+                    metavar='THREADS',
+                    help="Most grpc calls handled at once, each open stream holds one (process grpc mode only, default: {} per drone plus {})".format(
+                        grpc_server.STREAMS_PER_DRONE, grpc_server.SPARE_WORKERS))
+parser.add_argument("--grpc-max-streams",
+                    type=int,
+                    default=None,
+                    metavar='STREAMS',
+                    help="Most grpc calls open at once on a connection (default: grpc's default)")
+parser.add_argument("--grpc-max-message-size",
+                    type=int,
+                    default=None,
+                    metavar='BYTES',
+                    help="Biggest grpc message that can be sent or received (default: grpc's default, 4 MB)")
+parser.add_argument("--grpc-keepalive-ms",
+                    type=int,
+                    default=None,
+                    metavar='MS',
+                    help="How often the grpc server pings quiet connections (default: grpc's default)")
+parser.add_argument("--ingest-limit",
+                    type=int,
+                    default=65536,
+                    metavar='FIXES',
+                    help="Most locations from the student code that can be waiting to be scored (default: 65536)")
+parser.add_argument("--ingest-policy",
+                    choices=['block', 'drop-oldest', 'latest'],
+                    default='block',
+                    help="What to do when --ingest-limit is reached: make the student code wait, drop the oldest locations, or keep scoring every location but only draw the latest (default: block)")
 args = parser.parse_args()
 
 
@@ -73,11 +139,30 @@ class Visualizer(VisualizationSharedDataStore):
         Checks on the messages coming from the student code.
     serve()
         Assembles the page according to the type of mode and serves it.
+    start_grpc_in_loop()
+        Starts the grpc server on the Bokeh server's event loop.
+    grpc_options()
+        Gets the channel options of the grpc server from the command line settings.
     """
     
     def __init__(self) -> None:
         self.Viz = VisualizationSharedDataStore
         try:
+            self.Viz.water_mode = args.water_mode
+            self.Viz.water_resolution = args.water_resolution
+            self.Viz.track_rollover = args.track_rollover
+            self.Viz.grpc_mode = args.grpc_mode
+            self.Viz.grpc_port = args.grpc_port
+            self.Viz.grpc_uds = args.grpc_uds
+            self.Viz.drones = args.drones
+            # Every drone keeps two streams open, each holding a worker thread
+            self.Viz.grpc_workers = args.grpc_workers if args.grpc_workers is not None else grpc_server.default_workers(args.drones)
+            self.Viz.grpc_max_streams = args.grpc_max_streams
+            self.Viz.grpc_max_message_size = args.grpc_max_message_size
+            self.Viz.grpc_keepalive_ms = args.grpc_keepalive_ms
+            self.Viz.ingest_limit = args.ingest_limit
+            self.Viz.ingest_policy = args.ingest_policy
+            
             if(args.mapmaker):
                 self.Viz.mode = Mode.MAP_MAKER
                 if(args.mapmaker != 1):
@@ -116,18 +201,19 @@ class Visualizer(VisualizationSharedDataStore):
         """
         
         if self.Viz.mode == Mode.VISUALIZATION:
-            self.Viz.data.check_landing_status()
+            # Same order the student code sends them in, so a tick that drains a whole flight still makes sense
             self.Viz.data.check_takeoff_status()
             self.Viz.data.update_local_location()
+            self.Viz.data.check_landing_status()
     
     def file_io_update(self) -> None:
+        """
+        Hands the state of the simulation over to be written to file for the student code (only if it changed).
+        Intended as a periodic callback function called by curdoc.
+        """
+        
         if self.Viz.mode == Mode.VISUALIZATION:
-            done = False
-            while not done:
-                try:
-                    done = self.Viz.data.prep_viz_data()
-                except KeyboardInterrupt:
-                    continue
+            self.Viz.data.prep_viz_data()
             
 
 
@@ -205,8 +291,13 @@ class Visualizer(VisualizationSharedDataStore):
             
 
         if self.Viz.mode == Mode.VISUALIZATION:
-            # Start the grpc server (internally operates in another process)
-            grpc_server.start(self.data.qLanding, self.data.qTakeoff, self.data.qLocation)
+            if self.Viz.grpc_mode == 'loop':
+                # Start the grpc server on this event loop (locations get scored as soon as they come in)
+                curdoc().add_next_tick_callback(self.start_grpc_in_loop)
+            else:
+                # Start the grpc server (internally operates in another process)
+                grpc_server.start(self.data.landing_ring, self.data.takeoff_ring, self.data.location_ring, self.data.qSimState,
+                                  self.Viz.grpc_port, self.Viz.grpc_workers, self.Viz.grpc_uds, self.grpc_options())
             
             #https://discourse.bokeh.org/t/bokeh-application-title/1068/3
             curdoc().title = "Momentum 22 Visualizer"
@@ -216,6 +307,26 @@ class Visualizer(VisualizationSharedDataStore):
             # Check in on grpc data every 500 ms - rarer to make sure that we don't make everything sluggish for this
             curdoc().add_periodic_callback(self.file_io_update, 500)  # period in ms       
 
+    async def start_grpc_in_loop(self) -> None:
+        """
+        Starts the grpc server on the Bokeh server's event loop.
+        Intended as a next tick callback called by curdoc.
+        """
+        
+        await grpc_server.serve_in_loop(self.data, self.Viz.grpc_port, self.Viz.grpc_uds, self.grpc_options())
+    
+    def grpc_options(self) -> list:
+        """
+        Gets the channel options of the grpc server from the command line settings.
+
+        Returns
+        -------
+        list
+            The options (name, value) to make the grpc server with.
+        """
+        
+        return grpc_server.server_options(self.Viz.grpc_max_streams, self.Viz.grpc_max_message_size, self.Viz.grpc_keepalive_ms)
+
 # Create the visualizer
 visualizer = Visualizer()
 # Initialize the components
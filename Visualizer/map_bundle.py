@@ -0,0 +1,258 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+"""
+Precompiled map bundles.
+
+Everything the Visualizer works out from a map before the mission can start (the fire
+polygons and their areas, the survivor circles and index, the bounds the R-trees are
+loaded from, and the columns the data sources start out with) only depends on the map.
+It's all compiled once into a bundle cached in .temp, keyed by what the map was loaded
+from (see map_record.load_map), and loaded back from there on every start until the map
+changes. The waterbodies clipped to the map are cached on their own (see water.py).
+
+Compile maps ahead of time with:
+    python Visualizer/map_bundle.py <mapname> [<mapname> ...]
+"""
+
+# Shape tools
+from shapely.geometry import Polygon
+from shapely import wkb
+import geodesy
+from survivors import SurvivorIndex
+
+# Math
+import numpy as np
+
+# Helpers
+from bokeh.util.logconfig import bokeh_logger as log
+import os
+import time
+import pickle as binlib
+
+
+# Goes up whenever what's in a bundle changes, so old bundles get compiled again
+BUNDLE_VERSION = 3
+
+
+class MapBundle(object):
+    """
+    What the Visualizer needs from a map to start a mission, worked out ahead of time.
+
+    Attributes
+    ----------
+    key : tuple
+        What the bundle was compiled from (bundle version, where the map was loaded from, and the survivor radius).
+    polygons : list
+        The fires, or the circles around the survivors (the polygons of interest).
+    areas : list
+        Area of the ground covered by each of the fires (empty on search and rescue maps).
+    bounds : numpy.ndarray
+        Bounds (minx, miny, maxx, maxy) of each of the polygons.
+    survivor_index : SurvivorIndex
+        Index of the survivors (empty on fire maps).
+    columns : dict
+        Columns the data sources start out with ('fires_xs', 'fires_ys', 'radii_xs', 'radii_ys').
+    """
+
+    def __init__(self, key: tuple, polygons: list, areas: list, bounds: np.ndarray, survivor_index: SurvivorIndex,
+                 columns: dict) -> None:
+        """
+        Puts a bundle together (see compile_map() and load_map_bundle() to get one).
+
+        Parameters
+        ----------
+        key : tuple
+            What the bundle was compiled from.
+        polygons : list
+            The polygons of interest.
+        areas : list
+            Area of the ground covered by each of the fires.
+        bounds : numpy.ndarray
+            Bounds of each of the polygons.
+        survivor_index : SurvivorIndex
+            Index of the survivors.
+        columns : dict
+            Columns the data sources start out with.
+        """
+
+        self.key = key
+        self.polygons = polygons
+        self.areas = areas
+        self.bounds = bounds
+        self.survivor_index = survivor_index
+        self.columns = columns
+
+
+def map_bounds(map_data: dict) -> tuple:
+    # Bounds are kept as one item lists in the map files
+    return tuple(float(np.ravel(map_data['bounds'][bound])[0]) for bound in ('minx', 'miny', 'maxx', 'maxy'))
+
+
+def bundle_key(map_source: tuple, survivor_radius: float) -> tuple:
+    """
+    Works out what a bundle for the given map would be compiled from.
+
+    Parameters
+    ----------
+    map_source : tuple
+        What the map was loaded from (see map_record.load_map).
+    survivor_radius : float
+        How big a survivor is in m.
+
+    Returns
+    -------
+    tuple
+        The key of the bundle.
+    """
+
+    return (BUNDLE_VERSION, tuple(map_source), float(survivor_radius))
+
+
+def compile_map(map_name: str, map_data: dict, map_source: tuple, fire_suppression: bool, survivor_radius: float = 5,
+                cache_dir: str = '.temp') -> MapBundle:
+    """
+    Works out everything the Visualizer needs from a map to start a mission and caches it as a bundle.
+
+    Parameters
+    ----------
+    map_name : str
+        Name of the map (used to name the bundle file).
+    map_data : dict
+        The map.
+    map_source : tuple
+        What the map was loaded from (see map_record.load_map).
+    fire_suppression : bool
+        Whether it's a fire map (or a search and rescue one).
+    survivor_radius : float, optional
+        How big a survivor is in m, by default 5.
+    cache_dir : str, optional
+        Directory to cache the bundle in, by default '.temp'.
+
+    Returns
+    -------
+    MapBundle
+        The compiled bundle.
+    """
+
+    key = bundle_key(map_source, survivor_radius)
+
+    survivor_index = SurvivorIndex([], [])
+    columns = {}
+    if fire_suppression:
+        xs = [np.asarray(fire, dtype=float).ravel() for fire in map_data["data_fs"]['xs']]
+        ys = [np.asarray(fire, dtype=float).ravel() for fire in map_data["data_fs"]['ys']]
+        # The rings get closed if they aren't already
+        polygons = [Polygon(np.column_stack((fire_xs, fire_ys))) for fire_xs, fire_ys in zip(xs, ys)]
+        # Polygon x/y are in lat lon, so need the radius of earth to convert to meters (same as Data.fire_area)
+        areas = [poly.area * 6370**2 for poly in polygons]
+        columns['fires_xs'] = [fire.tolist() for fire in xs]
+        columns['fires_ys'] = [fire.tolist() for fire in ys]
+    else:
+        polygons = geodesy.points_to_circles(map_data["data_snr"]['x'], map_data["data_snr"]['y'], survivor_radius)
+        areas = []
+        survivor_index = SurvivorIndex(map_data["data_snr"]['x'], map_data["data_snr"]['y'])
+
+    # The circles around the survivors (or the fires) as drawn for debugging
+    exteriors = [np.asarray(poly.exterior.coords) for poly in polygons]
+    columns['radii_xs'] = [exterior[:, 0].tolist() for exterior in exteriors]
+    columns['radii_ys'] = [exterior[:, 1].tolist() for exterior in exteriors]
+
+    bounds = np.array([poly.bounds for poly in polygons], dtype=float).reshape(-1, 4)
+    bundle = MapBundle(key, polygons, areas, bounds, survivor_index, columns)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        bundle_filepath = os.path.join(cache_dir, map_name + '.bundle')
+        with open(bundle_filepath + '.tmp', 'wb') as binfile:
+            binlib.dump({'key': key,
+                         'polygons': [wkb.dumps(poly) for poly in polygons],
+                         'areas': areas,
+                         'bounds': bounds,
+                         'survivor_index': survivor_index,
+                         'columns': columns}, binfile, protocol=binlib.HIGHEST_PROTOCOL)
+        os.replace(bundle_filepath + '.tmp', bundle_filepath)
+    except OSError as e:
+        log.error("Couldn't cache the map bundle: " + str(e))
+    return bundle
+
+
+def load_map_bundle(map_name: str, map_data: dict, map_source: tuple, fire_suppression: bool, survivor_radius: float = 5,
+                    cache_dir: str = '.temp') -> MapBundle:
+    """
+    Loads the bundle for the given map from the cache, or compiles it if it isn't there or is stale.
+
+    Parameters
+    ----------
+    map_name : str
+        Name of the map (used to name the bundle file).
+    map_data : dict
+        The map (only read if the bundle has to be compiled).
+    map_source : tuple
+        What the map was loaded from (see map_record.load_map).
+    fire_suppression : bool
+        Whether it's a fire map (or a search and rescue one).
+    survivor_radius : float, optional
+        How big a survivor is in m, by default 5.
+    cache_dir : str, optional
+        Directory the bundle is cached in, by default '.temp'.
+
+    Returns
+    -------
+    MapBundle
+        The bundle for the map.
+    """
+
+    start = time.perf_counter()
+    key = bundle_key(map_source, survivor_radius)
+
+    bundle = None
+    try:
+        with open(os.path.join(cache_dir, map_name + '.bundle'), 'rb') as binfile:
+            cached = binlib.load(binfile)
+        if(cached['key'] == key):
+            bundle = MapBundle(key,
+                               [wkb.loads(poly) for poly in cached['polygons']],
+                               cached['areas'],
+                               cached['bounds'],
+                               cached['survivor_index'],
+                               cached['columns'])
+            source = "cache"
+    except (OSError, EOFError, KeyError, TypeError, AttributeError, binlib.UnpicklingError):
+        pass
+
+    if bundle is None:
+        bundle = compile_map(map_name, map_data, map_source, fire_suppression, survivor_radius, cache_dir)
+        source = "compiling the map"
+
+    log.info(" --- Map bundle loaded from {} in {:.1f} ms".format(source, (time.perf_counter() - start) * 1000.0))
+    return bundle
+
+
+if __name__ == '__main__':
+    import argparse
+    from map_record import load_map
+    from water import load_water_query
+
+    parser = argparse.ArgumentParser(description="Compiles maps into the bundles the Visualizer starts from.",
+                                     prog="python Visualizer/map_bundle.py")
+    parser.add_argument("maps", nargs='+', metavar='MAPNAME', help="Names of the maps to compile (in the maps directory)")
+    parser.add_argument("--cache-dir", default='.temp', help="Where to put the bundles (default: .temp)")
+    args = parser.parse_args()
+
+    for map_name in args.maps:
+        loaded = load_map(map_name)
+        if loaded is None:
+            print("Map with the name " + map_name + " does not exist")
+            continue
+        map_data, _, map_source = loaded
+        start = time.perf_counter()
+        # Map type 0 is fire suppression (see MapType)
+        fire_suppression = int(map_data["map_type"]) == 0
+        compile_map(map_name, map_data, map_source, fire_suppression, cache_dir=args.cache_dir)
+        if fire_suppression:
+            # The water around the map gets cached alongside
+            load_water_query(map_name, map_bounds(map_data), 'data/waterbodies.geojson', cache_dir=args.cache_dir)
+        print("Compiled " + map_name + " in {:.1f} ms".format((time.perf_counter() - start) * 1000.0))
@@ -0,0 +1,316 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+"""
+Binary map records.
+
+A map record file starts with MAGIC, the format version and the length of a JSON header.
+The header holds everything in the map that isn't a big list of coordinates (name, type,
+bounds, wind...), where each column is in the file, and the hash of the JSON map file the
+record was made from (if it was). The columns follow it as raw little-endian arrays, each
+starting on a 64 byte boundary:
+
+    data_fs/offsets   int64, where the points of each fire start (one more than there are fires)
+    data_fs/xs        float64, the longitudes of the points of all of the fires one after the other
+    data_fs/ys        float64, the latitudes of the points of all of the fires one after the other
+    data_snr/x        float64, the longitudes of the survivors
+    data_snr/y        float64, the latitudes of the survivors
+
+Only the columns of what's in the map are written (a solution file only has data_snr).
+Reading memory maps the file and hands out views into it, so nothing is parsed or copied
+and the pages are only read from disk once they are actually used.
+
+The JSON map files in maps/ are what gets edited and checked in. The map records made from
+them are a cache kept in .temp, and a record is only used while the hash in its header
+matches the contents of the JSON file.
+"""
+
+# Helpers
+import hashlib
+import json
+import mmap
+import os
+import struct
+import pickle as binlib
+
+# Math
+import numpy as np
+
+
+MAGIC = b'M22MAPR\n'
+FORMAT_VERSION = 1
+# Format version and length of the JSON header
+_PREAMBLE = struct.Struct('<II')
+_ALIGNMENT = 64
+
+
+def is_map_record(filepath: str) -> bool:
+    """
+    Checks if the given file is a binary map record (rather than, say, a pickle).
+
+    Parameters
+    ----------
+    filepath : str
+        The file to check.
+
+    Returns
+    -------
+    bool
+        True if the file starts like a map record.
+    """
+
+    with open(filepath, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_map_record(filepath: str, map_data: dict, source_hash: str = None) -> None:
+    """
+    Writes the given map to a binary map record file (replacing it all at once).
+
+    Parameters
+    ----------
+    filepath : str
+        Where the map record goes.
+    map_data : dict
+        The map, laid out the same way as in the JSON map files.
+    source_hash : str, optional
+        Hash of the JSON map file the map was read from (see hash_map_file), by default None.
+    """
+
+    columns = {}
+    if "data_fs" in map_data:
+        xs = [np.asarray(fire_xs, dtype='<f8').ravel() for fire_xs in map_data["data_fs"]['xs']]
+        ys = [np.asarray(fire_ys, dtype='<f8').ravel() for fire_ys in map_data["data_fs"]['ys']]
+        columns['data_fs/offsets'] = np.concatenate(([0], np.cumsum([len(fire_xs) for fire_xs in xs], dtype='<i8'))).astype('<i8')
+        columns['data_fs/xs'] = np.concatenate(xs) if len(xs) > 0 else np.zeros(0, dtype='<f8')
+        columns['data_fs/ys'] = np.concatenate(ys) if len(ys) > 0 else np.zeros(0, dtype='<f8')
+    if "data_snr" in map_data:
+        columns['data_snr/x'] = np.asarray(map_data["data_snr"]['x'], dtype='<f8').ravel()
+        columns['data_snr/y'] = np.asarray(map_data["data_snr"]['y'], dtype='<f8').ravel()
+
+    # The header has to say where the columns are, and they come right after it
+    meta = {key: value for key, value in map_data.items() if key not in ("data_fs", "data_snr")}
+    layout = {name: {'dtype': column.dtype.str, 'length': len(column)} for name, column in columns.items()}
+    header = json.dumps({'meta': meta, 'columns': layout, 'source_hash': source_hash}).encode('utf-8')
+    while True:
+        offset = _align(len(MAGIC) + _PREAMBLE.size + len(header))
+        for name, column in columns.items():
+            layout[name]['offset'] = offset
+            offset = _align(offset + column.nbytes)
+        new_header = json.dumps({'meta': meta, 'columns': layout, 'source_hash': source_hash}).encode('utf-8')
+        done = len(new_header) == len(header)
+        header = new_header
+        if done:
+            break
+        # The offsets made the header longer, which moves the columns, so go again
+
+    temp_filepath = filepath + ".tmp"
+    with open(temp_filepath, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_PREAMBLE.pack(FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, column in columns.items():
+            f.write(b'\0' * (layout[name]['offset'] - f.tell()))
+            f.write(column.tobytes())
+    os.replace(temp_filepath, filepath)
+
+
+def read_map_record_header(filepath: str) -> dict:
+    """
+    Reads just the header of a binary map record file.
+
+    Parameters
+    ----------
+    filepath : str
+        The map record file.
+
+    Returns
+    -------
+    dict
+        'meta' (everything in the map that isn't coordinates), 'columns' (where each column is)
+        and 'source_hash' (hash of the JSON map file the record was made from, None if it wasn't).
+    """
+
+    with open(filepath, 'rb') as f:
+        return _read_header(f, filepath)
+
+
+def read_map_record(filepath: str) -> dict:
+    """
+    Reads a binary map record file, lazily (the coordinates are views into the memory mapped file).
+
+    Parameters
+    ----------
+    filepath : str
+        The map record file.
+
+    Returns
+    -------
+    dict
+        The map, laid out the same way as in the JSON map files (with NumPy arrays instead of lists of coordinates).
+    """
+
+    with open(filepath, 'rb') as f:
+        header = _read_header(f, filepath)
+        # The views keep the mapping alive for as long as they are around
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    columns = {name: np.frombuffer(buffer, dtype=np.dtype(column['dtype']), count=column['length'], offset=column['offset'])
+               for name, column in header['columns'].items()}
+
+    map_data = dict(header['meta'])
+    if 'data_fs/offsets' in columns:
+        offsets = columns['data_fs/offsets'].tolist()
+        map_data["data_fs"] = {'xs': [columns['data_fs/xs'][start:end] for start, end in zip(offsets[:-1], offsets[1:])],
+                               'ys': [columns['data_fs/ys'][start:end] for start, end in zip(offsets[:-1], offsets[1:])]}
+    if 'data_snr/x' in columns:
+        map_data["data_snr"] = {'x': columns['data_snr/x'],
+                                'y': columns['data_snr/y']}
+    return map_data
+
+
+def read_map_file(filepath: str):
+    """
+    Reads a binary map file, whether it's a map record or a pickle from before there were map records.
+
+    Parameters
+    ----------
+    filepath : str
+        The binary map file.
+
+    Returns
+    -------
+    dict
+        What's in the file.
+    """
+
+    if is_map_record(filepath):
+        return read_map_record(filepath)
+    with open(filepath, 'rb') as binfile:
+        return binlib.load(binfile)
+
+
+def hash_map_file(filepath: str) -> str:
+    """
+    Hashes the contents of a JSON map file (the same way they're checked against map records).
+
+    Parameters
+    ----------
+    filepath : str
+        The JSON map file.
+
+    Returns
+    -------
+    str
+        Hex digest of the file contents.
+    """
+
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def cache_map_record(map_name: str, map_data: dict, source_hash: str, cache_dir: str = '.temp') -> None:
+    """
+    Caches the given map as a binary map record, so it loads quickly for as long as its JSON map file doesn't change.
+
+    Parameters
+    ----------
+    map_name : str
+        Name of the map (without extension).
+    map_data : dict
+        The map, as read from (or written to) its JSON map file.
+    source_hash : str
+        Hash of the JSON map file (see hash_map_file).
+    cache_dir : str, optional
+        Directory the map records are cached in, by default '.temp'.
+    """
+
+    os.makedirs(cache_dir, exist_ok=True)
+    write_map_record(os.path.join(cache_dir, map_name + ".maprec"), map_data, source_hash)
+
+
+def load_map(map_name: str, maps_dir: str = 'maps', static_dir: str = 'Visualizer/static', cache_dir: str = '.temp'):
+    """
+    Loads the given map from whichever file it's in, along with its hidden survivors if there are any.
+
+    The JSON map file is used if there is one, read from the map record cached for it if the
+    record was made from the same contents (and cached the first time it isn't), then a locked
+    binary map (.bin).
+
+    Parameters
+    ----------
+    map_name : str
+        Name of the map (without extension).
+    maps_dir : str, optional
+        Directory the maps are in, by default 'maps'.
+    static_dir : str, optional
+        Directory the hidden survivors are in, by default 'Visualizer/static'.
+    cache_dir : str, optional
+        Directory the map records are cached in, by default '.temp'.
+
+    Returns
+    -------
+    tuple
+        The map, whether it's locked (can't be edited), and what it was loaded from (the hash of
+        the JSON map file or the path, modification time and size of the binary map, and the same
+        for the hidden survivors), or None if there is no such map.
+    """
+
+    json_filepath = os.path.join(maps_dir, map_name + ".json")
+    record_filepath = os.path.join(cache_dir, map_name + ".maprec")
+    locked_filepath = os.path.join(maps_dir, map_name + ".bin")
+    if(os.path.exists(json_filepath)):
+        with open(json_filepath, 'rb') as f:
+            contents = f.read()
+        source_hash = hashlib.sha1(contents).hexdigest()
+        map_data = None
+        try:
+            if(read_map_record_header(record_filepath).get('source_hash') == source_hash):
+                # Memory mapped, the coordinates are only read as they get used
+                map_data = read_map_record(record_filepath)
+        except (OSError, ValueError):
+            # Not cached yet, or not readable
+            pass
+        if map_data is None:
+            map_data = json.loads(contents)
+            try:
+                cache_map_record(map_name, map_data, source_hash, cache_dir)
+            except OSError:
+                # Loads from the JSON again next time
+                pass
+        source = (source_hash,)
+    elif(os.path.exists(locked_filepath)):
+        return read_map_file(locked_filepath), True, (_file_id(locked_filepath),)
+    else:
+        return None
+
+    solution_filepath = os.path.join(static_dir, '.' + map_name + '.snr.bin')
+    if(os.path.exists(solution_filepath)):
+        if is_map_record(solution_filepath):
+            map_data['data_snr'] = read_map_record(solution_filepath)['data_snr']
+        else:
+            # The old solution files are a pickle of just the survivors
+            map_data['data_snr'] = read_map_file(solution_filepath)
+        return map_data, True, source + (_file_id(solution_filepath),)
+    return map_data, False, source
+
+
+def _file_id(filepath: str) -> tuple:
+    # Binary maps don't get edited, so they count as changed whenever the file does
+    stat = os.stat(filepath)
+    return (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+
+
+def _read_header(f, filepath: str) -> dict:
+    if(f.read(len(MAGIC)) != MAGIC):
+        raise ValueError(filepath + " isn't a map record")
+    version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+    if(version > FORMAT_VERSION):
+        raise ValueError(filepath + " was written by a newer version of the Visualizer (map record format " + str(version) + ")")
+    return json.loads(f.read(header_length).decode('utf-8'))
+
+
+def _align(offset: int) -> int:
+    return offset + (-offset % _ALIGNMENT)
@@ -10,8 +10,12 @@ from data import MapType
 # Bokeh visualization
 from bokeh.plotting import figure
 from bokeh.models import PointDrawTool, PolyDrawTool, CrosshairTool, WheelZoomTool
+from bokeh.palettes import Category10
 from bokeh.util.logconfig import bokeh_logger as log
 
+# Colors of the drone tracks (by the row of the drone, the first one keeps the color it always had)
+TRACK_COLORS = ['olivedrab'] + list(Category10[10])
+
 
 class Plot(VisualizationSharedDataStore):
     """
@@ -33,12 +37,20 @@ class Plot(VisualizationSharedDataStore):
         Tool to draw the survivors.
     fire_tool : PolyDrawTool
         Tool to draw the fires.
+    track_renderers : dict
+        Renderers for the drone tracks keyed by the id of the drone.
+        
+    Methods
+    -------
+    add_drone_track(drone: DroneState)
+        Draws the track of a drone.
     """
     
     def __init__(self) -> None:
         log.info(" -- INIT PLOT")
         self.Viz = VisualizationSharedDataStore
         self.Viz.plot = self
+        self.track_renderers = {}
 
         # Create figure object.
         self.figure = figure(title='MIT Momentum Map Maker',
@@ -144,14 +156,10 @@ class Plot(VisualizationSharedDataStore):
             #                                                       source=self.Viz.data.debug_drone_table_source, 
             #                                                       line_width=0)
             
-            # Set up for drawing the ownship track
-            # The plot will update automatically as data is manipulated in the table source
-            self.figure.line(x='lon', 
-                             y='lat', 
-                             color='olivedrab', 
-                             alpha=1, 
-                             source=self.Viz.data.drone_pos_data_source, 
-                             line_width=5)
+            # Set up for drawing the tracks of the drones that are already shown (the rest get theirs when they show up)
+            for drone in self.Viz.data.drones.values():
+                if drone.row is not None:
+                    self.add_drone_track(drone)
         
         # Show the ownship symbol on the plot
         self.figure.image_url(url='url',
@@ -163,4 +171,24 @@ class Plot(VisualizationSharedDataStore):
                               h='h',
                               h_units='screen',
                               source=self.Viz.data.ownship_data_source)
+    
+    def add_drone_track(self, drone) -> None:
+        """
+        Draws the track of a drone.
+        
+        The plot will update automatically as data is manipulated in the drone's track source.
+
+        Parameters
+        ----------
+        drone : DroneState
+            The drone.
+        """
         
+        if drone.drone_id in self.track_renderers:
+            return
+        self.track_renderers[drone.drone_id] = self.figure.line(x='lon', 
+                                                                y='lat', 
+                                                                color=TRACK_COLORS[drone.row % len(TRACK_COLORS)], 
+                                                                alpha=1, 
+                                                                source=drone.track_source, 
+                                                                line_width=5)
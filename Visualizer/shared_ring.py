@@ -0,0 +1,327 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Multiprocessing
+import multiprocessing
+from multiprocessing import shared_memory
+import threading
+import atexit
+import time
+
+# Math
+import numpy as np
+
+
+# Records that go from the gRPC process to the Bokeh process (same fields as the grpc messages)
+LOCATION_RECORD = np.dtype([('msgId', np.uint32),
+                            ('latitude', np.float64),
+                            ('longitude', np.float64),
+                            ('time', np.uint64),
+                            ('drone_id', np.uint32)], align=True)
+TAKEOFF_RECORD = np.dtype([('msgId', np.uint32),
+                           ('isTakenOff', np.bool_),
+                           ('time', np.uint64),
+                           ('drone_id', np.uint32)], align=True)
+LANDING_RECORD = np.dtype([('msgId', np.uint32),
+                           ('isLanded', np.bool_),
+                           ('time', np.uint64),
+                           ('drone_id', np.uint32)], align=True)
+
+# The counters get a cache line each so the two processes don't fight over it
+_COUNTER_STRIDE = 64
+# Written, read, skipped up to, and peeked up to
+_COUNTERS = 4
+
+
+class SharedRing(object):
+    """
+    Fixed-size ring buffer of records in shared memory, with one writing and one reading process.
+
+    The block starts with four counters, how many records were ever written (only the writer
+    moves it), how many were ever read (only the reader moves it), up to which record the
+    writer asked the reader to skip (only the writer moves it), and up to which record the
+    reader peeked (only the reader moves it), followed by the records themselves as a NumPy
+    structured array. The counters are only ever looked at or moved while holding a lock both
+    processes share, and a record is written before the write counter is moved past it, so the
+    lock also makes sure the reader sees the record once it sees the counter (whatever order
+    the processor lets stores through in). The records are copied in and handed out without
+    the lock, and the reader gets them as views straight into the shared memory.
+
+    The writer takes the lock once per put() or put_many() chunk: moving the write counter
+    also takes a snapshot of the other counters, and the room worked out from it stays good
+    until the writer uses it up (the reader only ever makes more). Only when it runs out does
+    the writer look at the counters again.
+
+    At most limit records wait to be read. Past that the writer either waits for the reader,
+    or (drop_oldest) moves the skip counter so the reader jumps over the oldest ones the next
+    time it peeks. Records the reader peeked at are on their way to being scored, so they are
+    never dropped (or written over), and there should be some room between limit and
+    capacity for what the reader takes at a time.
+
+    Several threads of the writing process can put records in (they take turns on a lock that
+    is local to that process).
+
+    Attributes
+    ----------
+    dtype : numpy.dtype
+        Type of the records.
+    capacity : int
+        How many records fit.
+    limit : int
+        Most records that can be waiting to be read.
+    drop_oldest : bool
+        Whether the writer drops the oldest waiting records instead of waiting when limit is reached.
+    dropped : int
+        How many records the reader skipped because the writer dropped them (counted by the reader).
+    room : int
+        How many records the writer can write before it has to look at the counters again.
+    shm : multiprocessing.shared_memory.SharedMemory
+        The shared memory block.
+    records : numpy.ndarray
+        The records (view into the shared memory).
+    counters : numpy.ndarray
+        How many records were ever written, read, dropped through and peeked through (views into the shared memory).
+    lock : multiprocessing.Lock
+        Guards the counters (shared by the writing and the reading process).
+
+    Methods
+    -------
+    make_room()
+        Waits until at least one record can be written.
+    put(record: tuple)
+        Writes a record.
+    put_many(**columns)
+        Writes several records given as one array per field.
+    peek(limit: int=None)
+        Gets the records that are waiting (without copying them).
+    release(count: int)
+        Lets the writer reuse the space of the given number of records that were read.
+    close()
+        Detaches from the shared memory.
+    unlink()
+        Frees the shared memory (only the process that created it should do this).
+    """
+
+    def __init__(self, dtype: np.dtype, capacity: int, name: str = None, limit: int = None, drop_oldest: bool = False,
+                 lock: multiprocessing.Lock = None) -> None:
+        """
+        Makes a new ring or attaches to an existing one.
+
+        Parameters
+        ----------
+        dtype : numpy.dtype
+            Type of the records.
+        capacity : int
+            How many records fit.
+        name : str, optional
+            Name of the shared memory of an existing ring to attach to, by default None (make a new one).
+        limit : int, optional
+            Most records that can be waiting to be read, by default None (the capacity).
+        drop_oldest : bool, optional
+            Whether to drop the oldest waiting records instead of waiting when limit is reached, by default False.
+        lock : multiprocessing.Lock, optional
+            Lock guarding the counters of the existing ring, by default None (a new one).
+        """
+
+        self.dtype = np.dtype(dtype)
+        self.capacity = int(capacity)
+        self.limit = self.capacity if limit is None else min(int(limit), self.capacity)
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+        self.room = 0
+        size = _COUNTERS * _COUNTER_STRIDE + self.capacity * self.dtype.itemsize
+
+        self.created = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.created, size=size if self.created else 0)
+        self.counters = np.ndarray((_COUNTERS,), dtype=np.uint64, buffer=self.shm.buf,
+                                   strides=(_COUNTER_STRIDE,))
+        self.records = np.ndarray((self.capacity,), dtype=self.dtype, buffer=self.shm.buf,
+                                  offset=_COUNTERS * _COUNTER_STRIDE)
+        if self.created:
+            self.counters[:] = 0
+            # Don't leave the block behind when the Visualizer goes away
+            atexit.register(self.unlink)
+
+        self.lock = multiprocessing.Lock() if lock is None else lock
+        self.write_lock = threading.Lock()
+
+    def __reduce__(self):
+        # Other processes attach to the same shared memory (and lock) instead of getting a copy
+        return (SharedRing, (self.dtype, self.capacity, self.shm.name, self.limit, self.drop_oldest, self.lock))
+
+    def __len__(self) -> int:
+        # Records that were dropped aren't waiting anymore, even if the reader hasn't skipped them yet
+        with self.lock:
+            return int(self.counters[0]) - max(int(self.counters[1]), int(self.counters[2]))
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def make_room(self) -> int:
+        """
+        Waits until at least one record can be written (the reader needs to catch up, unless the ring drops the oldest records).
+
+        Returns
+        -------
+        int
+            How many records can be written now.
+        """
+
+        while self.room < 1:
+            with self.lock:
+                self.room = self.count_room()
+            if(self.room < 1):
+                time.sleep(0.001)
+        return self.room
+
+    def count_room(self) -> int:
+        # How many records can be written as the counters are now (only call while holding the lock)
+        written, read, skip, peeked = (int(counter) for counter in self.counters)
+        # The record whose slot the next one goes into
+        oldest = written - self.capacity
+        if(oldest < read):
+            free = read - oldest
+        elif(peeked <= oldest < skip):
+            # Dropped before the reader ever saw it
+            free = skip - oldest
+        else:
+            # Never write over what the reader may still be holding
+            free = 0
+        if self.drop_oldest:
+            # Going over limit drops the oldest ones instead
+            return min(free, self.limit)
+        return min(free, self.limit - (written - max(read, skip)))
+
+    def commit(self, written: int) -> None:
+        # Lets the reader see everything up to the given record (only call while holding the lock)
+        self.counters[0] = written
+        if self.drop_oldest:
+            read, skip, peeked = (int(counter) for counter in self.counters[1:])
+            new_skip = written - self.limit
+            # Only what the reader hasn't peeked at yet can go, the rest is already being scored
+            if(new_skip > max(read, skip, peeked)):
+                # The reader jumps past these the next time it peeks
+                self.counters[2] = new_skip
+        self.room = self.count_room()
+
+    def put(self, record: tuple) -> None:
+        """
+        Writes a record (waits for the reader or drops the oldest records if the ring is at its limit).
+
+        Parameters
+        ----------
+        record : tuple
+            Values of the fields of the record in order.
+        """
+
+        with self.write_lock:
+            self.make_room()
+            # Only this process moves the write counter
+            written = int(self.counters[0])
+            self.records[written % self.capacity] = record
+            with self.lock:
+                # Only now does the reader get to see it
+                self.commit(written + 1)
+
+    def put_many(self, **columns) -> None:
+        """
+        Writes several records given as one array per field (waits for the reader or drops the oldest records if the ring is at its limit).
+
+        Parameters
+        ----------
+        **columns : array-like
+            Values of each of the fields, all of the same length (single values are used for every record).
+        """
+
+        columns = {field: np.asarray(values) for field, values in columns.items()}
+        count = max((len(values) for values in columns.values() if values.ndim > 0), default=0)
+        with self.write_lock:
+            done = 0
+            while done < count:
+                room = self.make_room()
+                written = int(self.counters[0])
+                start = written % self.capacity
+                # Up to the end of the buffer, or as much as there is room for
+                chunk = min(count - done, room, self.capacity - start)
+                for field, values in columns.items():
+                    self.records[field][start:start + chunk] = values if values.ndim == 0 else values[done:done + chunk]
+                with self.lock:
+                    self.commit(written + chunk)
+                done += chunk
+
+    def peek(self, limit: int = None) -> np.ndarray:
+        """
+        Gets the records that are waiting, oldest first, without copying them.
+
+        The records stay put until they are released, so use them before calling release().
+        Only the records up to the end of the buffer are returned, peek again after releasing
+        them to get the rest.
+
+        Parameters
+        ----------
+        limit : int, optional
+            Most records to return, by default None (no limit).
+
+        Returns
+        -------
+        numpy.ndarray
+            View of the waiting records.
+        """
+
+        with self.lock:
+            read = int(self.counters[1])
+            skip = int(self.counters[2])
+            if(skip > read):
+                # Jump over what the writer dropped
+                self.dropped += skip - read
+                read = skip
+                self.counters[1] = read
+            waiting = int(self.counters[0]) - read
+            start = read % self.capacity
+            count = min(waiting, self.capacity - start)
+            if limit is not None:
+                count = min(count, limit)
+            # The writer can't drop these anymore
+            self.counters[3] = read + count
+        return self.records[start:start + count]
+
+    def release(self, count: int) -> None:
+        """
+        Lets the writer reuse the space of the given number of records that were read.
+
+        Parameters
+        ----------
+        count : int
+            How many of the peeked records are done with.
+        """
+
+        with self.lock:
+            self.counters[1] = int(self.counters[1]) + count
+
+    def close(self) -> None:
+        """
+        Detaches from the shared memory.
+        """
+
+        # The views have to go before the memory can be closed
+        self.records = None
+        self.counters = None
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory (only the process that created it should do this).
+        """
+
+        try:
+            self.close()
+        except BufferError:
+            # Someone is still holding on to a view, the memory goes away with the process anyway
+            pass
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,505 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Memory mapped file
+import atexit
+import fcntl
+import mmap
+import os
+import time
+
+# Math
+import numpy as np
+
+# Geometry
+import shapely.errors
+from shapely.geometry import Polygon
+
+
+# Fixed part of the file, the sequence number is odd while the Visualizer is in the middle of a write
+HEADER_RECORD = np.dtype([('magic', np.uint32),
+                          ('layout', np.uint32),
+                          ('sequence', np.uint64),
+                          ('survivors_found', np.uint32),
+                          ('drone_count', np.uint32),
+                          ('fire_count', np.uint32),
+                          ('max_fires', np.uint32),
+                          ('coord_count', np.uint64),
+                          ('coord_capacity', np.uint64),
+                          ('fires_pct_remaining', np.float64),
+                          ('water_pct_remaining', np.float64),
+                          ('radius_of_influence', np.float64),
+                          ('fires_revision', np.uint64)], align=True)
+DRONE_RECORD = np.dtype([('drone_id', np.uint32),
+                         ('water_pct_remaining', np.float64)], align=True)
+# Where the perimeter of each fire starts in the coordinates, how many points it has,
+# and the sequence number it was last changed at (readers only decode the ones that moved)
+FIRE_RECORD = np.dtype([('fire_id', np.uint32),
+                        ('start', np.uint32),
+                        ('count', np.uint32),
+                        ('revision', np.uint64)], align=True)
+
+# The reader runs in the student code, which may have an older shapely (1.8 has no GEOSException)
+_DECODE_ERRORS = (ValueError, getattr(shapely.errors, 'GEOSException', ValueError))
+
+MAGIC = 0x4d323253  # "M22S"
+LAYOUT = 4
+# The file was replaced by a bigger one, open it again
+RETIRED = 0
+MAX_DRONES = 64
+_HEADER_SIZE = 128
+
+
+def _regions(buf, max_fires: int, coord_capacity: int) -> tuple:
+    # Header, drones, fires, then the longitude/latitude pairs of all of the perimeters
+    header = np.ndarray((1,), dtype=HEADER_RECORD, buffer=buf)
+    offset = _HEADER_SIZE
+    drones = np.ndarray((MAX_DRONES,), dtype=DRONE_RECORD, buffer=buf, offset=offset)
+    offset += MAX_DRONES * DRONE_RECORD.itemsize
+    fires = np.ndarray((max_fires,), dtype=FIRE_RECORD, buffer=buf, offset=offset)
+    offset += max_fires * FIRE_RECORD.itemsize
+    # Keep the coordinates 8 byte aligned
+    offset += -offset % 8
+    coords = np.ndarray((coord_capacity, 2), dtype=np.float64, buffer=buf, offset=offset)
+    return header, drones, fires, coords, offset + coord_capacity * 16
+
+
+class SimStateChannel(object):
+    """
+    Publishes the state of the simulation to a memory mapped file the student code can read without parsing anything.
+
+    The file has a fixed layout (see HEADER_RECORD, DRONE_RECORD and FIRE_RECORD) with the
+    perimeters of all of the fires packed one after the other at the end. The sequence number
+    in the header goes up with every write (it's odd while the write is going on), and the
+    fires revision is the sequence number the fire records last changed at, so readers can
+    tell what they need to look at again without reading anything else. Writes are made
+    holding an exclusive lock on the file and readers copy what they need holding a shared
+    one, which also makes sure the stores of the write are seen before the sequence number
+    that says they are there (Python can't put memory barriers in the file any other way).
+    Only the records of the fires that changed are written:
+    a fire that shrank is written over in place, one that grew (or is new) goes after the
+    last perimeter, and the last fire record is moved into the place of one that went out.
+    Once the perimeters don't fit anymore they are all packed again from the start, and if
+    the fires ever outgrow the file a bigger one is moved into its place and the old one is
+    marked as retired so readers open the new one. The
+    file is also retired when the Visualizer exits, and whatever file a previous Visualizer
+    left behind is retired before a new one takes its place.
+
+    Attributes
+    ----------
+    filepath : str
+        Where the memory mapped file is.
+    max_fires : int
+        How many fires fit in the file.
+    coord_capacity : int
+        How many perimeter points fit in the file.
+    radius_of_influence : float
+        How close in meters the drone needs to be to collect water, put out fire or see a survivor on this map.
+    published : dict
+        Polygon of each of the fires that was last published, keyed by their id.
+    revisions : dict
+        Sequence number each of the fires last changed at, keyed by their id.
+    extents : dict
+        Where each of the fires is in the file (its fire record, where its perimeter starts and how many points there is room for), keyed by their id.
+    slot_ids : list
+        Id of the fire in each of the fire records in use.
+
+    Methods
+    -------
+    publish(survivors_found: int, fires_pct_remaining: float, water_pct_remaining: float, drones: list, fires: dict, changed_fires: list=None)
+        Writes the state of the simulation into the file.
+    retire()
+        Tells the readers the file is done with and unmaps it.
+    close()
+        Unmaps the file.
+    """
+
+    def __init__(self, filepath: str, max_fires: int = 64, coord_capacity: int = 4096, radius_of_influence: float = 0.0) -> None:
+        """
+        Makes the file (replacing whatever was there).
+
+        Parameters
+        ----------
+        filepath : str
+            Where the memory mapped file goes.
+        max_fires : int, optional
+            How many fires fit at first, by default 64.
+        coord_capacity : int, optional
+            How many perimeter points fit at first, by default 4096.
+        radius_of_influence : float, optional
+            How close in meters the drone needs to be to collect water, put out fire or see a survivor on this map, by default 0.0 (not known).
+        """
+
+        self.filepath = filepath
+        self.radius_of_influence = radius_of_influence
+        self.map = None
+        self.published = {}
+        self.revisions = {}
+        # Whoever is still reading what the last Visualizer left behind goes looking for this one
+        self.retire_file(filepath)
+        self.create(max(max_fires, 1), max(coord_capacity, 1))
+        atexit.register(self.retire)
+
+    def create(self, max_fires: int, coord_capacity: int) -> None:
+        """
+        Makes a new file that fits the given number of fires and perimeter points and swaps it in.
+
+        Parameters
+        ----------
+        max_fires : int
+            How many fires fit.
+        coord_capacity : int
+            How many perimeter points fit.
+        """
+
+        self.max_fires = max_fires
+        self.coord_capacity = coord_capacity
+        size = self.size_of(max_fires, coord_capacity)
+
+        # Fill the new file in on the side, then swap it in for the old one
+        temp_filepath = self.filepath + ".tmp"
+        with open(temp_filepath, 'wb') as f:
+            f.truncate(size)
+        fd = os.open(temp_filepath, os.O_RDWR)
+        try:
+            new_map = mmap.mmap(fd, size)
+        except (OSError, ValueError):
+            os.close(fd)
+            raise
+        header, drones, fires, coords, _ = _regions(new_map, max_fires, coord_capacity)
+        header['magic'] = MAGIC
+        header['layout'] = LAYOUT
+        header['max_fires'] = max_fires
+        header['coord_capacity'] = coord_capacity
+        header['radius_of_influence'] = self.radius_of_influence
+        # Odd (being written) until the next publish fills it in, carrying on from the old file
+        header['sequence'] = 1 if self.map is None else int(self.header['sequence'][0]) | 1
+        os.replace(temp_filepath, self.filepath)
+
+        if self.map is not None:
+            # Readers still looking at the old file go find the new one
+            self.header['magic'] = RETIRED
+            self.close()
+        self.map = new_map
+        # Kept open to lock the file with
+        self.fd = fd
+        self.header, self.drones, self.fires, self.coords = header, drones, fires, coords
+        # Nothing is in the new file until the next publish packs all of the fires into it
+        self.extents = {}
+        self.slot_ids = []
+
+    @staticmethod
+    def retire_file(filepath: str) -> None:
+        # Marks the file at the given path as retired, if it's one of ours
+        try:
+            with open(filepath, 'r+b') as f:
+                retired_map = mmap.mmap(f.fileno(), 0)
+        except (FileNotFoundError, ValueError):
+            # Not there, or empty
+            return
+        try:
+            if(len(retired_map) >= _HEADER_SIZE):
+                header = np.ndarray((1,), dtype=HEADER_RECORD, buffer=retired_map)
+                if(header['magic'] == MAGIC):
+                    header['magic'] = RETIRED
+                # The view has to go before the memory can be unmapped
+                del header
+        finally:
+            retired_map.close()
+
+    @staticmethod
+    def size_of(max_fires: int, coord_capacity: int) -> int:
+        # Same layout as _regions()
+        size = _HEADER_SIZE + MAX_DRONES * DRONE_RECORD.itemsize + max_fires * FIRE_RECORD.itemsize
+        return size + (-size % 8) + coord_capacity * 16
+
+    def publish(self, survivors_found: int, fires_pct_remaining: float, water_pct_remaining: float,
+                drones: list, fires: dict, changed_fires: list = None) -> None:
+        """
+        Writes the state of the simulation into the file (only the fires that changed).
+
+        Parameters
+        ----------
+        survivors_found : int
+            How many survivors were found.
+        fires_pct_remaining : float
+            Percentage of the fires that is left.
+        water_pct_remaining : float
+            Percentage of water the first drone is carrying.
+        drones : list
+            Id and percentage of water carried of each of the drones (at most MAX_DRONES).
+        fires : dict
+            Perimeter of each of the fires that are still burning (shapely polygons) keyed by their id.
+        changed_fires : list, optional
+            Ids of the fires that changed shape or were put out since the last publish, by default None
+            (the polygons are replaced rather than changed in place, so the ones that aren't the same as last time).
+        """
+
+        if changed_fires is None:
+            changed_fires = [fire_id for fire_id, poly in fires.items() if self.published.get(fire_id) is not poly]
+            changed_fires += [fire_id for fire_id in self.published if fire_id not in fires]
+        perimeters = {fire_id: np.asarray(fires[fire_id].exterior.coords)[:, :2] for fire_id in changed_fires if fire_id in fires}
+
+        # Everything has to be packed again when the perimeters that moved don't fit after the last one anymore
+        repack = len(self.slot_ids) == 0 and len(fires) > 0
+        fire_count = len(self.slot_ids) + sum(1 for fire_id in perimeters if fire_id not in self.extents) \
+            - sum(1 for fire_id in changed_fires if fire_id not in fires and fire_id in self.extents)
+        appended = sum(len(points) for fire_id, points in perimeters.items()
+                       if fire_id not in self.extents or len(points) > self.extents[fire_id][2])
+        if(repack or fire_count > self.max_fires or int(self.header['coord_count'][0]) + appended > self.coord_capacity):
+            perimeters.update((fire_id, np.asarray(poly.exterior.coords)[:, :2]) for fire_id, poly in fires.items() if fire_id not in perimeters)
+            coord_count = sum(len(points) for points in perimeters.values())
+            if(len(fires) > self.max_fires or coord_count > self.coord_capacity):
+                self.create(max(self.max_fires, 2 * len(fires)), max(self.coord_capacity, 2 * coord_count))
+            repack = True
+        drones = drones[:MAX_DRONES]
+
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            self.write(survivors_found, fires_pct_remaining, water_pct_remaining, drones, fires, changed_fires, perimeters, repack)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def write(self, survivors_found: int, fires_pct_remaining: float, water_pct_remaining: float,
+              drones: list, fires: dict, changed_fires: list, perimeters: dict, repack: bool) -> None:
+        # The part of publish() that goes into the file (only while holding the lock on it)
+        header = self.header
+        # Odd while the write is going on (a new file already is)
+        if(header['sequence'] % 2 == 0):
+            header['sequence'] += 1
+        header['survivors_found'] = survivors_found
+        header['fires_pct_remaining'] = fires_pct_remaining
+        header['water_pct_remaining'] = water_pct_remaining
+        header['drone_count'] = len(drones)
+        for i, (drone_id, water_pct) in enumerate(drones):
+            self.drones[i] = (drone_id, water_pct)
+
+        revision = int(header['sequence'][0]) + 1
+        for fire_id in changed_fires:
+            if fire_id in fires:
+                self.revisions[fire_id] = revision
+                self.published[fire_id] = fires[fire_id]
+            elif fire_id in self.published:
+                self.revisions.pop(fire_id)
+                self.published.pop(fire_id)
+                if not repack:
+                    self.remove_fire(fire_id)
+        if repack:
+            self.extents = {}
+            self.slot_ids = []
+            header['coord_count'] = 0
+            for fire_id in fires:
+                self.write_fire(fire_id, perimeters[fire_id])
+        else:
+            for fire_id, points in perimeters.items():
+                self.write_fire(fire_id, points)
+        header['fire_count'] = len(self.slot_ids)
+        if(repack or len(changed_fires) > 0):
+            header['fires_revision'] = revision
+        # Even again, readers can trust what they see
+        header['sequence'] += 1
+
+    def write_fire(self, fire_id: int, points: np.ndarray) -> None:
+        # Writes over the perimeter of the fire if it still fits, or puts it after the last one (only while publishing)
+        slot, start, room = self.extents.get(fire_id, (len(self.slot_ids), 0, 0))
+        if(slot == len(self.slot_ids)):
+            self.slot_ids.append(fire_id)
+        if(len(points) > room):
+            start = int(self.header['coord_count'][0])
+            room = len(points)
+            self.header['coord_count'] = start + room
+        self.coords[start:start + len(points)] = points
+        self.fires[slot] = (fire_id, start, len(points), self.revisions[fire_id])
+        self.extents[fire_id] = (slot, start, room)
+
+    def remove_fire(self, fire_id: int) -> None:
+        # Moves the last fire record into the place of the one that went out (only while publishing)
+        slot = self.extents.pop(fire_id)[0]
+        last_id = self.slot_ids.pop()
+        if(last_id != fire_id):
+            self.fires[slot] = self.fires[len(self.slot_ids)]
+            self.slot_ids[slot] = last_id
+            self.extents[last_id] = (slot,) + self.extents[last_id][1:]
+
+    def retire(self) -> None:
+        """
+        Tells the readers the file is done with (they go looking for a new one) and unmaps it.
+        """
+
+        if self.map is None:
+            return
+        self.header['magic'] = RETIRED
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmaps the file.
+        """
+
+        if self.map is None:
+            return
+        self.header = self.drones = self.fires = self.coords = None
+        self.map.close()
+        self.map = None
+        os.close(self.fd)
+
+
+class SimStateReader(object):
+    """
+    Reads consistent snapshots of the state of the simulation out of the file SimStateChannel writes.
+
+    Nothing is read from disk or parsed, the values are looked at right where they are in the
+    memory mapped file, and a snapshot is only put together when the sequence number moved.
+    The fire records are only looked at when the fires revision moved too, and then only the
+    fires that changed since the last snapshot get turned into polygons, the others are the
+    same polygons as last time. What's needed is copied out holding a shared lock on the file
+    (see SimStateChannel), and the polygons are made after letting go of it. The reader opens
+    the file again when it's retired, or when a different file took its place (a Visualizer
+    that was restarted without getting to retire the old one).
+
+    Attributes
+    ----------
+    filepath : str
+        Where the memory mapped file is.
+    sequence : int
+        Sequence number of the last snapshot that was read (-1 if none was).
+    fires_revision : int
+        Fires revision of the last snapshot that was read (0 if none was).
+    fire_cache : dict
+        Revision and polygon of each of the fires in the last snapshot, keyed by their id.
+
+    Methods
+    -------
+    read()
+        Gets the latest state of the simulation if it changed since the last read.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        """
+        Sets up to read from the given file (it doesn't have to be there yet).
+
+        Parameters
+        ----------
+        filepath : str
+            Where the memory mapped file is.
+        """
+
+        self.filepath = filepath
+        self.sequence = -1
+        self.fires_revision = 0
+        self.fire_cache = {}
+        self.fire_polygons = {}
+        self.map = None
+        self.file_id = None
+
+    def open(self) -> bool:
+        if self.map is not None:
+            self.header = self.drones = self.fires = self.coords = None
+            self.map.close()
+            self.map = None
+            self.file.close()
+        try:
+            self.file = open(self.filepath, 'rb')
+        except FileNotFoundError:
+            # Not there yet
+            return False
+        try:
+            stat = os.fstat(self.file.fileno())
+            self.file_id = (stat.st_dev, stat.st_ino)
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Still empty
+            self.file.close()
+            return False
+        self.header = np.ndarray((1,), dtype=HEADER_RECORD, buffer=self.map)
+        header = self.header[0]
+        if(header['magic'] != MAGIC or header['layout'] != LAYOUT):
+            return False
+        _, self.drones, self.fires, self.coords, _ = _regions(self.map, int(header['max_fires']), int(header['coord_capacity']))
+        # Start over, it's a different file (the revisions in it have nothing to do with the last one's)
+        self.sequence = -1
+        self.fires_revision = 0
+        self.fire_cache = {}
+        self.fire_polygons = {}
+        return True
+
+    def read(self):
+        """
+        Gets the latest state of the simulation if it changed since the last read.
+
+        Returns
+        -------
+        dict
+            survivors_found, fires_pct_remaining, water_pct_remaining, radius_of_influence, drones ({drone id: water percentage})
+            and fire_polygons ({fire id: shapely polygon}), or None if nothing changed (or there's nothing to read).
+        """
+
+        if(self.map is None or self.header[0]['magic'] != MAGIC or self.replaced()):
+            if not self.open():
+                return None
+        header = self.header[0]
+        # Only a hint, it's looked at again holding the lock
+        if(int(header['sequence']) == self.sequence):
+            return None
+
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_SH)
+        try:
+            sequence = int(header['sequence'])
+            if(sequence % 2 == 1):
+                # Nothing was published into this file yet (or the Visualizer died in the middle of a write)
+                return None
+            state = {'survivors_found': int(header['survivors_found']),
+                     'fires_pct_remaining': float(header['fires_pct_remaining']),
+                     'water_pct_remaining': float(header['water_pct_remaining']),
+                     'radius_of_influence': float(header['radius_of_influence'])}
+            drones = self.drones[:int(header['drone_count'])].copy()
+            fires_revision = int(header['fires_revision'])
+            if(fires_revision != self.fires_revision):
+                fires = self.fires[:int(header['fire_count'])]
+                changed = fires[fires['revision'] > self.fires_revision].copy()
+                added = sum(1 for fire_id in changed['fire_id'].tolist() if fire_id not in self.fire_cache)
+                # Every fire that didn't change was there last time, so the count only comes up short if some went out
+                fire_ids = fires['fire_id'].copy() if len(self.fire_cache) + added != len(fires) else None
+                # Only the perimeters of the fires that changed
+                perimeters = [self.coords[start:start + count].copy() for start, count in zip(changed['start'].tolist(), changed['count'].tolist())]
+        finally:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+        if(fires_revision != self.fires_revision):
+            decoded = self.decode_fires(changed, perimeters, fire_ids)
+            if decoded is None:
+                return None
+            self.fire_cache, self.fire_polygons = decoded
+            self.fires_revision = fires_revision
+        state['drones'] = dict(zip(drones['drone_id'].tolist(), drones['water_pct_remaining'].tolist()))
+        state['fire_polygons'] = self.fire_polygons
+        self.sequence = sequence
+        return state
+
+    def replaced(self) -> bool:
+        # Whether a different file is at the path than the one that's open
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return False
+        return (stat.st_dev, stat.st_ino) != self.file_id
+
+    def decode_fires(self, changed: np.ndarray, perimeters: list, fire_ids: np.ndarray) -> tuple:
+        # Revision and polygon of each fire, and just the polygons, only the ones that changed get decoded
+        # (fire_ids is only there if some went out)
+        fire_cache = dict(self.fire_cache)
+        fire_polygons = dict(self.fire_polygons)
+        if fire_ids is not None:
+            for fire_id in fire_cache.keys() - set(fire_ids.tolist()):
+                del fire_cache[fire_id]
+                del fire_polygons[fire_id]
+        for fire_id, revision, points in zip(changed['fire_id'].tolist(), changed['revision'].tolist(), perimeters):
+            try:
+                poly = Polygon(points)
+            except _DECODE_ERRORS:
+                return None
+            fire_cache[fire_id] = (revision, poly)
+            fire_polygons[fire_id] = poly
+        return fire_cache, fire_polygons
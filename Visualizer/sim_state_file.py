@@ -0,0 +1,144 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Bokeh visualization
+from bokeh.util.logconfig import bokeh_logger as log
+
+# Geometry
+from shapely.geometry import mapping
+
+# Helpers
+import atexit
+import os
+import json
+import threading
+import time
+
+
+class SimStateFileWriter(object):
+    """
+    Writes the state of the simulation to a file for the student code, on a thread of its own.
+
+    The Bokeh thread hands over a snapshot along with the version of the state it was taken
+    at, which is cheap, and goes on. The writer only ever writes the latest snapshot it was
+    given (anything older that it didn't get to is skipped), and nothing at all if the version
+    didn't move. The file is written next to where it goes and moved into place, so whoever
+    reads it sees either the previous state or the new one, never half of one. The writer is
+    stopped when the Visualizer exits, so the last state makes it into the file.
+
+    Attributes
+    ----------
+    filepath : str
+        Where the state goes.
+    written_version : int
+        Version of the state that's in the file (-1 if nothing was written yet).
+    writes : int
+        How many times the file was written.
+    write_time : float
+        How long all of the writes took together (in s).
+    log_interval : float
+        How often the cost of the writes gets logged (in s).
+
+    Methods
+    -------
+    submit(version: int, state: dict)
+        Hands over a snapshot of the state to be written.
+    stop()
+        Writes whatever is left and stops the thread.
+    """
+
+    def __init__(self, filepath: str, log_interval: float = 60.0) -> None:
+        """
+        Starts the writer thread.
+
+        Parameters
+        ----------
+        filepath : str
+            Where the state goes.
+        log_interval : float, optional
+            How often the cost of the writes gets logged (in s), by default 60.0.
+        """
+
+        self.filepath = filepath
+        self.written_version = -1
+        self.writes = 0
+        self.write_time = 0.0
+        self.log_interval = log_interval
+        self.last_log = time.time()
+
+        self.pending = None
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="sim-state-file", daemon=True)
+        self.thread.start()
+        # The thread doesn't keep the Visualizer from exiting, so finish up on the way out
+        atexit.register(self.stop)
+
+    def submit(self, version: int, state: dict) -> None:
+        """
+        Hands over a snapshot of the state to be written (does nothing if that version is already in the file).
+
+        Parameters
+        ----------
+        version : int
+            Version of the state the snapshot was taken at.
+        state : dict
+            Values to write, with the shapely polygon of each of the fires keyed by their id under 'fire_polygons'.
+        """
+
+        with self.condition:
+            if(version == self.written_version or (self.pending is not None and self.pending[0] == version)):
+                return
+            self.pending = (version, state)
+            self.condition.notify()
+
+    def stop(self) -> None:
+        """
+        Writes whatever is left and stops the thread.
+        """
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join()
+        atexit.unregister(self.stop)
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopped:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                version, state = self.pending
+                self.pending = None
+
+            start = time.perf_counter()
+            try:
+                self.write(version, state)
+            except OSError as e:
+                log.error(" --- Couldn't write the state of the simulation to " + self.filepath + ": " + str(e))
+                continue
+            self.write_time += time.perf_counter() - start
+            self.writes += 1
+            self.written_version = version
+
+            now = time.time()
+            if(now - self.last_log >= self.log_interval):
+                log.info(" --- Wrote the state of the simulation {} times, {:.2f} ms each on average (version {})".format(
+                    self.writes, self.write_time / self.writes * 1000.0, version))
+                self.last_log = now
+
+    def write(self, version: int, state: dict) -> None:
+        fires = state['fire_polygons']
+        state = dict(state, version=version)
+        # The ids let readers tell which fires changed
+        state['fire_ids'] = list(fires.keys())
+        state['fire_polygons'] = [mapping(poly) for poly in fires.values()]
+        temp_filepath = self.filepath + ".tmp"
+        with open(temp_filepath, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        # Readers get either the old file or the new one
+        os.replace(temp_filepath, self.filepath)
@@ -0,0 +1,170 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+# Shape tools
+from shapely.geometry.base import BaseGeometry
+from shapely.prepared import prep
+from rtree import index
+
+
+class ObjectIndex(object):
+    """
+    Persistent spatial index over the objects of interest.
+
+    The R-tree is built once when the map loads and then kept up to date in place as
+    objects change, so a lookup is a log-time bounding box query followed by an exact
+    intersection test against only the candidates it returned.
+
+    Attributes
+    ----------
+    rtree : rtree.index.Index
+        R-tree over the bounds of the objects of interest.
+    geometries : dict
+        The indexed geometries keyed by their id.
+
+    Methods
+    -------
+    insert(obj_id: int, geometry: BaseGeometry)
+        Adds an object to the index.
+    update(obj_id: int, geometry: BaseGeometry)
+        Replaces the geometry of an object that is already in the index.
+    remove(obj_id: int)
+        Removes an object from the index.
+    query(geometry: BaseGeometry, candidates: list=None)
+        Finds the ids of the objects that intersect with the given geometry.
+    candidates_many(bounds: numpy.ndarray)
+        Finds the objects whose bounding boxes overlap with each of the given bounding boxes in one go.
+    """
+
+    def __init__(self, geometries: list = (), bounds: np.ndarray = None) -> None:
+        """
+        Makes the index.
+
+        Parameters
+        ----------
+        geometries : list, optional
+            Geometries to bulk load into the index, their position in the list is used as their id.
+        bounds : numpy.ndarray, optional
+            Bounds (minx, miny, maxx, maxy) of each of the geometries if they're already known, by default None.
+        """
+
+        self.geometries = dict(enumerate(geometries))
+        if(bounds is not None and len(self.geometries) > 0):
+            # Straight from the arrays, without going through the geometries one by one
+            bounds = np.asarray(bounds, dtype=float)
+            self.rtree = index.Index((np.arange(len(bounds), dtype=np.int64), bounds[:, :2].copy(), bounds[:, 2:].copy()))
+        elif(len(self.geometries) > 0):
+            # Bulk loading is a lot faster than inserting the objects one by one
+            self.rtree = index.Index((obj_id, geometry.bounds, None)
+                                     for obj_id, geometry in self.geometries.items())
+        else:
+            self.rtree = index.Index()
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    def insert(self, obj_id: int, geometry: BaseGeometry) -> None:
+        """
+        Adds an object to the index.
+
+        Parameters
+        ----------
+        obj_id : int
+            Id of the object.
+        geometry : BaseGeometry
+            Geometry of the object.
+        """
+
+        self.geometries[obj_id] = geometry
+        self.rtree.insert(obj_id, geometry.bounds)
+
+    def update(self, obj_id: int, geometry: BaseGeometry) -> None:
+        """
+        Replaces the geometry of an object that is already in the index.
+
+        Parameters
+        ----------
+        obj_id : int
+            Id of the object.
+        geometry : BaseGeometry
+            New geometry of the object.
+        """
+
+        old_geometry = self.geometries[obj_id]
+        # Only touch the tree if the bounds actually moved
+        if(old_geometry.bounds != geometry.bounds):
+            self.rtree.delete(obj_id, old_geometry.bounds)
+            self.rtree.insert(obj_id, geometry.bounds)
+        self.geometries[obj_id] = geometry
+
+    def remove(self, obj_id: int) -> None:
+        """
+        Removes an object from the index.
+
+        Parameters
+        ----------
+        obj_id : int
+            Id of the object.
+        """
+
+        geometry = self.geometries.pop(obj_id)
+        self.rtree.delete(obj_id, geometry.bounds)
+
+    def query(self, geometry: BaseGeometry, candidates: list = None) -> list:
+        """
+        Finds the objects that intersect with the given geometry.
+
+        Parameters
+        ----------
+        geometry : BaseGeometry
+            The geometry to check against (e.g. the drone's area of influence).
+        candidates : list, optional
+            Ids of the objects that could intersect (from candidates_many), by default None (look them up).
+            Objects that were removed since are skipped.
+
+        Returns
+        -------
+        list
+            Sorted ids of the objects that intersect with the given geometry.
+        """
+
+        # Bounding box hits are only candidates, so refine them with the exact geometry
+        if candidates is None:
+            candidates = list(self.rtree.intersection(geometry.bounds))
+        if(len(candidates) == 0):
+            return []
+
+        prepared_geometry = prep(geometry)
+        return sorted(obj_id for obj_id in candidates
+                      if obj_id in self.geometries and prepared_geometry.intersects(self.geometries[obj_id]))
+
+    def candidates_many(self, bounds: np.ndarray) -> list:
+        """
+        Finds the objects whose bounding boxes overlap with each of the given bounding boxes in one go.
+
+        The whole batch is a single query against the tree. Objects that only shrink stay
+        within their old bounding boxes, so the candidates can be refined later with query().
+
+        Parameters
+        ----------
+        bounds : numpy.ndarray
+            Bounding boxes to check against, one (minx, miny, maxx, maxy) row each.
+
+        Returns
+        -------
+        list
+            Ids of the candidate objects for each of the bounding boxes (a list for each, in order).
+        """
+
+        if(len(bounds) == 0 or len(self.geometries) == 0):
+            return [[] for row in bounds]
+
+        bounds = np.asarray(bounds, dtype=float)
+        ids, counts = self.rtree.intersection_v(bounds[:, :2], bounds[:, 2:])
+        ends = np.cumsum(counts)
+        return [ids[end - count:end].tolist() for end, count in zip(ends, counts)]
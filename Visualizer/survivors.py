@@ -0,0 +1,184 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+# Same sphere the circles get drawn on
+from geodesy import EARTH_RADIUS_M
+
+
+class SurvivorIndex(object):
+    """
+    Finds the survivors within a given distance of a point.
+
+    The survivors are put into a local metric frame once (meters north of the middle of
+    the map) and sorted, so a lookup is a binary search for the band of survivors that
+    could possibly be in reach followed by an exact great-circle (haversine) distance test
+    against only those. No two points can be closer than the difference in their
+    latitudes, so the band never misses anyone.
+
+    Attributes
+    ----------
+    lons : numpy.ndarray
+        Longitudes of the survivors in degrees (in map order).
+    lats : numpy.ndarray
+        Latitudes of the survivors in degrees (in map order).
+    found : numpy.ndarray
+        Whether each of the survivors has been found yet (in map order).
+    order : numpy.ndarray
+        Ids of the survivors sorted by how far north they are.
+    norths : numpy.ndarray
+        Meters north of the middle of the map of each survivor (sorted).
+
+    Methods
+    -------
+    within(lon: float, lat: float, distance: float)
+        Finds the survivors within the given distance of a point.
+    within_many(lons: list, lats: list, distance: float)
+        Finds the survivors within the given distance of any of the given points.
+    find(lon: float, lat: float, distance: float)
+        Finds the survivors within the given distance of a point that weren't found before and marks them found.
+    find_many(lons: list, lats: list, distance: float)
+        Finds the survivors within the given distance of any of the given points that weren't found before and marks them found.
+    """
+
+    def __init__(self, lons, lats) -> None:
+        """
+        Makes the index.
+
+        Parameters
+        ----------
+        lons : array-like
+            Longitudes of the survivors in degrees.
+        lats : array-like
+            Latitudes of the survivors in degrees.
+        """
+
+        self.lons = np.asarray(lons, dtype=float).ravel()
+        self.lats = np.asarray(lats, dtype=float).ravel()
+        self.found = np.zeros(len(self.lats), dtype=bool)
+
+        self.lat_origin = float(np.mean(self.lats)) if len(self.lats) > 0 else 0.0
+        north = EARTH_RADIUS_M * np.radians(self.lats - self.lat_origin)
+        self.order = np.argsort(north, kind='stable')
+        self.norths = north[self.order]
+
+        # Kept around in radians so every lookup doesn't have to convert them again
+        self.lons_rad = np.radians(self.lons)
+        self.lats_rad = np.radians(self.lats)
+        self.cos_lats = np.cos(self.lats_rad)
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def within(self, lon: float, lat: float, distance: float) -> np.ndarray:
+        """
+        Finds the survivors within the given distance of a point.
+
+        Parameters
+        ----------
+        lon : float
+            Longitude of the point in degrees.
+        lat : float
+            Latitude of the point in degrees.
+        distance : float
+            Great-circle distance in meters (inclusive).
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted ids of the survivors within the distance.
+        """
+
+        return self.within_many((lon,), (lat,), distance)
+
+    def within_many(self, lons, lats, distance: float) -> np.ndarray:
+        """
+        Finds the survivors within the given distance of any of the given points in one vectorized pass.
+
+        Parameters
+        ----------
+        lons : array-like
+            Longitudes of the points in degrees.
+        lats : array-like
+            Latitudes of the points in degrees.
+        distance : float
+            Great-circle distance in meters (inclusive).
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted ids of the survivors within the distance of at least one of the points.
+        """
+
+        lons = np.asarray(lons, dtype=float).ravel()
+        lats = np.asarray(lats, dtype=float).ravel()
+        norths = EARTH_RADIUS_M * np.radians(lats - self.lat_origin)
+        starts = np.searchsorted(self.norths, norths - distance, side='left')
+        stops = np.searchsorted(self.norths, norths + distance, side='right')
+        counts = np.maximum(stops - starts, 0)
+        total = int(counts.sum())
+        if(total == 0):
+            return np.empty(0, dtype=int)
+
+        # Pair every point up with each of the survivors in its band (flattened)
+        points = np.repeat(np.arange(len(lats)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidates = self.order[np.repeat(starts, counts) + offsets]
+
+        lons_rad = np.radians(lons)[points]
+        lats_rad = np.radians(lats)[points]
+        # https://en.wikipedia.org/wiki/Haversine_formula
+        half_chord = (np.sin((self.lats_rad[candidates] - lats_rad) / 2.0) ** 2
+                      + np.cos(lats_rad) * self.cos_lats[candidates]
+                      * np.sin((self.lons_rad[candidates] - lons_rad) / 2.0) ** 2)
+        meters = 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(half_chord, 0.0, 1.0)))
+        return np.unique(candidates[meters <= distance])
+
+    def find(self, lon: float, lat: float, distance: float) -> np.ndarray:
+        """
+        Finds the survivors within the given distance of a point that weren't found before and marks them found.
+
+        Parameters
+        ----------
+        lon : float
+            Longitude of the point in degrees.
+        lat : float
+            Latitude of the point in degrees.
+        distance : float
+            Great-circle distance in meters (inclusive).
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted ids of the newly found survivors.
+        """
+
+        return self.find_many((lon,), (lat,), distance)
+
+    def find_many(self, lons, lats, distance: float) -> np.ndarray:
+        """
+        Finds the survivors within the given distance of any of the given points that weren't found before and marks them found.
+
+        Parameters
+        ----------
+        lons : array-like
+            Longitudes of the points in degrees.
+        lats : array-like
+            Latitudes of the points in degrees.
+        distance : float
+            Great-circle distance in meters (inclusive).
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted ids of the newly found survivors.
+        """
+
+        ids = self.within_many(lons, lats, distance)
+        new_ids = ids[~self.found[ids]]
+        self.found[new_ids] = True
+        return new_ids
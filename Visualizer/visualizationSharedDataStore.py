@@ -41,6 +41,32 @@ class VisualizationSharedDataStore(object):
         the mode that the visualization is running in
     map_name : str
         name of the map the visualization is working with (can be None)
+    water_mode : str
+        how to check if the drone is over water ('exact' geometry or 'raster' mask)
+    water_resolution : float
+        size of a pixel of the water mask in meters (only used in 'raster' water mode)
+    track_rollover : int
+        maximum number of fixes of the drone track kept and drawn
+    grpc_mode : str
+        where the grpc server runs ('process' of its own or 'loop' on the Bokeh server's event loop)
+    grpc_port : int
+        TCP port the grpc server listens on
+    grpc_uds : str
+        path of a Unix domain socket the grpc server also listens on (can be None)
+    drones : int
+        most drones the student code flies at once
+    grpc_workers : int
+        most grpc calls handled at once ('process' grpc mode only, two for each drone's streams plus a few for everything else)
+    grpc_max_streams : int
+        most grpc calls open at once on a connection (None for grpc's default)
+    grpc_max_message_size : int
+        biggest grpc message in bytes (None for grpc's default)
+    grpc_keepalive_ms : int
+        how often the grpc server pings quiet connections in ms (None for grpc's default)
+    ingest_limit : int
+        most locations that can be waiting to be scored
+    ingest_policy : str
+        what to do when ingest_limit is reached ('block' the student code, 'drop-oldest' locations, or score them all but draw only the 'latest')
     """
     
     # The group below inherits from this object (as assigned in main.py)
@@ -53,4 +79,20 @@ class VisualizationSharedDataStore(object):
     mode = Mode.VISUALIZATION
     map_name = None
     
-    viz_file_io = '.temp/sim_data.json'
\ No newline at end of file
+    water_mode = 'exact'
+    water_resolution = 1.0
+    track_rollover = 60000
+    
+    grpc_mode = 'process'
+    grpc_port = 51052
+    grpc_uds = None
+    drones = 5
+    grpc_workers = 14
+    grpc_max_streams = None
+    grpc_max_message_size = None
+    grpc_keepalive_ms = None
+    ingest_limit = 65536
+    ingest_policy = 'block'
+    
+    viz_file_io = '.temp/sim_data.json'
+    viz_state_channel = '.temp/sim_state.bin'
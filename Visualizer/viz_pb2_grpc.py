@@ -31,6 +31,21 @@ class Momentum22VizStub(object):
                 request_serializer=viz__pb2.Location.SerializeToString,
                 response_deserializer=viz__pb2.ReqAck.FromString,
                 )
+        self.StreamDroneLocations = channel.stream_unary(
+                '/Momentum22Viz/StreamDroneLocations',
+                request_serializer=viz__pb2.Location.SerializeToString,
+                response_deserializer=viz__pb2.ReqAck.FromString,
+                )
+        self.SetDroneLocationBatch = channel.unary_unary(
+                '/Momentum22Viz/SetDroneLocationBatch',
+                request_serializer=viz__pb2.LocationBatch.SerializeToString,
+                response_deserializer=viz__pb2.ReqAck.FromString,
+                )
+        self.WatchSimState = channel.unary_stream(
+                '/Momentum22Viz/WatchSimState',
+                request_serializer=viz__pb2.WatchRequest.SerializeToString,
+                response_deserializer=viz__pb2.SimState.FromString,
+                )
 
 
 class Momentum22VizServicer(object):
@@ -68,6 +83,38 @@ class Momentum22VizServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamDroneLocations(self, request_iterator, context):
+        """
+        Client: Student Code
+        Server: Visualization
+        Streams the drone's positions to the visualization over one long-lived call (no per-location acknowledgement).
+        The acknowledgement of the last location received is sent when the student code closes the stream.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SetDroneLocationBatch(self, request, context):
+        """
+        Client: Student Code (or anything else that buffers locations, e.g. replays)
+        Server: Visualization
+        Sets a batch of the drone's positions in the visualization in one go
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WatchSimState(self, request, context):
+        """
+        Client: Student Code
+        Server: Visualization
+        Streams the state of the simulation to the student code as soon as it changes.
+        The first message has everything (full is set), the ones after it only have the fires that changed.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_Momentum22VizServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -86,6 +133,21 @@ def add_Momentum22VizServicer_to_server(servicer, server):
                     request_deserializer=viz__pb2.Location.FromString,
                     response_serializer=viz__pb2.ReqAck.SerializeToString,
             ),
+            'StreamDroneLocations': grpc.stream_unary_rpc_method_handler(
+                    servicer.StreamDroneLocations,
+                    request_deserializer=viz__pb2.Location.FromString,
+                    response_serializer=viz__pb2.ReqAck.SerializeToString,
+            ),
+            'SetDroneLocationBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.SetDroneLocationBatch,
+                    request_deserializer=viz__pb2.LocationBatch.FromString,
+                    response_serializer=viz__pb2.ReqAck.SerializeToString,
+            ),
+            'WatchSimState': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchSimState,
+                    request_deserializer=viz__pb2.WatchRequest.FromString,
+                    response_serializer=viz__pb2.SimState.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'Momentum22Viz', rpc_method_handlers)
@@ -148,3 +210,54 @@ class Momentum22Viz(object):
             viz__pb2.ReqAck.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def StreamDroneLocations(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/Momentum22Viz/StreamDroneLocations',
+            viz__pb2.Location.SerializeToString,
+            viz__pb2.ReqAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def SetDroneLocationBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/Momentum22Viz/SetDroneLocationBatch',
+            viz__pb2.LocationBatch.SerializeToString,
+            viz__pb2.ReqAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def WatchSimState(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/Momentum22Viz/WatchSimState',
+            viz__pb2.WatchRequest.SerializeToString,
+            viz__pb2.SimState.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -0,0 +1,436 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Shape tools
+from shapely.geometry import box, Polygon, LineString, LinearRing
+from shapely.geometry.base import BaseGeometry
+from shapely.ops import unary_union
+from shapely.prepared import prep
+from shapely import wkb
+from rtree import index
+import geodesy
+
+# Rasterizing
+from PIL import Image, ImageDraw
+import numpy as np
+
+# Helpers
+from bokeh.util.logconfig import bokeh_logger as log
+import hashlib
+import math
+import os
+import time
+import pickle as binlib
+
+
+def hash_file(filepath: str) -> str:
+    """
+    Hashes the contents of a file.
+
+    Parameters
+    ----------
+    filepath : str
+        The file to hash.
+
+    Returns
+    -------
+    str
+        Hex digest of the file contents.
+    """
+
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_water_query(map_name: str, bounds: tuple, source_filepath: str = 'data/waterbodies.geojson',
+                     cache_dir: str = '.temp', margin: float = 0.05) -> 'WaterQuery':
+    """
+    Loads the waterbodies around the map, from the cache if possible.
+
+    The first time a map is loaded its waterbodies are read from the GeoJSON file, clipped to
+    the map bounds plus the margin and saved as WKB. Every load after that only reads the few
+    clipped parts back from the cache, until the GeoJSON file or the map bounds change.
+
+    Parameters
+    ----------
+    map_name : str
+        Name of the map (used to name the cache file).
+    bounds : tuple
+        Map bounds (minx, miny, maxx, maxy) in lat/lon.
+    source_filepath : str, optional
+        GeoJSON file with the waterbodies, by default 'data/waterbodies.geojson'.
+    cache_dir : str, optional
+        Directory to cache the clipped waterbodies in, by default '.temp'.
+    margin : float, optional
+        How far past the map bounds to keep water in degrees, by default 0.05.
+
+    Returns
+    -------
+    WaterQuery
+        The water query for the map.
+    """
+
+    start = time.perf_counter()
+    source_hash = hash_file(source_filepath)
+    key = (source_hash, tuple(float(bound) for bound in bounds), margin)
+    cache_filepath = os.path.join(cache_dir, map_name + '.water.bin')
+
+    water_query = None
+    try:
+        with open(cache_filepath, 'rb') as binfile:
+            cached = binlib.load(binfile)
+        if(cached['key'] == key):
+            water_query = WaterQuery([wkb.loads(part) for part in cached['parts']], bounds, margin,
+                                     source_hash=source_hash, clipped=True)
+            source = "cache"
+    except (OSError, EOFError, KeyError, TypeError, binlib.UnpicklingError):
+        pass
+
+    if water_query is None:
+        # Only pay for geopandas (and parsing all of New England's water) when the cache is stale
+        import geopandas as gpd
+        clip_bbox = (bounds[0] - margin, bounds[1] - margin, bounds[2] + margin, bounds[3] + margin)
+        waterbodies = gpd.read_file(source_filepath, bbox=clip_bbox)
+        water_query = WaterQuery(waterbodies.geometry, bounds, margin, source_hash=source_hash)
+        source = source_filepath
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_filepath, 'wb') as binfile:
+                binlib.dump({'key': key, 'parts': [wkb.dumps(part) for part in water_query.parts]}, binfile)
+        except OSError as e:
+            log.error("Couldn't cache the waterbodies: " + str(e))
+
+    log.info(" --- Waterbodies loaded from {} in {:.1f} ms".format(source, (time.perf_counter() - start) * 1000.0))
+    return water_query
+
+
+class WaterQuery(object):
+    """
+    Answers "is the drone over water?" for the scoring code.
+
+    The waterbodies are clipped to the map bounds (plus a margin), merged, split back
+    into their parts and each part is prepared, so a lookup is an R-tree query followed
+    by a prepared intersection test against only the parts nearby.
+
+    Attributes
+    ----------
+    map_bounds : float tuple
+        Bounds (minx, miny, maxx, maxy) of the map.
+    bbox : float tuple
+        Area (minx, miny, maxx, maxy) the waterbodies were clipped to.
+    source_hash : str
+        Hash of the file the waterbodies came from (None if unknown).
+    parts : shapely geometry list
+        The clipped waterbody parts.
+    prepared_parts : shapely.prepared.PreparedGeometry list
+        The prepared versions of the parts (same order as parts).
+    rtree : rtree.index.Index
+        R-tree over the bounds of the parts.
+
+    Methods
+    -------
+    intersects(geometry: BaseGeometry)
+        Checks if the given geometry touches any water.
+    """
+
+    def __init__(self, geometries: list, bounds: tuple, margin: float = 0.05,
+                 source_hash: str = None, clipped: bool = False) -> None:
+        """
+        Makes the water query.
+
+        Parameters
+        ----------
+        geometries : list
+            Waterbody geometries in lat/lon.
+        bounds : tuple
+            Map bounds (minx, miny, maxx, maxy) in lat/lon.
+        margin : float, optional
+            How far past the map bounds to keep water in degrees, by default 0.05.
+        source_hash : str, optional
+            Hash of the file the waterbodies came from, by default None.
+        clipped : bool, optional
+            Whether the geometries are already clipped, merged and split into parts, by default False.
+        """
+
+        self.map_bounds = tuple(bounds)
+        self.bbox = (bounds[0] - margin, bounds[1] - margin, bounds[2] + margin, bounds[3] + margin)
+        self.source_hash = source_hash
+
+        if clipped:
+            self.parts = list(geometries)
+        else:
+            # Keep only the water around the map and merge anything that overlaps
+            clip_box = box(*self.bbox)
+            clipped_geometries = [geometry.intersection(clip_box) for geometry in geometries
+                                  if geometry is not None and geometry.intersects(clip_box)]
+            self.parts = ([part for part in self.explode(unary_union(clipped_geometries)) if not part.is_empty]
+                          if len(clipped_geometries) > 0
+                          else [])
+        self.prepared_parts = [prep(part) for part in self.parts]
+
+        if(len(self.parts) > 0):
+            self.rtree = index.Index((i, part.bounds, None) for i, part in enumerate(self.parts))
+        else:
+            self.rtree = index.Index()
+
+    def explode(self, geometry: BaseGeometry) -> list:
+        """
+        Splits multi-part geometries and collections into their simple parts.
+
+        Parameters
+        ----------
+        geometry : BaseGeometry
+            The geometry to split.
+
+        Returns
+        -------
+        list
+            The simple parts of the geometry.
+        """
+
+        if hasattr(geometry, 'geoms'):
+            return [part for sub_geometry in geometry.geoms for part in self.explode(sub_geometry)]
+        else:
+            return [geometry]
+
+    def intersects(self, geometry: BaseGeometry) -> bool:
+        """
+        Checks if the given geometry touches any water.
+
+        Parameters
+        ----------
+        geometry : BaseGeometry
+            The geometry to check (e.g. the drone's area of influence).
+
+        Returns
+        -------
+        bool
+            Whether the geometry intersects with any of the waterbodies.
+        """
+
+        for i in self.rtree.intersection(geometry.bounds):
+            if self.prepared_parts[i].intersects(geometry):
+                return True
+        return False
+
+
+class WaterMask(object):
+    """
+    Rasterized version of the waterbodies for constant-time "is the drone over water?" checks.
+
+    The water around the map is burned into a boolean grid at a fixed number of meters per
+    pixel, and a query just looks up the pixels under the drone's area of influence. This
+    makes the check independent of how complicated the coastline is. The grid is cached on
+    disk and rebuilt only when the waterbodies file, the map bounds or the resolution change.
+    Queries that reach past the edge of the grid fall back to the exact geometry.
+
+    Attributes
+    ----------
+    water_query : WaterQuery
+        Exact waterbody geometry the mask is made from (and falls back to).
+    radius : float
+        Radius of the drone's area of influence in meters.
+    resolution : float
+        Size of a pixel in meters.
+    bbox : float tuple
+        Area (minx, miny, maxx, maxy) covered by the mask.
+    pixel_width : float
+        Width of a pixel in degrees of longitude.
+    pixel_height : float
+        Height of a pixel in degrees of latitude.
+    mask : numpy.ndarray
+        Boolean grid (row 0 is the northern edge) that is True over water.
+    stencil : numpy.ndarray
+        Boolean disk of pixels covered by the area of influence around its center pixel.
+    reach : int
+        Number of pixels the area of influence reaches past its center pixel.
+    cache_filepath : str
+        Where the mask is cached.
+
+    Methods
+    -------
+    intersects(geometry: BaseGeometry)
+        Checks if the given area of influence touches any water.
+    """
+
+    def __init__(self, water_query: WaterQuery, map_name: str, radius: float, resolution: float = 1.0,
+                 source_filepath: str = 'data/waterbodies.geojson', cache_dir: str = '.temp',
+                 margin: float = 0.01) -> None:
+        """
+        Makes the mask, reusing the cached one when it's still valid.
+
+        Parameters
+        ----------
+        water_query : WaterQuery
+            Exact waterbody geometry to rasterize.
+        map_name : str
+            Name of the map (used to name the cache file).
+        radius : float
+            Radius of the drone's area of influence in meters.
+        resolution : float, optional
+            Size of a pixel in meters, by default 1.0.
+        source_filepath : str, optional
+            File the waterbodies were read from (its hash invalidates the cache), by default 'data/waterbodies.geojson'.
+        cache_dir : str, optional
+            Directory to cache the mask in, by default '.temp'.
+        margin : float, optional
+            How far past the water query's map bounds the mask reaches in degrees, by default 0.01.
+        """
+
+        self.water_query = water_query
+        self.radius = radius
+        self.resolution = resolution
+
+        # Size of a pixel in degrees at the middle of the map
+        minx, miny, maxx, maxy = water_query.map_bounds
+        center_lon = (minx + maxx) / 2.0
+        center_lat = (miny + maxy) / 2.0
+        self.pixel_height = math.degrees(resolution / geodesy.EARTH_RADIUS_M)
+        self.pixel_width = self.pixel_height / math.cos(math.radians(center_lat))
+
+        # Cover the map plus the margin with whole pixels
+        width = int(math.ceil((maxx - minx + 2 * margin) / self.pixel_width))
+        height = int(math.ceil((maxy - miny + 2 * margin) / self.pixel_height))
+        self.bbox = (center_lon - width * self.pixel_width / 2.0,
+                     center_lat - height * self.pixel_height / 2.0,
+                     center_lon + width * self.pixel_width / 2.0,
+                     center_lat + height * self.pixel_height / 2.0)
+
+        # Offsets of the pixels whose centers are within the area of influence (half a pixel of slack for the edges)
+        reach = int(math.ceil(radius / resolution + 0.5))
+        rows, cols = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+        self.stencil = (rows**2 + cols**2) * resolution**2 <= (radius + 0.5 * resolution)**2
+        self.reach = reach
+
+        self.cache_filepath = os.path.join(cache_dir, map_name + '.water_mask.npz')
+        source_hash = water_query.source_hash if water_query.source_hash is not None else hash_file(source_filepath)
+        self.mask = self.load_cache(source_hash)
+        if self.mask is None:
+            self.mask = self.rasterize(width, height)
+            self.save_cache(source_hash)
+
+    def cache_key(self, source_hash: str) -> np.ndarray:
+        """
+        Makes the key a cached mask has to match to be reused.
+
+        Parameters
+        ----------
+        source_hash : str
+            Hash of the waterbodies file.
+
+        Returns
+        -------
+        numpy.ndarray
+            The key.
+        """
+
+        return np.array([source_hash, repr(tuple(self.bbox)), repr(self.resolution)])
+
+    def load_cache(self, source_hash: str) -> np.ndarray:
+        """
+        Loads the cached mask if there is one that matches this map.
+
+        Parameters
+        ----------
+        source_hash : str
+            Hash of the waterbodies file.
+
+        Returns
+        -------
+        numpy.ndarray
+            The mask or None if there's no valid cached mask.
+        """
+
+        try:
+            with np.load(self.cache_filepath) as cached:
+                if(np.array_equal(cached['key'], self.cache_key(source_hash))):
+                    shape = tuple(cached['shape'])
+                    return np.unpackbits(cached['bits'], count=shape[0] * shape[1]).reshape(shape).astype(bool)
+        except (OSError, KeyError, ValueError):
+            pass
+        return None
+
+    def save_cache(self, source_hash: str) -> None:
+        """
+        Saves the mask to the cache.
+
+        Parameters
+        ----------
+        source_hash : str
+            Hash of the waterbodies file.
+        """
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_filepath), exist_ok=True)
+            np.savez_compressed(self.cache_filepath,
+                                key=self.cache_key(source_hash),
+                                shape=np.array(self.mask.shape),
+                                bits=np.packbits(self.mask))
+        except OSError as e:
+            log.error("Couldn't cache the water mask: " + str(e))
+
+    def rasterize(self, width: int, height: int) -> np.ndarray:
+        """
+        Burns the waterbodies into a boolean grid.
+
+        Parameters
+        ----------
+        width : int
+            Number of pixel columns.
+        height : int
+            Number of pixel rows.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean grid (row 0 is the northern edge) that is True over water.
+        """
+
+        log.info(" --- Rasterizing waterbodies at " + str(self.resolution) + " m per pixel")
+        image = Image.new('1', (width, height), 0)
+        draw = ImageDraw.Draw(image)
+
+        def to_pixels(coords):
+            xy = np.asarray(coords)[:, :2]
+            return list(zip((xy[:, 0] - self.bbox[0]) / self.pixel_width,
+                            (self.bbox[3] - xy[:, 1]) / self.pixel_height))
+
+        for part in self.water_query.parts:
+            if isinstance(part, Polygon):
+                draw.polygon(to_pixels(part.exterior.coords), fill=1, outline=1)
+                for interior in part.interiors:
+                    draw.polygon(to_pixels(interior.coords), fill=0, outline=0)
+            elif isinstance(part, (LineString, LinearRing)):
+                draw.line(to_pixels(part.coords), fill=1, width=1)
+
+        return np.array(image, dtype=bool)
+
+    def intersects(self, geometry: BaseGeometry) -> bool:
+        """
+        Checks if the given area of influence touches any water.
+
+        Parameters
+        ----------
+        geometry : BaseGeometry
+            The drone's area of influence (a circle with the radius the mask was made for).
+
+        Returns
+        -------
+        bool
+            Whether there's water under the area of influence.
+        """
+
+        # The middle of the circle's bounds is its center
+        minx, miny, maxx, maxy = geometry.bounds
+        row = math.floor((self.bbox[3] - (miny + maxy) / 2.0) / self.pixel_height)
+        col = math.floor(((minx + maxx) / 2.0 - self.bbox[0]) / self.pixel_width)
+
+        if(row - self.reach < 0 or col - self.reach < 0 or
+           row + self.reach >= self.mask.shape[0] or col + self.reach >= self.mask.shape[1]):
+            # Past the edge of the mask, so go with the exact geometry
+            return self.water_query.intersects(geometry)
+
+        window = self.mask[row - self.reach:row + self.reach + 1, col - self.reach:col + self.reach + 1]
+        return bool(window[self.stencil].any())
@@ -12,6 +12,7 @@
 # - defines methods that the student's derived class can call to tell the drone to do things
 #
 # The vizualization communications, Mavlink communications, and student code are all in seperate threads.
+# Nothing sent to the Visualizer is waited on, so neither the student code nor MavLink ever block on it.
 
 import sys
 sys.path.append('Visualizer/')
@@ -20,20 +21,40 @@ import time
 import grpc
 import viz_pb2 as viz_connect
 import viz_pb2_grpc as viz_connect_grpc
+from sim_state_channel import SimStateReader
+from spatial_index import ObjectIndex
 import threading
 import mavsdk
 import asyncio
 import navpy
-from shapely.geometry import shape
+from shapely.geometry import shape, Polygon
 import os
 import json
 import math
+import queue
+import collections
 
 class student_base:
 
-	def __init__(self):
-		self.channel = grpc.insecure_channel('localhost:51052')
+	def __init__(self, viz_address=None, drone_id=None):
+		# Where the Visualizer is, e.g. 'unix:/tmp/momentum22.sock' when it was started with --grpc-uds /tmp/momentum22.sock
+		# (skips the TCP stack when both run on the same machine)
+		if viz_address is None:
+			viz_address = os.environ.get('MOMENTUM_VIZ_ADDRESS', 'localhost:51052')
+		# Keep the connection alive while nothing is being sent, and let grpc reconnect on its own (with backoff)
+		self.channel = grpc.insecure_channel(viz_address, options=[('grpc.keepalive_time_ms', 10000),
+		                                                           ('grpc.keepalive_timeout_ms', 5000),
+		                                                           ('grpc.keepalive_permit_without_calls', 1),
+		                                                           ('grpc.http2.max_pings_without_data', 0),
+		                                                           ('grpc.initial_reconnect_backoff_ms', 500),
+		                                                           ('grpc.max_reconnect_backoff_ms', 10000)])
 		self.stub = viz_connect_grpc.Momentum22VizStub(self.channel)
+		# Which drone this is when the Visualizer scores several of them at once
+		if drone_id is None:
+			drone_id = int(os.environ.get('MOMENTUM_DRONE_ID', 0))
+		self.drone_id = drone_id
+		self.viz_connected = False
+		self.channel.subscribe(self.viz_channel_state, try_to_connect=True)
 		self.time = 0
 		self.msgId = 0
 		self.in_air_lp = False
@@ -47,6 +68,11 @@ class student_base:
 		self.telemetry['water_pct_remaining'] = 0
 		self.telemetry['fires_pct_remaining'] = 100
 		self.telemetry['fire_polygons'] = []
+		# The fire polygons together with a spatial index over them (the same R-tree index the Visualizer uses),
+		# set in one assignment so the two always match, e.g.
+		#     polygons, tree = self.telemetry['fires']
+		#     burning = [polygons[i] for i in tree.query(point)]
+		self.telemetry['fires'] = ([], ObjectIndex())
 		self.telemetry['survivors_found'] = 0
 		self.telemetry['velocity'] = 0
 
@@ -61,65 +87,321 @@ class student_base:
 		self.viz_stopping = False
 		self.viz_thread = None
 		self.student_thread = None
+		
+		# Locations go to the Visualizer over one long-lived stream, so they can be sent
+		# a lot more often than the Visualizer's data gets read back
+		self.viz_location_hz = 50
+		self.viz_read_hz = 10
+		
+		# Locations only go out when the drone moved, turned or sped up/slowed down enough since the last one
+		# (or a while passed), so hovering and loitering don't flood the Visualizer.
+		# Moving less than a fifth of the map's radius of influence doesn't change what the drone can reach enough
+		# to matter for the score. The Visualizer sends the radius along with the state of the simulation, until
+		# then the smallest one there is (5 m on fire maps) is assumed.
+		self.viz_radius_of_influence = 5
+		self.viz_deadband_fraction = 0.2
+		self.viz_deadband_heading = 15.0
+		self.viz_deadband_speed = 1.0
+		self.viz_max_interval = 0.5
+		self.viz_last_sent = None
+		self.viz_suppressed = 0
+		self.course = 0
+		self.viz_location_queue = None
+		self.viz_location_stream = None
+		# At most this many locations wait to go out, the oldest ones are dropped past that
+		self.viz_queue_size = 1000
+		self.viz_dropped = 0
+		# How long to wait before opening the stream again after it broke (doubles each time, up to the max)
+		self.viz_backoff_min = 0.5
+		self.viz_backoff_max = 10.0
+		self.viz_backoff = self.viz_backoff_min
+		self.viz_retry_time = 0
+		
+		# Takeoff and landing go out without waiting for the one before to be acknowledged
+		self.viz_notifications = collections.deque()
+		self.viz_in_flight = []
+		self.viz_max_in_flight = 8
+		# Only a Visualizer that's away or too slow to answer is worth trying again (after the same backoff as the stream),
+		# and only this many times, anything else it turns down is dropped
+		self.viz_retry_codes = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+		self.viz_max_attempts = 8
+		
+		# The state of the simulation is pushed over by the Visualizer as soon as it changes
+		# (.temp/sim_state.bin, or .temp/sim_data.json from an older Visualizer, is only read while that isn't working)
+		self.viz_watch_thread = None
+		self.viz_watch_call = None
+		self.viz_watching = False
+		self.viz_fires = {}
+		self.viz_state_reader = SimStateReader('.temp/sim_state.bin')
+		# What the fires looked like last time, so polygons (and the index over them) are only rebuilt when they change
+		self.viz_fire_polygons = {}
+		self.viz_file_stat = None
+		self.viz_file_version = None
+		self.viz_file_fires = {}
 
 	######### Interface for the Viz Thread ###########
 				
 	def viz_thread_start(self):
 		self.viz_thread = threading.Thread(target=self.viz_thread_main, args=(self,))
 		self.viz_thread.start();
+		self.viz_watch_thread = threading.Thread(target=self.viz_watch_thread_main, args=(self,))
+		self.viz_watch_thread.start();
 		
 	def viz_thread_stop(self):
 		self.viz_stopping = True
 		self.viz_thread.join()
+		if self.viz_watch_call is not None:
+			self.viz_watch_call.cancel()
+		self.viz_watch_thread.join()
 		
 	######### Implementation for the Viz Thread ###########
 	
 	def viz_thread_main(self, args):
+		next_read = 0
 		while not self.viz_stopping:
 			self.viz_send_updates()
-			self.viz_read_viz_data()
-			time.sleep(0.1)
+			if not self.viz_watching and time.time() >= next_read:
+				self.viz_read_viz_data()
+				next_read = time.time() + 1.0/self.viz_read_hz
+			time.sleep(1.0/self.viz_location_hz)
+		self.viz_stream_stop()
 					
 	def viz_send_updates(self):
 		self.time = int(time.time()*1000.0)
 		if(self.telemetry['in_air']):
-			self.viz_send_location(self.telemetry['latitude'], self.telemetry['longitude'])
+			if self.viz_location_due():
+				self.viz_send_location(self.telemetry['latitude'], self.telemetry['longitude'])
+			else:
+				self.viz_suppressed += 1
+		else:
+			# The first location after the next takeoff goes out right away
+			self.viz_last_sent = None
 		self.viz_send_ground_state(self.telemetry['in_air'])
 		self.new_data_set = False
 						
+	def viz_channel_state(self, state):
+		# Called by grpc whenever the connection to the Visualizer changes
+		self.viz_connected = (state == grpc.ChannelConnectivity.READY)
+		if self.viz_connected:
+			self.viz_backoff = self.viz_backoff_min
+
+	def viz_location_due(self):
+		lat = self.telemetry['latitude']
+		lon = self.telemetry['longitude']
+		speed = self.telemetry['velocity']
+		now = time.time()
+		last = self.viz_last_sent
+		if last is not None:
+			last_lat, last_lon, last_speed, last_course, last_time = last
+			# Flat earth is plenty over a few meters
+			north = math.radians(lat - last_lat) * 6371000.0
+			east = math.radians(lon - last_lon) * 6371000.0 * math.cos(math.radians(lat))
+			turned = abs((self.course - last_course + 180.0) % 360.0 - 180.0)
+			if (math.hypot(north, east) < self.viz_deadband_fraction * self.viz_radius_of_influence
+					and abs(speed - last_speed) < self.viz_deadband_speed
+					and (turned < self.viz_deadband_heading or speed < 0.5)
+					and now - last_time < self.viz_max_interval):
+				return False
+		self.viz_last_sent = (lat, lon, speed, self.course, now)
+		return True
+
 	def viz_send_location(self, latitude, longitude):
-		loc = viz_connect.Location(msgId=self.msgId, latitude=latitude, longitude=longitude, time=self.time)
+		loc = viz_connect.Location(msgId=self.msgId, latitude=latitude, longitude=longitude, time=self.time, drone_id=self.drone_id)
 		self.msgId += 1
-		ack = self.stub.SetDroneLocation(loc)
+		if self.viz_location_stream is None or self.viz_location_stream.done():
+			# (Re)open the stream if it isn't open yet or the Visualizer went away
+			self.viz_stream_start()
+		self.viz_enqueue(self.viz_location_queue, loc)
+
+	def viz_enqueue(self, location_queue, loc):
+		# Never wait on the Visualizer, make room by dropping the oldest location instead
+		while True:
+			try:
+				location_queue.put_nowait(loc)
+				return
+			except queue.Full:
+				try:
+					location_queue.get_nowait()
+					self.viz_dropped += 1
+				except queue.Empty:
+					pass
+
+	def viz_stream_start(self):
+		now = time.time()
+		old_queue = self.viz_location_queue
+		if self.viz_location_stream is not None:
+			# The stream broke, so wait a bit longer each time before trying again
+			if now < self.viz_retry_time:
+				return
+			self.viz_retry_time = now + self.viz_backoff
+			self.viz_backoff = min(self.viz_backoff * 2, self.viz_backoff_max)
+		self.viz_location_queue = queue.Queue(maxsize=self.viz_queue_size)
+		if old_queue is not None:
+			# Whatever didn't make it out goes out on the new stream, and the old stream gets let go
+			while True:
+				try:
+					loc = old_queue.get_nowait()
+				except queue.Empty:
+					break
+				if loc is not None:
+					self.viz_enqueue(self.viz_location_queue, loc)
+			old_queue.put(None)
+		# Doesn't block, grpc pulls the locations off of the queue in the background as they're put in
+		# (and holds on to them until the Visualizer is there)
+		self.viz_location_stream = self.stub.StreamDroneLocations.future(self.viz_location_iterator(self.viz_location_queue),
+		                                                                 wait_for_ready=True)
+
+	def viz_location_iterator(self, location_queue):
+		while True:
+			loc = location_queue.get()
+			if loc is None:
+				return
+			yield loc
+
+	def viz_stream_stop(self):
+		if self.viz_location_stream is not None:
+			# Closing the stream sends whatever is left and waits for the acknowledgement
+			self.viz_location_queue.put(None)
+			try:
+				ack = self.viz_location_stream.result(timeout=1.0)
+			except (grpc.RpcError, grpc.FutureTimeoutError):
+				self.viz_location_stream.cancel()
+			self.viz_location_stream = None
+		# Give the last takeoff or landing a moment to get there too
+		for call, request, attempt, future in self.viz_in_flight:
+			try:
+				future.result(timeout=1.0)
+			except (grpc.RpcError, grpc.FutureTimeoutError):
+				future.cancel()
+		self.viz_in_flight = []
 
 	def viz_send_ground_state(self, in_air):
 		if in_air != self.in_air_lp:
 			self.in_air_lp = in_air
 			if in_air:
-				tn = viz_connect.TakeoffNotification(msgId=self.msgId, isTakenOff=True, time=self.time)
-				ack = self.stub.SetTakeoffStatus(tn)
+				tn = viz_connect.TakeoffNotification(msgId=self.msgId, isTakenOff=True, time=self.time, drone_id=self.drone_id)
+				self.viz_notifications.append((self.stub.SetTakeoffStatus, tn, 0, 0))
 			if not in_air:
-				ln = viz_connect.LandingNotification(msgId=self.msgId, isLanded=True, time=self.time)
-				ack = self.stub.SetLandingStatus(ln)
+				ln = viz_connect.LandingNotification(msgId=self.msgId, isLanded=True, time=self.time, drone_id=self.drone_id)
+				self.viz_notifications.append((self.stub.SetLandingStatus, ln, 0, 0))
 			self.msgId += 1
+		self.viz_send_notifications()
+
+	def viz_send_notifications(self):
+		# Check on the ones that were sent, and send the ones that didn't make it again (first, to keep them in order)
+		now = time.time()
+		still_in_flight = []
+		retry = []
+		for call, request, attempt, future in self.viz_in_flight:
+			if not future.done():
+				still_in_flight.append((call, request, attempt, future))
+				continue
+			code = future.code()
+			if code in self.viz_retry_codes and attempt + 1 < self.viz_max_attempts:
+				retry.append((call, request, attempt + 1, now + min(self.viz_backoff_min * 2**attempt, self.viz_backoff_max)))
+			elif code != grpc.StatusCode.OK:
+				print("Dropped {} {} after {} attempt(s): {} {}".format(type(request).__name__, request.msgId, attempt + 1, code.name, future.details()))
+		self.viz_in_flight = still_in_flight
+		self.viz_notifications.extendleft(reversed(retry))
+		# Nothing goes out ahead of one that's waiting to be tried again
+		while self.viz_notifications and len(self.viz_in_flight) < self.viz_max_in_flight and self.viz_notifications[0][3] <= now:
+			call, request, attempt, retry_time = self.viz_notifications.popleft()
+			self.viz_in_flight.append((call, request, attempt, call.future(request, timeout=30.0, wait_for_ready=True)))
   
+	def viz_watch_thread_main(self, args):
+		while not self.viz_stopping:
+			try:
+				self.viz_watch_call = self.stub.WatchSimState(viz_connect.WatchRequest(msgId=self.msgId), wait_for_ready=True)
+				for state in self.viz_watch_call:
+					self.viz_apply_sim_state(state)
+			except grpc.RpcError:
+				# The Visualizer isn't up (yet) or went away, fall back on the file until it's back
+				pass
+			self.viz_watching = False
+			if not self.viz_stopping:
+				time.sleep(1.0)
+
+	def viz_apply_sim_state(self, state):
+		if state.full:
+			self.viz_fires = {}
+		for fire_id in state.extinguished_fires:
+			self.viz_fires.pop(fire_id, None)
+		for fire in state.changed_fires:
+			self.viz_fires[fire.id] = Polygon(zip(fire.longitude, fire.latitude))
+		self.telemetry['water_pct_remaining'] = state.water_pct_remaining
+		for drone in state.drones:
+			if drone.drone_id == self.drone_id:
+				self.telemetry['water_pct_remaining'] = drone.water_pct_remaining
+		self.telemetry['fires_pct_remaining'] = state.fires_pct_remaining
+		if state.radius_of_influence > 0:
+			self.viz_radius_of_influence = state.radius_of_influence
+		self.viz_set_fires(self.viz_fires)
+		self.telemetry['survivors_found'] = state.survivors_found
+		self.viz_watching = True
+
+	def viz_set_fires(self, fires):
+		# Fires that didn't change keep the same polygon, so there's nothing to do if they all did
+		if fires.keys() == self.viz_fire_polygons.keys() and all(fires[fire_id] is poly for fire_id, poly in self.viz_fire_polygons.items()):
+			return
+		self.viz_fire_polygons = dict(fires)
+		polygons = list(fires.values())
+		self.telemetry['fires'] = (polygons, ObjectIndex(polygons))
+		self.telemetry['fire_polygons'] = polygons
+
 	def viz_read_viz_data(self):
+		# Nothing gets copied or parsed unless the Visualizer published something new since the last time
+		if self.viz_state_reader.map is not None or os.path.isfile(self.viz_state_reader.filepath):
+			state = self.viz_state_reader.read()
+			if state is not None:
+				self.telemetry['water_pct_remaining'] = state['drones'].get(self.drone_id, state['water_pct_remaining'])
+				self.telemetry['fires_pct_remaining'] = state['fires_pct_remaining']
+				if state['radius_of_influence'] > 0:
+					self.viz_radius_of_influence = state['radius_of_influence']
+				self.viz_set_fires(state['fire_polygons'])
+				self.telemetry['survivors_found'] = state['survivors_found']
+			return
 		try:
-			if(os.path.getsize('.temp/sim_data.json') > 15 and os.path.isfile('.temp/sim_data.json')):
+			stat = os.stat('.temp/sim_data.json')
+			if((stat.st_mtime_ns, stat.st_size) == self.viz_file_stat):
+				# Hasn't been written since the last time
+				return
+			if(stat.st_size > 15):
 				with open('.temp/sim_data.json', 'r', encoding='utf-8', errors='ignore') as f:
 					data = json.load(f)
+					self.viz_file_stat = (stat.st_mtime_ns, stat.st_size)
+					if(data.get('version') is not None and data['version'] == self.viz_file_version):
+						return
+					self.viz_file_version = data.get('version')
 					if ("water_pct_remaining" in data):
 						self.telemetry['water_pct_remaining'] = data['water_pct_remaining']
+					if ("drones" in data and str(self.drone_id) in data['drones']):
+						self.telemetry['water_pct_remaining'] = data['drones'][str(self.drone_id)]
 					if ("fires_pct_remaining" in data):
 						self.telemetry['fires_pct_remaining'] = data['fires_pct_remaining']
+					if ("radius_of_influence" in data):
+						self.viz_radius_of_influence = data['radius_of_influence']
 					if ("fire_polygons" in data):
-						self.telemetry['fire_polygons'] = [shape(poly) for poly in data['fire_polygons']]
+						self.viz_set_fires(self.viz_decode_fires(data.get('fire_ids', range(len(data['fire_polygons']))), data['fire_polygons']))
 					if ("survivors_found" in data):
 						self.telemetry['survivors_found'] = data['survivors_found']
+		except FileNotFoundError:
+			pass
 		except json.decoder.JSONDecodeError:
 			# print("json error")
 			pass
 
+	def viz_decode_fires(self, fire_ids, polys):
+		# Only the fires whose perimeter changed get turned into polygons again
+		fires = {}
+		for fire_id, poly in zip(fire_ids, polys):
+			cached = self.viz_file_fires.get(fire_id)
+			if cached is not None and cached[0] == poly['coordinates']:
+				fires[fire_id] = cached
+			else:
+				fires[fire_id] = (poly['coordinates'], shape(poly))
+		self.viz_file_fires = fires
+		return {fire_id: cached[1] for fire_id, cached in fires.items()}
+
 	######### MAV Interface ###########
 	
 	def mav_run(self):
@@ -157,6 +439,7 @@ class student_base:
 	async def mav_velocity(self, drone):
 		async for pv in drone.telemetry.position_velocity_ned():
 			self.telemetry['velocity'] = math.sqrt(pv.velocity.north_m_s**2 + pv.velocity.east_m_s**2)
+			self.course = math.degrees(math.atan2(pv.velocity.east_m_s, pv.velocity.north_m_s))
 	
 	async def mav_command_watcher(self, drone):
 		while not self.mav_shutdown:
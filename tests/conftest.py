@@ -0,0 +1,59 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Helpers
+import os
+import sys
+
+import pytest
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The Visualizer and the student code import their modules by name, the same way they do when they run
+sys.path.insert(0, os.path.join(REPO_ROOT, 'Visualizer'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'student'))
+
+
+@pytest.fixture
+def viz_store(monkeypatch, tmp_path):
+    """
+    Shared data store set up for a visualization run from the root of the repo (the maps and
+    waterbodies are found relative to it), with everything it writes going to a temporary directory.
+    """
+
+    from visualizationSharedDataStore import VisualizationSharedDataStore, Mode
+
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setattr(VisualizationSharedDataStore, 'mode', Mode.VISUALIZATION)
+    monkeypatch.setattr(VisualizationSharedDataStore, 'viz_file_io', str(tmp_path / 'sim_data.json'))
+    monkeypatch.setattr(VisualizationSharedDataStore, 'viz_state_channel', str(tmp_path / 'sim_state.bin'))
+    return VisualizationSharedDataStore
+
+
+@pytest.fixture
+def make_data(viz_store, monkeypatch):
+    """
+    Makes a Data for the given map (headless, there's no plot), and cleans up after it.
+    """
+
+    made = []
+
+    def make(map_name, **settings):
+        from data import Data
+
+        monkeypatch.setattr(viz_store, 'map_name', map_name)
+        for name, value in settings.items():
+            monkeypatch.setattr(viz_store, name, value)
+        data = Data()
+        made.append(data)
+        return data
+
+    yield make
+
+    for data in made:
+        data.sim_state_file.stop()
+        for ring in (data.location_ring, data.takeoff_ring, data.landing_ring):
+            ring.unlink()
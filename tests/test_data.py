@@ -0,0 +1,56 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+# Helpers
+import time
+
+
+def queue_locations(data, lons, lats, start_time=1000000, drone_id=0):
+    # The same way the grpc server hands them over
+    data.takeoff_ring.put((0, True, start_time, drone_id))
+    data.check_takeoff_status()
+    count = len(lons)
+    data.location_ring.put_many(msgId=np.arange(count),
+                                latitude=lats,
+                                longitude=lons,
+                                time=start_time + 100 * (np.arange(count) + 1),
+                                drone_id=drone_id)
+
+
+def test_backlog_bigger_than_a_chunk_drains(make_data):
+    data = make_data('boston_fire')
+    # Hovering over a fire, so every location does the full scoring
+    fire = data.polygons_of_interest[0].centroid
+    count = data.ingest_chunk + 500
+    queue_locations(data, np.full(count, fire.x), np.full(count, fire.y))
+
+    updates = 0
+    while(len(data.location_ring) > 0 and updates < 300):
+        before = len(data.location_ring)
+        data.update_local_location()
+        # Each update gets through more than the one location it's guaranteed
+        assert before - len(data.location_ring) > 1 or len(data.location_ring) == 0
+        updates += 1
+    assert len(data.location_ring) == 0
+    assert data.drones[0].status == "In Air"
+
+
+def test_latest_policy_keeps_to_the_budget(make_data):
+    data = make_data('boston_fire', ingest_policy='latest', ingest_limit=4096)
+    fire = data.polygons_of_interest[0].centroid
+    queue_locations(data, np.full(4096, fire.x), np.full(4096, fire.y))
+    track_length = len(data.drones[0].track_source.data['lon'])
+
+    start = time.perf_counter()
+    data.update_local_location()
+    # Only what fits in the budget gets scored, the rest waits for the next update
+    assert time.perf_counter() - start < 0.5
+    assert 0 < len(data.location_ring) < 4096
+    # Everything that was scored got coalesced into the one location drawn
+    assert len(data.drones[0].track_source.data['lon']) == track_length + 1
+    assert data.coalesced_locations == 4096 - len(data.location_ring) - 1
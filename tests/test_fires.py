@@ -0,0 +1,32 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Shape tools
+from shapely.geometry import Point, box
+
+import pytest
+
+from fires import FireStore
+
+
+def test_ids_stay_put_when_a_fire_goes_out():
+    fires = FireStore([box(0, 0, 1, 1), box(2, 0, 3, 1), box(4, 0, 5, 1)], [10.0, 20.0, 30.0])
+    fires.extinguish(1)
+    assert len(fires) == 2 and 1 not in fires
+    assert fires[2].bounds == (4, 0, 5, 1)
+    assert fires.index.query(Point(2.5, 0.5)) == []
+    assert fires.index.query(Point(4.5, 0.5)) == [2]
+    with pytest.raises(KeyError):
+        fires.extinguish(1)
+
+
+def test_area_is_kept_up_to_date():
+    fires = FireStore([box(0, 0, 1, 1), box(2, 0, 3, 1)], [10.0, 20.0])
+    assert fires.starting_area == fires.area_now == 30.0
+    fires.update(0, box(0, 0, 0.5, 1), 5.0)
+    assert fires.area_now == 25.0
+    assert fires.index.query(Point(0.75, 0.5)) == []
+    fires.extinguish(1)
+    assert fires.area_now == 5.0 and fires.starting_area == 30.0
@@ -0,0 +1,51 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+# Shape tools
+from shapely.geometry import Point
+
+import pytest
+
+import geodesy
+
+
+def great_circle(lon1, lat1, lon2, lat2):
+    # Haversine distance on the same sphere, in m
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * geodesy.EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+@pytest.mark.parametrize('lon, lat', [(-71.06, 42.36), (0.0, 0.0), (179.99, -60.0)])
+def test_circle_vertices_are_radius_away(lon, lat):
+    ring = geodesy.point_to_ring(lon, lat, 25.0)
+    assert len(ring) == len(Point(0, 0).buffer(1.0).exterior.coords)
+    assert np.array_equal(ring[0], ring[-1])
+    assert np.allclose(great_circle(lon, lat, ring[:, 0], ring[:, 1]), 25.0, rtol=1e-9)
+
+
+def test_batch_matches_single_points():
+    lons = np.array([-71.06, -70.5, -72.0])
+    lats = np.array([42.36, 41.9, 43.1])
+    rings = geodesy.points_to_rings(lons, lats, 100.0)
+    assert rings.shape[0] == 3
+    for lon, lat, ring in zip(lons, lats, rings):
+        assert np.array_equal(ring, geodesy.point_to_ring(lon, lat, 100.0))
+    circles = geodesy.points_to_circles(lons, lats, 100.0)
+    assert all(circle.is_valid and circle.contains(Point(lon, lat)) for circle, lon, lat in zip(circles, lons, lats))
+
+
+def test_matches_the_projected_buffer():
+    # Same circle the local azimuthal equidistant projection used to make
+    pyproj = pytest.importorskip('pyproj')
+    lon, lat = -71.06, 42.36
+    aeqd = pyproj.Transformer.from_crs('+proj=aeqd +R=6371000 +units=m +lat_0={} +lon_0={}'.format(lat, lon),
+                                       'EPSG:4326', always_xy=True)
+    ring = np.asarray(Point(0, 0).buffer(25.0).exterior.coords)
+    expected = np.column_stack(aeqd.transform(ring[:, 0], ring[:, 1]))
+    assert np.allclose(geodesy.point_to_ring(lon, lat, 25.0), expected, atol=1e-9)
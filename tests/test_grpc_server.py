@@ -0,0 +1,143 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Grpc
+import grpc
+from concurrent import futures
+
+# Helpers
+import time
+
+import pytest
+
+import grpc_server
+import viz_pb2 as viz_connect
+import viz_pb2_grpc as viz_connect_grpc
+from shared_ring import SharedRing, LOCATION_RECORD, TAKEOFF_RECORD, LANDING_RECORD
+
+
+@pytest.fixture
+def rings():
+    made = (SharedRing(LANDING_RECORD, 16), SharedRing(TAKEOFF_RECORD, 16), SharedRing(LOCATION_RECORD, 256))
+    yield made
+    for ring in made:
+        ring.unlink()
+
+
+@pytest.fixture
+def serve(rings):
+    # Serves on a free port with the given number of worker threads, the same way serveGrpc does
+    servers = []
+
+    def start(workers):
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers), options=grpc_server.SERVER_OPTIONS)
+        servicer = grpc_server.Momentum22VizServicer(*rings, workers=workers)
+        viz_connect_grpc.add_Momentum22VizServicer_to_server(servicer, server)
+        port = server.add_insecure_port('localhost:0')
+        server.start()
+        channel = grpc.insecure_channel('localhost:' + str(port))
+        servers.append((server, channel))
+        return servicer, viz_connect_grpc.Momentum22VizStub(channel)
+
+    yield start
+
+    for server, channel in servers:
+        channel.close()
+        server.stop(None)
+
+
+def test_default_workers_leave_room_for_one_off_calls():
+    drones = grpc_server.DEFAULT_DRONES
+    assert grpc_server.default_workers(drones) >= grpc_server.STREAMS_PER_DRONE * drones + 1
+    assert grpc_server.default_workers(10) > grpc_server.default_workers(5)
+
+
+def test_streams_cant_take_every_worker(serve, rings):
+    servicer, stub = serve(workers=grpc_server.SPARE_WORKERS + 2)
+    servicer.apply_sim_state(viz_connect.SimState(survivors_found=1))
+
+    # Two streams fit, each one gets the state as it is
+    watchers = [stub.WatchSimState(viz_connect.WatchRequest()) for _ in range(2)]
+    assert all(next(watcher).survivors_found == 1 for watcher in watchers)
+
+    # The third is turned down right away instead of waiting for a worker thread
+    with pytest.raises(grpc.RpcError) as error:
+        next(stub.WatchSimState(viz_connect.WatchRequest()))
+    assert error.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+
+    # And a takeoff still gets through
+    stub.SetTakeoffStatus(viz_connect.TakeoffNotification(msgId=1, isTakenOff=True, time=1000, drone_id=0), timeout=5)
+    assert rings[1].peek().tolist() == [(1, True, 1000, 0)]
+
+    # Hanging up gives the worker thread back (the watcher notices within a second)
+    watchers[0].cancel()
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            watcher = stub.WatchSimState(viz_connect.WatchRequest())
+            assert next(watcher).survivors_found == 1
+            watcher.cancel()
+            break
+        except grpc.RpcError:
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+    watchers[1].cancel()
+
+
+def test_batch_columns_must_line_up(serve, rings):
+    servicer, stub = serve(workers=8)
+    assert grpc_server.batch_error(viz_connect.LocationBatch(latitude=[1.0], longitude=[2.0], time=[3])) is None
+    with pytest.raises(grpc.RpcError) as error:
+        stub.SetDroneLocationBatch(viz_connect.LocationBatch(msgId=1, latitude=[42.0, 42.1], longitude=[-71.0], time=[1, 2]), timeout=5)
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert '2, 1 and 2' in error.value.details()
+    assert len(rings[2].peek()) == 0
+
+    ack = stub.SetDroneLocationBatch(viz_connect.LocationBatch(msgId=2, latitude=[42.0, 42.1], longitude=[-71.0, -71.1],
+                                                               time=[1, 2], drone_id=3), timeout=5)
+    assert ack.msgId == 2
+    assert rings[2].peek().tolist() == [(2, 42.0, -71.0, 1, 3), (2, 42.1, -71.1, 2, 3)]
+
+
+def fire(fire_id, lon):
+    return viz_connect.FirePolygon(id=fire_id, longitude=[lon, lon + 1, lon], latitude=[42.0, 42.0, 43.0])
+
+
+def test_sim_state_since_only_has_what_changed(rings):
+    servicer = grpc_server.Momentum22VizServicer(*rings)
+    servicer.apply_sim_state(viz_connect.SimState(survivors_found=1, changed_fires=[fire(0, -71), fire(1, -70)]))
+    servicer.apply_sim_state(viz_connect.SimState(survivors_found=2, changed_fires=[fire(1, -69)]))
+    servicer.apply_sim_state(viz_connect.SimState(survivors_found=2, extinguished_fires=[0]))
+
+    # Everything that's still burning for a new watcher
+    state = servicer.sim_state_since(0)
+    assert state.full and state.version == 3 and state.survivors_found == 2
+    assert [(f.id, f.longitude[0]) for f in state.changed_fires] == [(1, -69)]
+    assert list(state.extinguished_fires) == []
+
+    # Only the changes since then for one that's caught up to a version
+    state = servicer.sim_state_since(1)
+    assert not state.full
+    assert [f.id for f in state.changed_fires] == [1] and list(state.extinguished_fires) == [0]
+    state = servicer.sim_state_since(2)
+    assert list(state.changed_fires) == [] and list(state.extinguished_fires) == [0]
+    state = servicer.sim_state_since(3)
+    assert list(state.changed_fires) == [] and list(state.extinguished_fires) == []
+
+
+def test_watchers_get_the_changes_as_they_happen(serve):
+    servicer, stub = serve(workers=8)
+    servicer.apply_sim_state(viz_connect.SimState(survivors_found=1, changed_fires=[fire(0, -71), fire(1, -70)]))
+    watcher = stub.WatchSimState(viz_connect.WatchRequest())
+    try:
+        first = next(watcher)
+        assert first.full and sorted(f.id for f in first.changed_fires) == [0, 1]
+
+        servicer.apply_sim_state(viz_connect.SimState(survivors_found=2, extinguished_fires=[1]))
+        second = next(watcher)
+        assert not second.full and second.survivors_found == 2
+        assert list(second.changed_fires) == [] and list(second.extinguished_fires) == [1]
+    finally:
+        watcher.cancel()
@@ -0,0 +1,116 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+# Helpers
+import json
+import os
+
+from map_record import write_map_record, read_map_record, read_map_record_header, load_map, hash_map_file
+
+
+MAP = {'map_name': 'test_fire',
+       'map_type': 0,
+       'bounds': {'minx': [-71.1], 'miny': [42.3], 'maxx': [-71.0], 'maxy': [42.4]},
+       'wind': {'spd_kts': 5, 'dir_deg': 90},
+       'data_fs': {'xs': [[-71.05, -71.04, -71.04, -71.05], [-71.08, -71.07, -71.075]],
+                   'ys': [[42.35, 42.35, 42.36, 42.36], [42.31, 42.31, 42.32]]},
+       'data_snr': {'x': [-71.02, -71.03],
+                    'y': [42.33, 42.34]}}
+
+
+def write_json_map(maps_dir, map_data):
+    os.makedirs(maps_dir, exist_ok=True)
+    filepath = os.path.join(maps_dir, map_data['map_name'] + ".json")
+    with open(filepath, 'w') as f:
+        json.dump(map_data, f)
+    return filepath
+
+
+def assert_same_map(map_data, expected):
+    assert {key: value for key, value in map_data.items() if key not in ("data_fs", "data_snr")} == \
+        {key: value for key, value in expected.items() if key not in ("data_fs", "data_snr")}
+    for axis in ('xs', 'ys'):
+        assert [np.asarray(fire).tolist() for fire in map_data["data_fs"][axis]] == expected["data_fs"][axis]
+    for axis in ('x', 'y'):
+        assert np.asarray(map_data["data_snr"][axis]).tolist() == expected["data_snr"][axis]
+
+
+def test_round_trip(tmp_path):
+    filepath = str(tmp_path / 'test_fire.maprec')
+    write_map_record(filepath, MAP, source_hash='abc')
+
+    assert read_map_record_header(filepath)['source_hash'] == 'abc'
+    map_data = read_map_record(filepath)
+    assert_same_map(map_data, MAP)
+    # The coordinates come straight out of the file
+    assert isinstance(map_data["data_fs"]['xs'][0], np.ndarray)
+
+
+def test_round_trip_without_fires(tmp_path):
+    filepath = str(tmp_path / 'solution.maprec')
+    write_map_record(filepath, {'data_snr': MAP['data_snr']})
+
+    map_data = read_map_record(filepath)
+    assert "data_fs" not in map_data
+    assert map_data["data_snr"]['x'].tolist() == MAP['data_snr']['x']
+
+
+def test_load_map_caches_a_record(tmp_path):
+    maps_dir, cache_dir = str(tmp_path / 'maps'), str(tmp_path / 'cache')
+    json_filepath = write_json_map(maps_dir, MAP)
+
+    map_data, locked, source = load_map('test_fire', maps_dir=maps_dir, static_dir=str(tmp_path), cache_dir=cache_dir)
+    assert not locked
+    assert source == (hash_map_file(json_filepath),)
+    record_filepath = os.path.join(cache_dir, 'test_fire.maprec')
+    assert read_map_record_header(record_filepath)['source_hash'] == hash_map_file(json_filepath)
+
+    # Read from the record the second time
+    map_data, _, cached_source = load_map('test_fire', maps_dir=maps_dir, static_dir=str(tmp_path), cache_dir=cache_dir)
+    assert cached_source == source
+    assert isinstance(map_data["data_snr"]['x'], np.ndarray)
+    assert_same_map(map_data, MAP)
+
+
+def test_load_map_notices_edits(tmp_path):
+    maps_dir, cache_dir = str(tmp_path / 'maps'), str(tmp_path / 'cache')
+    write_json_map(maps_dir, MAP)
+    _, _, source = load_map('test_fire', maps_dir=maps_dir, static_dir=str(tmp_path), cache_dir=cache_dir)
+
+    edited = dict(MAP, wind={'spd_kts': 20, 'dir_deg': 180})
+    write_json_map(maps_dir, edited)
+    map_data, _, edited_source = load_map('test_fire', maps_dir=maps_dir, static_dir=str(tmp_path), cache_dir=cache_dir)
+    assert edited_source != source
+    assert map_data['wind'] == {'spd_kts': 20, 'dir_deg': 180}
+
+
+def test_load_map_ignores_a_broken_record(tmp_path):
+    maps_dir, cache_dir = str(tmp_path / 'maps'), str(tmp_path / 'cache')
+    write_json_map(maps_dir, MAP)
+    os.makedirs(cache_dir)
+    with open(os.path.join(cache_dir, 'test_fire.maprec'), 'wb') as f:
+        f.write(b'not a map record')
+
+    map_data, _, _ = load_map('test_fire', maps_dir=maps_dir, static_dir=str(tmp_path), cache_dir=cache_dir)
+    assert_same_map(map_data, MAP)
+
+
+def test_load_map_with_hidden_survivors(tmp_path):
+    maps_dir, static_dir, cache_dir = str(tmp_path / 'maps'), str(tmp_path / 'static'), str(tmp_path / 'cache')
+    write_json_map(maps_dir, dict(MAP, data_snr={'x': [], 'y': []}))
+    os.makedirs(static_dir)
+    write_map_record(os.path.join(static_dir, '.test_fire.snr.bin'), {'data_snr': MAP['data_snr']})
+
+    map_data, locked, source = load_map('test_fire', maps_dir=maps_dir, static_dir=static_dir, cache_dir=cache_dir)
+    assert locked
+    assert len(source) == 2
+    assert map_data["data_snr"]['y'].tolist() == MAP['data_snr']['y']
+
+
+def test_load_map_missing(tmp_path):
+    assert load_map('nowhere', maps_dir=str(tmp_path), static_dir=str(tmp_path), cache_dir=str(tmp_path)) is None
@@ -0,0 +1,123 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+import pytest
+
+from shared_ring import SharedRing, LOCATION_RECORD, TAKEOFF_RECORD
+
+
+@pytest.fixture
+def make_ring():
+    made = []
+
+    def make(dtype=LOCATION_RECORD, capacity=8, **settings):
+        ring = SharedRing(dtype, capacity, **settings)
+        made.append(ring)
+        return ring
+
+    yield make
+
+    for ring in made:
+        ring.unlink()
+
+
+def location(msg_id):
+    return (msg_id, 42.0 + msg_id, -71.0 - msg_id, 1000 + msg_id, 0)
+
+
+def test_put_peek_release(make_ring):
+    ring = make_ring()
+    for msg_id in range(3):
+        ring.put(location(msg_id))
+    assert len(ring) == 3
+
+    records = ring.peek()
+    assert records['msgId'].tolist() == [0, 1, 2]
+    assert records['latitude'].tolist() == [42.0, 43.0, 44.0]
+    # Peeking doesn't take anything out
+    assert len(ring) == 3
+
+    ring.release(2)
+    assert len(ring) == 1
+    assert ring.peek()['msgId'].tolist() == [2]
+    ring.release(1)
+    assert len(ring) == 0
+    assert len(ring.peek()) == 0
+
+
+def test_peek_stops_at_the_end_of_the_buffer(make_ring):
+    ring = make_ring(capacity=4)
+    for msg_id in range(3):
+        ring.put(location(msg_id))
+    ring.release(len(ring.peek()))
+    for msg_id in range(3, 7):
+        ring.put(location(msg_id))
+
+    # Slot 3 is the last one, the rest wrapped around to the start
+    assert ring.peek()['msgId'].tolist() == [3]
+    assert ring.peek(limit=1)['msgId'].tolist() == [3]
+    ring.release(1)
+    assert ring.peek()['msgId'].tolist() == [4, 5, 6]
+
+
+def test_put_many(make_ring):
+    ring = make_ring(capacity=16)
+    count = 10
+    ring.put_many(msgId=np.arange(count),
+                  latitude=np.linspace(42, 43, count),
+                  longitude=np.linspace(-71, -70, count),
+                  time=1000 + np.arange(count),
+                  drone_id=3)
+
+    records = ring.peek()
+    assert records['msgId'].tolist() == list(range(count))
+    assert np.allclose(records['longitude'], np.linspace(-71, -70, count))
+    # Single values go in every record
+    assert (records['drone_id'] == 3).all()
+
+
+def test_drop_oldest(make_ring):
+    ring = make_ring(capacity=8, limit=4, drop_oldest=True)
+    for msg_id in range(6):
+        ring.put(location(msg_id))
+    # Only the newest ones are still waiting
+    assert len(ring) == 4
+
+    records = ring.peek()
+    assert records['msgId'].tolist() == [2, 3, 4, 5]
+    # The reader counts what it skipped
+    assert ring.dropped == 2
+    ring.release(len(records))
+    assert len(ring) == 0
+
+
+def test_peeked_records_are_not_dropped(make_ring):
+    ring = make_ring(capacity=8, limit=4, drop_oldest=True)
+    for msg_id in range(4):
+        ring.put(location(msg_id))
+    held = ring.peek(limit=2)
+    assert held['msgId'].tolist() == [0, 1]
+
+    for msg_id in range(4, 7):
+        ring.put(location(msg_id))
+    # What the reader is holding is untouched, only the records after it were dropped
+    assert held['msgId'].tolist() == [0, 1]
+    ring.release(len(held))
+    assert ring.peek()['msgId'].tolist() == [3, 4, 5, 6]
+    assert ring.dropped == 1
+
+
+def test_attach_by_name(make_ring):
+    ring = make_ring(TAKEOFF_RECORD, capacity=4)
+    # What the grpc server process does with the ring it's handed
+    other = SharedRing(TAKEOFF_RECORD, 4, name=ring.name, lock=ring.lock)
+    try:
+        other.put((7, True, 1000, 2))
+        assert ring.peek().tolist() == [(7, True, 1000, 2)]
+    finally:
+        other.close()
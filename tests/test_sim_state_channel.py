@@ -0,0 +1,179 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+# Helpers
+import os
+
+# Shape tools
+from shapely.geometry import Polygon
+
+import pytest
+
+from sim_state_channel import SimStateChannel, SimStateReader
+
+
+FIRE = Polygon([(-71.05, 42.35), (-71.04, 42.35), (-71.04, 42.36), (-71.05, 42.36)])
+OTHER_FIRE = Polygon([(-71.08, 42.31), (-71.07, 42.31), (-71.075, 42.32)])
+
+
+@pytest.fixture
+def channel_path(tmp_path):
+    return str(tmp_path / 'sim_state.bin')
+
+
+def publish(channel, survivors_found, fires):
+    channel.publish(survivors_found, 50.0, 75.0, [(0, 75.0)], fires)
+
+
+def publish_changes(channel, survivors_found, fires, changed_fires):
+    # The way Data publishes, it knows which fires changed
+    channel.publish(survivors_found, 50.0, 75.0, [(0, 75.0)], fires, changed_fires)
+
+
+def circle(rng, points):
+    angles = np.linspace(0, 2 * np.pi, points, endpoint=False)
+    center = rng.uniform(-1, 1, 2)
+    return Polygon(np.column_stack((center[0] + np.cos(angles), center[1] + np.sin(angles))))
+
+
+def test_read(channel_path):
+    channel = SimStateChannel(channel_path, radius_of_influence=25.0)
+    reader = SimStateReader(channel_path)
+    try:
+        assert reader.read() is None
+        publish(channel, 3, {0: FIRE, 4: OTHER_FIRE})
+
+        state = reader.read()
+        assert state['survivors_found'] == 3
+        assert state['radius_of_influence'] == 25.0
+        assert state['drones'] == {0: 75.0}
+        assert state['fire_polygons'][0].equals(FIRE)
+        assert state['fire_polygons'][4].equals(OTHER_FIRE)
+        # Nothing changed since
+        assert reader.read() is None
+    finally:
+        channel.retire()
+
+
+def test_unchanged_fires_are_not_decoded_again(channel_path):
+    channel = SimStateChannel(channel_path)
+    reader = SimStateReader(channel_path)
+    try:
+        publish(channel, 0, {0: FIRE, 4: OTHER_FIRE})
+        first = reader.read()
+        publish(channel, 1, {0: FIRE})
+
+        second = reader.read()
+        assert second['survivors_found'] == 1
+        assert list(second['fire_polygons']) == [0]
+        assert second['fire_polygons'][0] is first['fire_polygons'][0]
+    finally:
+        channel.retire()
+
+
+def test_outgrowing_the_file(channel_path):
+    channel = SimStateChannel(channel_path, max_fires=1, coord_capacity=4)
+    reader = SimStateReader(channel_path)
+    try:
+        publish(channel, 0, {0: FIRE})
+        assert len(reader.read()['fire_polygons']) == 1
+        publish(channel, 0, {0: FIRE, 4: OTHER_FIRE})
+        assert len(reader.read()['fire_polygons']) == 2
+    finally:
+        channel.retire()
+
+
+def test_reader_follows_a_restarted_writer(channel_path):
+    channel = SimStateChannel(channel_path)
+    reader = SimStateReader(channel_path)
+    publish(channel, 5, {0: FIRE})
+    assert reader.read()['survivors_found'] == 5
+    channel.retire()
+
+    restarted = SimStateChannel(channel_path)
+    try:
+        publish(restarted, 0, {4: OTHER_FIRE})
+        state = reader.read()
+        # The new Visualizer's sequence numbers start over, it still gets read
+        assert state['survivors_found'] == 0
+        assert list(state['fire_polygons']) == [4]
+    finally:
+        restarted.retire()
+
+
+def test_reader_follows_a_writer_that_crashed(channel_path, tmp_path):
+    channel = SimStateChannel(channel_path)
+    reader = SimStateReader(channel_path)
+    publish(channel, 5, {0: FIRE})
+    assert reader.read()['survivors_found'] == 5
+
+    # The old file never got retired, a new one just took its place
+    restarted_path = str(tmp_path / 'restarted.bin')
+    restarted = SimStateChannel(restarted_path)
+    try:
+        publish(restarted, 1, {4: OTHER_FIRE})
+        os.replace(restarted_path, channel_path)
+
+        state = reader.read()
+        assert state['survivors_found'] == 1
+        assert list(state['fire_polygons']) == [4]
+    finally:
+        restarted.retire()
+        channel.close()
+
+
+def test_only_changed_fires_are_written(channel_path):
+    channel = SimStateChannel(channel_path, max_fires=2, coord_capacity=16)
+    reader = SimStateReader(channel_path)
+    try:
+        fires = {0: FIRE, 4: OTHER_FIRE}
+        publish(channel, 0, fires)
+        first = reader.read()
+        coords = channel.coords.copy()
+
+        # Only the scalars moved
+        publish_changes(channel, 1, fires, [])
+        state = reader.read()
+        assert state['survivors_found'] == 1
+        assert (channel.coords == coords).all()
+        # The fire records weren't even looked at
+        assert state['fire_polygons'] is first['fire_polygons']
+
+        # A smaller fire goes where the old one was
+        fires[4] = Polygon([(-71.08, 42.31), (-71.075, 42.31), (-71.075, 42.315)])
+        publish_changes(channel, 1, fires, [4])
+        assert reader.read()['fire_polygons'][4].equals(fires[4])
+        assert (channel.coords[:5] == coords[:5]).all()
+    finally:
+        channel.retire()
+
+
+def test_random_changes_read_back(channel_path):
+    rng = np.random.default_rng(0)
+    channel = SimStateChannel(channel_path, max_fires=4, coord_capacity=64)
+    reader = SimStateReader(channel_path)
+    try:
+        fires = {fire_id: circle(rng, 8) for fire_id in range(6)}
+        publish(channel, 0, fires)
+        for step in range(200):
+            changed = []
+            for fire_id in rng.choice(12, size=rng.integers(0, 4), replace=False).tolist():
+                if fire_id in fires and rng.random() < 0.3:
+                    del fires[fire_id]
+                else:
+                    # Shrinking and growing both happen
+                    fires[fire_id] = circle(rng, int(rng.integers(3, 24)))
+                changed.append(fire_id)
+            publish_changes(channel, step, fires, changed)
+
+            state = reader.read()
+            assert state['survivors_found'] == step
+            assert state['fire_polygons'].keys() == fires.keys()
+            assert all(state['fire_polygons'][fire_id].equals(poly) for fire_id, poly in fires.items())
+    finally:
+        channel.retire()
@@ -0,0 +1,34 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Helpers
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+from conftest import REPO_ROOT
+
+
+def test_last_state_is_written_on_exit(tmp_path):
+    # A Visualizer that goes away while the writer is busy still leaves the latest state behind
+    filepath = tmp_path / 'sim_data.json'
+    script = textwrap.dedent("""
+        import sys, time
+        from sim_state_file import SimStateFileWriter
+
+        writer = SimStateFileWriter(sys.argv[1])
+        write = writer.write
+        writer.write = lambda version, state: (time.sleep(0.2), write(version, state))
+        for version in (1, 2):
+            writer.submit(version, {'survivors_found': version, 'fire_polygons': {}})
+    """)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(REPO_ROOT, 'Visualizer'), os.environ.get('PYTHONPATH', '')]))
+    subprocess.run([sys.executable, '-c', script, str(filepath)], env=env, check=True, timeout=60)
+
+    with open(filepath) as f:
+        state = json.load(f)
+    assert state['version'] == 2 and state['survivors_found'] == 2
@@ -0,0 +1,55 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+# Shape tools
+from shapely.geometry import Point, Polygon
+
+from spatial_index import ObjectIndex
+
+
+def triangle(x, y):
+    # Only half of its bounding box is inside of it
+    return Polygon([(x, y), (x + 1, y), (x, y + 1)])
+
+
+def test_query_refines_the_bounding_boxes():
+    index = ObjectIndex([triangle(0, 0), triangle(2, 0)])
+    assert index.query(Point(0.2, 0.2).buffer(0.1)) == [0]
+    # In the bounding box of the first triangle, but not in the triangle
+    assert index.query(Point(0.9, 0.9).buffer(0.05)) == []
+    assert index.query(Polygon([(0, 0), (3, 0), (3, 0.1), (0, 0.1)])) == [0, 1]
+
+
+def test_bounds_bulk_load_matches_geometries():
+    triangles = [triangle(x, 0) for x in range(0, 10, 2)]
+    bounds = np.array([t.bounds for t in triangles])
+    point = Point(4.1, 0.1).buffer(0.05)
+    assert ObjectIndex(triangles, bounds).query(point) == ObjectIndex(triangles).query(point) == [2]
+
+
+def test_index_follows_the_objects():
+    index = ObjectIndex([triangle(0, 0)])
+    index.insert(5, triangle(10, 10))
+    assert index.query(Point(10.1, 10.1)) == [5]
+    index.update(0, triangle(20, 20))
+    assert index.query(Point(0.1, 0.1)) == []
+    assert index.query(Point(20.1, 20.1)) == [0]
+    index.remove(5)
+    assert index.query(Point(10.1, 10.1)) == [] and len(index) == 1
+
+
+def test_candidates_many_then_query():
+    index = ObjectIndex([triangle(0, 0), triangle(2, 0)])
+    circles = [Point(0.9, 0.9).buffer(0.05), Point(2.1, 0.1).buffer(0.05), Point(9, 9).buffer(0.05)]
+    candidates = index.candidates_many(np.array([circle.bounds for circle in circles]))
+    assert candidates == [[0], [1], []]
+    assert [index.query(circle, found) for circle, found in zip(circles, candidates)] == [[], [1], []]
+    # Objects removed after the candidates were found are skipped
+    index.remove(1)
+    assert index.query(circles[1], candidates[1]) == []
+    assert ObjectIndex().candidates_many(np.array([circles[0].bounds])) == [[]]
@@ -0,0 +1,141 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Grpc
+import grpc
+
+import pytest
+
+# The drone side needs MAVSDK (and navpy) to import
+pytest.importorskip('mavsdk')
+pytest.importorskip('navpy')
+
+import student_base
+import viz_pb2 as viz_connect
+
+
+class Done:
+    """
+    Stands in for the future of a call that already finished with the given code.
+    """
+
+    def __init__(self, code):
+        self.status = code
+
+    def done(self):
+        return True
+
+    def code(self):
+        return self.status
+
+    def details(self):
+        return self.status.name
+
+
+class Call:
+    """
+    Stands in for a stub method, answering each request with the next code for its msgId.
+    """
+
+    def __init__(self, codes):
+        self.codes = codes
+        self.sent = []
+
+    def future(self, request, timeout=None, wait_for_ready=False):
+        self.sent.append(request.msgId)
+        return Done(self.codes[request.msgId].pop(0))
+
+
+@pytest.fixture
+def student():
+    made = student_base.student_base(viz_address='localhost:1')
+    yield made
+    made.channel.close()
+
+
+def test_notifications_retry_only_when_the_visualizer_was_away(student, monkeypatch, capsys):
+    now = [1000.0]
+    monkeypatch.setattr(student_base.time, 'time', lambda: now[0])
+    call = Call({0: [grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.OK],
+                 1: [grpc.StatusCode.INVALID_ARGUMENT],
+                 2: [grpc.StatusCode.OK]})
+    for msg_id in range(3):
+        student.viz_notifications.append((call, viz_connect.TakeoffNotification(msgId=msg_id), 0, 0))
+
+    student.viz_send_notifications()
+    assert call.sent == [0, 1, 2]
+
+    # The one the Visualizer turned down is dropped, the one it wasn't there for waits out the backoff
+    student.viz_send_notifications()
+    assert 'INVALID_ARGUMENT' in capsys.readouterr().out
+    assert call.sent == [0, 1, 2]
+    now[0] += student.viz_backoff_min
+    student.viz_send_notifications()
+    assert call.sent == [0, 1, 2, 0]
+    student.viz_send_notifications()
+    assert not student.viz_notifications and not student.viz_in_flight
+
+
+def test_notifications_give_up_after_max_attempts(student, monkeypatch, capsys):
+    now = [1000.0]
+    monkeypatch.setattr(student_base.time, 'time', lambda: now[0])
+    call = Call({0: [grpc.StatusCode.DEADLINE_EXCEEDED] * student.viz_max_attempts})
+    student.viz_notifications.append((call, viz_connect.LandingNotification(msgId=0), 0, 0))
+
+    # One call to see it failed (and schedule the retry), another once the backoff is over to send it again
+    for _ in range(2 * student.viz_max_attempts):
+        student.viz_send_notifications()
+        now[0] += student.viz_backoff_max
+    assert len(call.sent) == student.viz_max_attempts
+    assert 'DEADLINE_EXCEEDED' in capsys.readouterr().out
+    assert not student.viz_notifications and not student.viz_in_flight
+
+
+def north(meters):
+    # Degrees of latitude for that many meters
+    return meters / 6371000.0 * 180.0 / 3.141592653589793
+
+
+def test_locations_only_go_out_when_the_drone_moved_enough(student, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(student_base.time, 'time', lambda: now[0])
+    student.telemetry.update(latitude=42.35, longitude=-71.05, velocity=0.0)
+    assert student.viz_location_due()
+
+    # Hovering in place, or drifting less than a fifth of the 5 m radius
+    now[0] += 0.1
+    student.telemetry['latitude'] += north(0.5)
+    assert not student.viz_location_due()
+    now[0] += 0.1
+    student.telemetry['latitude'] += north(1.0)
+    assert student.viz_location_due()
+
+    # Speeding up, or turning while moving
+    now[0] += 0.1
+    student.telemetry['velocity'] = 2.0
+    assert student.viz_location_due()
+    now[0] += 0.1
+    student.course = 20.0
+    assert student.viz_location_due()
+
+    # Nothing changed, but it's been a while
+    now[0] += student.viz_max_interval
+    assert student.viz_location_due()
+
+
+def test_dead_band_follows_the_maps_radius(student, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(student_base.time, 'time', lambda: now[0])
+    student.viz_apply_sim_state(viz_connect.SimState(full=True, radius_of_influence=25.0))
+    assert student.viz_radius_of_influence == 25.0
+
+    student.telemetry.update(latitude=42.35, longitude=-71.05, velocity=0.0)
+    assert student.viz_location_due()
+    now[0] += 0.1
+    student.telemetry['latitude'] += north(4.0)
+    assert not student.viz_location_due()
+    now[0] += 0.1
+    student.telemetry['latitude'] += north(2.0)
+    assert student.viz_location_due()
@@ -0,0 +1,46 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Math
+import numpy as np
+
+import geodesy
+from survivors import SurvivorIndex
+
+
+def brute_force(index, lon, lat, distance):
+    # Every survivor against the point, no band
+    lon, lat = np.radians(lon), np.radians(lat)
+    half_chord = (np.sin((index.lats_rad - lat) / 2.0)**2
+                  + np.cos(lat) * np.cos(index.lats_rad) * np.sin((index.lons_rad - lon) / 2.0)**2)
+    return np.flatnonzero(2.0 * geodesy.EARTH_RADIUS_M * np.arcsin(np.sqrt(half_chord)) <= distance)
+
+
+def test_within_matches_brute_force():
+    rng = np.random.default_rng(7)
+    index = SurvivorIndex(rng.uniform(-71.1, -71.0, 500), rng.uniform(42.3, 42.4, 500))
+    for lon, lat in zip(rng.uniform(-71.1, -71.0, 50), rng.uniform(42.3, 42.4, 50)):
+        assert np.array_equal(index.within(lon, lat, 300.0), brute_force(index, lon, lat, 300.0))
+
+    lons, lats = rng.uniform(-71.1, -71.0, 20), rng.uniform(42.3, 42.4, 20)
+    expected = np.unique(np.concatenate([brute_force(index, lon, lat, 300.0) for lon, lat in zip(lons, lats)]))
+    assert np.array_equal(index.within_many(lons, lats, 300.0), expected)
+
+
+def test_distance_is_exact_and_inclusive():
+    # Right on the edge of the circle, and just past it
+    ring = geodesy.point_to_ring(-71.05, 42.35, 25.0)
+    index = SurvivorIndex([ring[3, 0], ring[7, 0]], [ring[3, 1], ring[7, 1]])
+    assert index.within(-71.05, 42.35, 25.0 + 1e-6).tolist() == [0, 1]
+    assert index.within(-71.05, 42.35, 24.99).tolist() == []
+
+
+def test_survivors_are_found_once():
+    index = SurvivorIndex([-71.05, -71.05, -71.0], [42.35, 42.3501, 42.35])
+    assert index.find(-71.05, 42.35, 20.0).tolist() == [0, 1]
+    assert index.find(-71.05, 42.35, 20.0).tolist() == []
+    assert index.find_many([-71.05, -71.0], [42.35, 42.35], 20.0).tolist() == [2]
+    assert index.found.all()
+    assert len(SurvivorIndex([], [])) == 0 and SurvivorIndex([], []).within(-71.05, 42.35, 20.0).tolist() == []
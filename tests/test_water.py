@@ -0,0 +1,103 @@
+##################################################################
+#   Copyright 2021 Lockheed Martin Corporation.                  #
+#   Use of this software is subject to the BSD 3-Clause License. #
+##################################################################
+
+# Helpers
+import json
+import os
+import sys
+
+# Shape tools
+from shapely.geometry import Polygon, box, mapping
+
+import pytest
+
+import geodesy
+from water import WaterQuery, WaterMask, load_water_query
+
+
+MAP_BOUNDS = (-71.10, 42.30, -71.00, 42.40)
+# Small enough to rasterize at a couple of meters per pixel
+MASK_BOUNDS = (-71.055, 42.345, -71.045, 42.355)
+
+
+def circle(lon, lat, radius=20.0):
+    return Polygon(geodesy.point_to_ring(lon, lat, radius))
+
+
+@pytest.fixture
+def lakes():
+    # A lake with an island in the middle, another one overlapping it, and one far off the map
+    lake = Polygon(box(-71.052, 42.348, -71.048, 42.352).exterior.coords,
+                   [box(-71.0505, 42.3495, -71.0495, 42.3505).exterior.coords])
+    return [lake, box(-71.049, 42.349, -71.046, 42.351), box(-60.0, 40.0, -59.0, 41.0)]
+
+
+def test_query_finds_water_nearby(lakes):
+    water = WaterQuery(lakes, MAP_BOUNDS)
+    # The overlapping lakes are merged and the one far away is dropped
+    assert len(water.parts) == 1
+    assert water.intersects(circle(-71.051, 42.349))
+    assert water.intersects(circle(-71.047, 42.350))
+    # On the island, and on dry land next to the lake
+    assert not water.intersects(circle(-71.0500, 42.3500, 5.0))
+    assert not water.intersects(circle(-71.060, 42.350))
+    assert not WaterQuery([], MAP_BOUNDS).intersects(circle(-71.051, 42.349))
+
+
+def test_clipped_parts_are_taken_as_they_are(lakes):
+    water = WaterQuery(lakes, MAP_BOUNDS)
+    again = WaterQuery(water.parts, MAP_BOUNDS, clipped=True)
+    assert [part.equals(other) for part, other in zip(again.parts, water.parts)] == [True]
+
+
+def test_mask_agrees_with_the_geometry(lakes, tmp_path):
+    water = WaterQuery(lakes, MASK_BOUNDS, source_hash='lakes')
+    resolution = 2.0
+    mask = WaterMask(water, 'lakes', 20.0, resolution, cache_dir=str(tmp_path), margin=0.001)
+    for i in range(40):
+        for j in range(40):
+            lon = -71.054 + i * 0.0002
+            lat = 42.346 + j * 0.0002
+            if mask.intersects(circle(lon, lat)) != water.intersects(circle(lon, lat)):
+                # Only right at the shore, where a pixel either way changes the answer
+                assert water.intersects(circle(lon, lat, 20.0 + 2 * resolution))
+                assert not water.intersects(circle(lon, lat, 20.0 - 2 * resolution))
+
+
+def test_mask_is_cached(lakes, tmp_path, monkeypatch):
+    water = WaterQuery(lakes, MASK_BOUNDS, source_hash='lakes')
+    mask = WaterMask(water, 'lakes', 20.0, 2.0, cache_dir=str(tmp_path), margin=0.001)
+    rasterized = []
+    rasterize = WaterMask.rasterize
+    monkeypatch.setattr(WaterMask, 'rasterize', lambda self, *size: rasterized.append(size) or rasterize(self, *size))
+
+    cached = WaterMask(water, 'lakes', 20.0, 2.0, cache_dir=str(tmp_path), margin=0.001)
+    assert rasterized == [] and (cached.mask == mask.mask).all()
+    # A different waterbodies file or resolution makes a new one
+    WaterMask(WaterQuery(lakes, MASK_BOUNDS, source_hash='other'), 'lakes', 20.0, 2.0, cache_dir=str(tmp_path), margin=0.001)
+    WaterMask(water, 'lakes', 20.0, 4.0, cache_dir=str(tmp_path), margin=0.001)
+    assert len(rasterized) == 2
+
+
+def test_clipped_water_is_cached(lakes, tmp_path, monkeypatch):
+    pytest.importorskip('geopandas')
+    source = tmp_path / 'waterbodies.geojson'
+    features = [{'type': 'Feature', 'properties': {}, 'geometry': mapping(lake)} for lake in lakes]
+    source.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}))
+    load = lambda: load_water_query('lakes', MAP_BOUNDS, str(source), cache_dir=str(tmp_path))
+
+    water = load()
+    assert os.path.exists(tmp_path / 'lakes.water.bin')
+    # Nothing is parsed the second time around
+    monkeypatch.setitem(sys.modules, 'geopandas', None)
+    cached = load()
+    assert [part.equals(other) for part, other in zip(cached.parts, water.parts)] == [True]
+    assert cached.source_hash == water.source_hash
+    assert cached.intersects(circle(-71.051, 42.349)) and not cached.intersects(circle(-71.060, 42.350))
+
+    # Until the waterbodies file changes
+    source.write_text(json.dumps({'type': 'FeatureCollection', 'features': features[:1]}))
+    with pytest.raises(ImportError):
+        load()
@@ -6,7 +6,7 @@
 # SAR Solutions File Generator
 #
 # This script reads the survivor coordinates from a SAR JSON file and writes them to a 
-# top-secret file format (python pickle).
+# top-secret file format (a binary map record with only the survivors in it, see Visualizer/map_record.py).
 #
 # This works with load_map_record() in Visualizer:data.py.  The expectation is that we 
 # will save a map file with all of the search-and-rescue points removed, and then
@@ -16,8 +16,10 @@
 # reconstruct the full set of information.
 
 import json
-import pickle
 import sys
+sys.path.append('Visualizer/')
+
+from map_record import write_map_record, read_map_record
 
 if len(sys.argv) < 2:
     print("Usage: python MakeSolutionFile.py filename.json")
@@ -40,16 +42,16 @@ print(data_snr)
 
 binfile = jsonfile[0:-5] + ".snr.bin"
 
-print("\nwriting to bin file via pickle:\n")
+print("\nwriting to bin file as a map record:\n")
 print("filename will be " + binfile)
 
-pickle.dump(data_snr, open(binfile, "wb"))
+write_map_record(binfile, {'data_snr': data_snr})
 
 print("\nreading bin file back for verification:\n")
 
-data_snr_read = pickle.load(open(binfile, "rb"))
+data_snr_read = read_map_record(binfile)['data_snr']
 
-print(data_snr_read)
+print({'x': data_snr_read['x'].tolist(), 'y': data_snr_read['y'].tolist()})
 
 print("\nThis file should be moved to the Visualizer/static directory and renamed to a hidden file ('." + binfile + "')\n")
 print("Remember to remove the contents of data_snr from the JSON file that is being distributed to students.\n")
\ No newline at end of file